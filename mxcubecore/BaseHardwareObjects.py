@@ -45,7 +45,7 @@ from typing import (
 )
 from typing_extensions import Self, Literal
 
-from mxcubecore.dispatcher import dispatcher
+from mxcubecore.dispatcher import signal_bus, SignalCoalescer
 from mxcubecore.CommandContainer import CommandContainer
 
 if TYPE_CHECKING:
@@ -606,6 +606,12 @@ class HardwareObjectMixin(CommandContainer):
         # List of member names (methods) to be exported (Set at configuration stage)
         self._exports_config_list = []
 
+        # Rate limits of signals, by signal name (Set at configuration stage).
+        # See SignalCoalescer for the format
+        self.signal_rate_limits: Optional[Dict[str, Any]] = None
+        # SignalCoalescer, created on first emit. False if there are no limits
+        self._signal_coalescer: Union[SignalCoalescer, bool, None] = None
+
     def __bool__(self) -> Literal[True]:
         return True
 
@@ -872,7 +878,7 @@ class HardwareObjectMixin(CommandContainer):
 
         TODO: This function would be unnecessary if all callers used
         ```python
-        dispatcher.send(signal, self, *argtuple)
+        signal_bus.send(signal, self, *argtuple)
         ```
 
         Args:
@@ -885,7 +891,70 @@ class HardwareObjectMixin(CommandContainer):
         if len(args) == 1:
             if isinstance(args[0], tuple):
                 args = args[0]
-        dispatcher.send(signal, self, *args)
+
+        coalescer = self._signal_coalescer
+        if coalescer is None:
+            coalescer = self._signal_coalescer = self._create_signal_coalescer()
+        if coalescer:
+            if coalescer.is_limited(signal):
+                coalescer.emit(signal, args)
+                return
+            pending = coalescer.get_pending()
+            if pending:
+                # Rate limited signals to the same receivers are sent first
+                receivers = signal_bus.get_receivers(signal, self)
+                coalescer.flush(
+                    [
+                        name
+                        for name in pending
+                        if any(
+                            receiver in receivers
+                            for receiver in signal_bus.get_receivers(name, self)
+                        )
+                    ]
+                )
+        signal_bus.send(signal, self, *args)
+
+    def set_signal_rate_limits(self, limits: Optional[Dict[str, Any]]) -> None:
+        """Set the rate limits of signals, replacing the configured ones.
+
+        Pending rate limited signals are sent first.
+
+        Args:
+            limits (Optional[Dict[str, Any]]): Rate limits by signal name,
+            see SignalCoalescer. None or empty for no limits.
+        """
+        if self._signal_coalescer:
+            self._signal_coalescer.flush()
+        self.signal_rate_limits = limits
+        self._signal_coalescer = self._create_signal_coalescer()
+
+    def _create_signal_coalescer(self) -> Union[SignalCoalescer, bool]:
+        """Create the signal coalescer from the signal_rate_limits configuration.
+
+        Returns:
+            Union[SignalCoalescer, bool]: The coalescer, False if there are no
+            (valid) limits.
+        """
+        limits = self.signal_rate_limits
+        if limits is None and hasattr(self, "get_property"):
+            # xml configuration
+            limits = self.get_property("signal_rate_limits")
+            if isinstance(limits, str):
+                limits = ast.literal_eval(limits.strip())
+        if not limits:
+            return False
+
+        def send(signal, args):
+            signal_bus.send(signal, self, *args)
+
+        try:
+            return SignalCoalescer(send, limits)
+        except (ValueError, KeyError, TypeError):
+            logging.getLogger("HWR").exception(
+                "%s: invalid signal_rate_limits %s", self.__class__.__name__, limits
+            )
+            return False
 
     def connect(
         self,
@@ -930,7 +999,7 @@ class HardwareObjectMixin(CommandContainer):
 
         signal = str(signal)
 
-        dispatcher.connect(slot, signal, sender)
+        signal_bus.connect(slot, signal, sender)
 
         self.connect_dict[sender] = {"signal": signal, "slot": slot}
 
@@ -979,7 +1048,7 @@ class HardwareObjectMixin(CommandContainer):
 
         signal = str(signal)
 
-        dispatcher.disconnect(slot, signal, sender)
+        signal_bus.disconnect(slot, signal, sender)
 
         if hasattr(sender, "disconnect_notify"):
             sender.disconnect_notify(signal)
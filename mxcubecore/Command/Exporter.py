@@ -34,15 +34,55 @@ __license__ = "LGPLv3+"
 EXPORTER_CLIENTS = {}
 
 
-def start_exporter(address, port, timeout=3, retries=1):
-    """Start the exporter"""
+def start_exporter(address, port, timeout=3, retries=1, pipelined=None):
+    """Start the exporter
+    Args:
+        address (str): Exporter server host
+        port (int): Exporter server port
+        timeout (float): Default timeout [s]
+        retries (int): Number of retries (datagram protocol only)
+        pipelined (bool): Keep several requests in flight on the connection.
+                          The mode is set when the client is created; None
+                          accepts the mode of a client already started.
+    Raises:
+        ValueError: The client is already started in the other mode.
+    """
     global EXPORTER_CLIENTS
+    if pipelined is not None:
+        pipelined = str(pipelined).lower() == "true"
     if (address, port) not in EXPORTER_CLIENTS:
-        client = Exporter(address, port, timeout)
+        client = Exporter(address, port, timeout, pipelined=bool(pipelined))
         EXPORTER_CLIENTS[(address, port)] = client
         client.start()
         return client
-    return EXPORTER_CLIENTS[(address, port)]
+    client = EXPORTER_CLIENTS[(address, port)]
+    if pipelined is not None and pipelined != client.pipelined:
+        raise ValueError(
+            "Exporter %s:%s already started with pipelined=%s"
+            % (address, port, client.pipelined)
+        )
+    return client
+
+
+def read_channels(channels):
+    """Read several exporter channels, with one burst of requests per server
+    Args:
+        channels (list): ExporterChannel objects
+    Returns:
+        (list): The value of each channel
+    """
+    groups = {}
+    for idx, channel in enumerate(channels):
+        groups.setdefault(channel.get_exporter(), []).append(idx)
+
+    values = [None] * len(channels)
+    for exporter, indices in groups.items():
+        group_values = exporter.read_properties(
+            [channels[idx].attribute_name for idx in indices]
+        )
+        for idx, value in zip(indices, group_values):
+            values[idx] = value
+    return values
 
 
 class Exporter(ExporterClient.ExporterClient, object):
@@ -69,8 +109,10 @@ class Exporter(ExporterClient.ExporterClient, object):
     STATE_FAULT = "Fault"
     STATE_UNKNOWN = "Unknown"
 
-    def __init__(self, address, port, timeout=3, retries=1):
-        super(Exporter, self).__init__(address, port, PROTOCOL.STREAM, timeout, retries)
+    def __init__(self, address, port, timeout=3, retries=1, pipelined=False):
+        super(Exporter, self).__init__(
+            address, port, PROTOCOL.STREAM, timeout, retries, pipelined
+        )
 
         self.started = False
         self.callbacks = {}
@@ -98,6 +140,11 @@ class Exporter(ExporterClient.ExporterClient, object):
         ret = ExporterClient.ExporterClient.read_property(self, *args, **kwargs)
         return self._to_python_value(ret)
 
+    def read_properties(self, *args, **kwargs):
+        """Read several properties at once"""
+        ret = ExporterClient.ExporterClient.read_properties(self, *args, **kwargs)
+        return [self._to_python_value(value) for value in ret]
+
     def reconnect(self):
         """Reconnect"""
         return
@@ -176,11 +223,19 @@ class ExporterCommand(CommandObject):
     """Command implementation for Exporter"""
 
     def __init__(
-        self, name, command, username=None, address=None, port=None, timeout=3, **kwargs
+        self,
+        name,
+        command,
+        username=None,
+        address=None,
+        port=None,
+        timeout=3,
+        pipelined=None,
+        **kwargs
     ):
         CommandObject.__init__(self, name, username, **kwargs)
         self.command = command
-        self.__exporter = start_exporter(address, port, timeout)
+        self.__exporter = start_exporter(address, port, timeout, pipelined=pipelined)
         msg = "Attaching Exporter command: {} {}".format(address, name)
         logging.getLogger("HWR").debug(msg)
 
@@ -225,11 +280,12 @@ class ExporterChannel(ChannelObject):
         address=None,
         port=None,
         timeout=3,
+        pipelined=None,
         **kwargs
     ):
         ChannelObject.__init__(self, name, username, **kwargs)
 
-        self.__exporter = start_exporter(address, port, timeout)
+        self.__exporter = start_exporter(address, port, timeout, pipelined=pipelined)
         self.attribute_name = attribute_name
         self.value = None
 
@@ -257,6 +313,13 @@ class ExporterChannel(ChannelObject):
         value = self.__exporter.read_property(self.attribute_name)
         return value
 
+    def get_exporter(self):
+        """Get the exporter client, shared by the channels of the same server
+        Returns:
+            (Exporter): The client
+        """
+        return self.__exporter
+
     def set_value(self, value):
         """Set a value
         Args:
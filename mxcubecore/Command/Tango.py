@@ -19,8 +19,10 @@
 #  along with MXCuBE. If not, see <http://www.gnu.org/licenses/>.
 
 import logging
+import weakref
 import gevent
 import gevent.event
+import gevent.monkey
 
 try:
     import Queue as queue
@@ -53,6 +55,105 @@ __license__ = "LGPLv3+"
 
 log = logging.getLogger("HWR")
 
+# DeviceProxy objects, shared by the channels and commands of a device with
+# the same client timeout, keyed by (device name, timeout)
+DEVICE_PROXIES = {}
+# Poller thread DeviceProxy objects and attribute names, keyed by device name
+RAW_DEVICE_PROXIES = {}
+DEVICE_ATTRIBUTES = {}
+
+# TangoPollGroup objects, keyed by (device name, polling period, read_as_str)
+POLL_GROUPS = {}
+
+_allocate_lock = gevent.monkey.get_original("_thread", "allocate_lock")
+
+
+def get_device_proxy(device_name, timeout=None):
+    """Get the DeviceProxy of a device with a client timeout, created and
+    pinged on first use only. The callers using the same timeout share the
+    proxy, a different timeout gets a proxy of its own.
+
+    Args:
+        device_name (str): Tango device name
+        timeout (int): Client timeout [ms]. The Tango default if None.
+    Returns:
+        (DeviceProxy): The shared proxy
+    Raises:
+        PyTango.DevFailed: The proxy could not be created
+        ConnectionError: The device does not answer
+    """
+    device = DEVICE_PROXIES.get((device_name, timeout))
+    if device is None:
+        device = DeviceProxy(device_name)
+        if timeout is not None:
+            device.set_timeout_millis(timeout)
+        try:
+            device.ping()
+        except PyTango.ConnectionFailed:
+            raise ConnectionError
+        DEVICE_PROXIES[(device_name, timeout)] = device
+    return device
+
+
+def get_raw_device_proxy(device_name):
+    """Get the DeviceProxy used by the pollers of a device. It is distinct
+    from the get_device_proxy one, as it is used from the poller threads.
+
+    Args:
+        device_name (str): Tango device name
+    Returns:
+        (DeviceProxy): The shared proxy
+    """
+    device = RAW_DEVICE_PROXIES.get(device_name)
+    if device is None:
+        device = DeviceProxy(device_name)
+        RAW_DEVICE_PROXIES[device_name] = device
+    return device
+
+
+def get_attribute_names(device_name, device=None):
+    """Get the (lower case) attribute names of a device, queried on first use.
+
+    Args:
+        device_name (str): Tango device name
+        device (DeviceProxy): Proxy making the query.
+                              The default is get_device_proxy(device_name).
+    Returns:
+        (set): The attribute names
+    """
+    names = DEVICE_ATTRIBUTES.get(device_name)
+    if names is None:
+        if device is None:
+            device = get_device_proxy(device_name)
+        names = set(attr.name.lower() for attr in device.attribute_list_query())
+        DEVICE_ATTRIBUTES[device_name] = names
+    return names
+
+
+def invalidate_device(device_name):
+    """Forget the proxies and attribute names of a device, so that they are
+    created anew on next use, e.g. after the device server restarted.
+
+    Args:
+        device_name (str): Tango device name
+    """
+    for key in list(DEVICE_PROXIES):
+        if key[0] == device_name:
+            DEVICE_PROXIES.pop(key, None)
+    RAW_DEVICE_PROXIES.pop(device_name, None)
+    DEVICE_ATTRIBUTES.pop(device_name, None)
+
+
+def is_connection_error(error):
+    """Check if a Tango error means that the device proxy must be recreated
+
+    Args:
+        error (PyTango.DevFailed): Error of a call to the device
+    Returns:
+        (bool): True for connection and communication errors
+    """
+    return isinstance(error, (PyTango.ConnectionFailed, PyTango.CommunicationFailed))
+
 
 class TangoCommand(CommandObject):
     def __init__(self, name, command, tangoname=None, username=None, **kwargs):
@@ -61,22 +162,21 @@ class TangoCommand(CommandObject):
         self.command = command
         self.device_name = tangoname
         self.device = None
+        # client timeout [ms], the Tango default if None
+        self.timeout = None
 
     def init_device(self):
         try:
-            self.device = DeviceProxy(self.device_name)
+            self.device = get_device_proxy(self.device_name, self.timeout)
         except PyTango.DevFailed as traceback:
             last_error = traceback[-1]
             logging.getLogger("HWR").error(
                 "%s: %s", str(self.name()), last_error["desc"]
             )
             self.device = None
-        else:
-            try:
-                self.device.ping()
-            except PyTango.ConnectionFailed:
-                self.device = None
-                raise ConnectionError
+        except ConnectionError:
+            self.device = None
+            raise
 
     def __call__(self, *args, **kwargs):
         self.emit("commandBeginWaitReply", (str(self.name()),))
@@ -95,6 +195,10 @@ class TangoCommand(CommandObject):
             logging.getLogger("HWR").error(
                 "%s: Tango, %s", str(self.name()), error_dict
             )
+            if is_connection_error(error_dict):
+                # reconnect on next call
+                invalidate_device(self.device_name)
+                self.device = None
         except Exception:
             logging.getLogger("HWR").exception(
                 "%s: an error occured when calling Tango command %s",
@@ -110,9 +214,9 @@ class TangoCommand(CommandObject):
         pass
 
     def set_device_timeout(self, timeout):
-        if self.device is None:
-            self.init_device()
-        self.device.set_timeout_millis(timeout)
+        # a proxy of its own, the other users of the device keep their timeout
+        self.timeout = timeout
+        self.init_device()
 
     def is_connected(self):
         return self.device is not None
@@ -142,6 +246,154 @@ class E:
         self.event = event
 
 
+class TangoPollGroup:
+    """Poll the attributes of all the channels of a device polled with the
+    same period, with one read_attributes call per polling period.
+
+    The polled call runs in a poller thread, which compares each attribute
+    with its previous value. Changed values are collected until the gevent
+    hub passes them to the update of the channels. An attribute whose read
+    fails is passed to poll_failed of its channels instead, once, and its
+    value is passed again when it can be read.
+    """
+
+    def __init__(self, device_name, polling_period, read_as_str=False):
+        self.device_name = device_name
+        self.polling_period = polling_period
+        self.read_as_str = read_as_str
+        self.raw_device = get_raw_device_proxy(device_name)
+        # attribute name: weak references to the channels reading it
+        self._channels = {}
+        self._last_values = {}
+        self._changed_values = {}
+        # attribute name: error, for the attributes that could not be read
+        self._failed = {}
+        self._new_errors = {}
+        self._changes_lock = _allocate_lock()
+        self.poller = None
+        self._version = 0
+
+    @staticmethod
+    def join(channel):
+        """Add a polled channel to the group of its device and polling period,
+        creating and starting the group if needed.
+
+        Args:
+            channel (TangoChannel): Channel to poll
+        Returns:
+            (TangoPollGroup): The group
+        """
+        key = (channel.device_name, channel.polling, bool(channel.read_as_str))
+        group = POLL_GROUPS.get(key)
+        if group is None:
+            group = TangoPollGroup(*key)
+            POLL_GROUPS[key] = group
+            group.add_channel(channel)
+            group.poller = Poller.poll(
+                group.poll,
+                polling_period=group.polling_period,
+                value_changed_callback=group.dispatch,
+                error_callback=group.poll_failed,
+            )
+        else:
+            group.add_channel(channel)
+        return group
+
+    def add_channel(self, channel):
+        refs = self._channels.get(channel.attribute_name, [])
+        # new list, the polling thread may be iterating on the old one
+        self._channels[channel.attribute_name] = refs + [weakref.ref(channel)]
+        # make sure the new channel gets the current value
+        self._last_values.pop(channel.attribute_name, None)
+
+    def _read_attributes(self, attribute_names):
+        if self.read_as_str:
+            return self.raw_device.read_attributes(
+                attribute_names, PyTango.DeviceAttribute.ExtractAs.String
+            )
+        return self.raw_device.read_attributes(attribute_names)
+
+    def poll(self):
+        """Read all the attributes - in the poller thread.
+
+        Returns:
+            (int): Counter, incremented each time some attribute changed
+        """
+        attribute_names = list(self._channels)
+        while True:
+            try:  # in case of tango communication errors, retry reading
+                attributes = self._read_attributes(attribute_names)
+                break
+            except PyTango.CommunicationFailed:
+                log.warning(
+                    "error polling %s attributes %s, retrying.",
+                    self.device_name,
+                    attribute_names,
+                    exc_info=True,
+                )
+
+        changed_values = {}
+        new_errors = {}
+        for name, attribute in zip(attribute_names, attributes):
+            if attribute.has_failed:
+                if name not in self._failed:
+                    self._failed[name] = new_errors[name] = PyTango.DevFailed(
+                        *attribute.get_err_stack()
+                    )
+                    # pass the value again once it can be read
+                    self._last_values.pop(name, None)
+                continue
+            self._failed.pop(name, None)
+            value = attribute.value
+            last_value = self._last_values.get(name, Poller.NotInitializedValue)
+            if isinstance(value, numpy.ndarray) or isinstance(
+                last_value, numpy.ndarray
+            ):
+                changed = not numpy.array_equal(value, last_value)
+            else:
+                changed = value != last_value
+            if changed:
+                self._last_values[name] = value
+                changed_values[name] = value
+
+        if changed_values or new_errors:
+            with self._changes_lock:
+                for name in new_errors:
+                    self._changed_values.pop(name, None)
+                for name in changed_values:
+                    self._new_errors.pop(name, None)
+                self._changed_values.update(changed_values)
+                self._new_errors.update(new_errors)
+            self._version += 1
+        return self._version
+
+    def dispatch(self, _version):
+        """Update the channels with the changed values and pass the read
+        errors - in the gevent hub."""
+        with self._changes_lock:
+            changed_values, self._changed_values = self._changed_values, {}
+            new_errors, self._new_errors = self._new_errors, {}
+        poller_id = self.poller.get_id() if self.poller is not None else None
+        for name, error in new_errors.items():
+            for channel_ref in self._channels.get(name, ()):
+                channel = channel_ref()
+                if channel is not None:
+                    channel.poll_failed(error, poller_id)
+        for name, value in changed_values.items():
+            for channel_ref in self._channels.get(name, ()):
+                channel = channel_ref()
+                if channel is not None:
+                    channel.update(value)
+
+    def poll_failed(self, e, poller_id):
+        POLL_GROUPS.pop((self.device_name, self.polling_period, self.read_as_str), None)
+        for refs in list(self._channels.values()):
+            for channel_ref in refs:
+                channel = channel_ref()
+                if channel is not None:
+                    channel.poll_failed(e, poller_id)
+
+
 class TangoChannel(ChannelObject):
     _tangoEventsQueue = queue.Queue()
     _eventReceivers = {}
@@ -172,6 +424,8 @@ class TangoChannel(ChannelObject):
         self.polling_events = False
         self.timeout = int(timeout)
         self.read_as_str = kwargs.get("read_as_str", False)
+        # poll together with the other channels of the device
+        self.group_polling = str(kwargs.get("group_polling", False)).lower() == "true"
         self._device_initialized = gevent.event.Event()
         self.init_device()
         self.continue_init(None)
@@ -197,14 +451,17 @@ class TangoChannel(ChannelObject):
         # self.init_poller.stop()
 
         if isinstance(self.polling, int):
-            self.raw_device = DeviceProxy(self.device_name)
+            if self.group_polling and self.device is not None:
+                TangoPollGroup.join(self)
+            else:
+                self.raw_device = get_raw_device_proxy(self.device_name)
 
-            Poller.poll(
-                self.poll,
-                polling_period=self.polling,
-                value_changed_callback=self.update,
-                error_callback=self.poll_failed,
-            )
+                Poller.poll(
+                    self.poll,
+                    polling_period=self.polling,
+                    value_changed_callback=self.update,
+                    error_callback=self.poll_failed,
+                )
         else:
             if self.polling == "events":
                 # try to register event
@@ -226,33 +483,29 @@ class TangoChannel(ChannelObject):
 
     def init_device(self):
         try:
-            self.device = DeviceProxy(self.device_name)
+            self.device = get_device_proxy(self.device_name, self.timeout)
         except PyTango.DevFailed as traceback:
             self.imported = False
             last_error = traceback[-1]
             logging.getLogger("HWR").error(
                 "%s: %s", str(self.name()), last_error["desc"]
             )
+        except ConnectionError:
+            self.imported = True
+            self.device = None
+            raise
         else:
             self.imported = True
-            try:
-                self.device.ping()
-            except PyTango.ConnectionFailed:
+            # check that the attribute exists (to avoid Abort in PyTango grrr)
+            if self.attribute_name.lower() not in get_attribute_names(
+                self.device_name, self.device
+            ):
+                logging.getLogger("HWR").error(
+                    "no attribute %s in Tango device %s",
+                    self.attribute_name,
+                    self.device_name,
+                )
                 self.device = None
-                raise ConnectionError
-            else:
-                self.device.set_timeout_millis(self.timeout)
-
-                # check that the attribute exists (to avoid Abort in PyTango grrr)
-                if not self.attribute_name.lower() in [
-                    attr.name.lower() for attr in self.device.attribute_list_query()
-                ]:
-                    logging.getLogger("HWR").error(
-                        "no attribute %s in Tango device %s",
-                        self.attribute_name,
-                        self.device_name,
-                    )
-                    self.device = None
 
     def push_event(self, event):
         # logging.getLogger("HWR").debug("%s | attr_value=%s, event.errors=%s, quality=%s", self.name(), event.attr_value, event.errors,event.attr_value is None and "N/A" or event.attr_value.quality)
@@ -292,6 +545,7 @@ class TangoChannel(ChannelObject):
                 )
 
     def poll_failed(self, e, poller_id):
+        self._device_failed(e)
         self.emit("update", None)
         """
         emit_update = True
@@ -337,13 +591,27 @@ class TangoChannel(ChannelObject):
         self.value = value
         self.emit("update", value)
 
+    def _device_failed(self, error):
+        """Drop the proxies of the device after a connection error, so that
+        they are created anew on next use, e.g. after a device server restart.
+        """
+        if is_connection_error(error):
+            invalidate_device(self.device_name)
+            self.device = None
+
     def get_value(self):
-        if self.read_as_str:
-            value = self.device.read_attribute(
-                self.attribute_name, PyTango.DeviceAttribute.ExtractAs.String
-            ).value
-        else:
-            value = self.device.read_attribute(self.attribute_name).value
+        if self.device is None:
+            self.init_device()
+        try:
+            if self.read_as_str:
+                value = self.device.read_attribute(
+                    self.attribute_name, PyTango.DeviceAttribute.ExtractAs.String
+                ).value
+            else:
+                value = self.device.read_attribute(self.attribute_name).value
+        except PyTango.DevFailed as error:
+            self._device_failed(error)
+            raise
 
         if isinstance(value, numpy.ndarray):
             if not numpy.array_equal(value, self.value):
@@ -354,7 +622,13 @@ class TangoChannel(ChannelObject):
         return value
 
     def set_value(self, new_value):
-        self.device.write_attribute(self.attribute_name, new_value)
+        if self.device is None:
+            self.init_device()
+        try:
+            self.device.write_attribute(self.attribute_name, new_value)
+        except PyTango.DevFailed as error:
+            self._device_failed(error)
+            raise
 
     def is_connected(self):
         return self.device is not None
@@ -186,6 +186,23 @@ class ExporterClient(StandardClient):
             pass
         return process_return
 
+    def read_properties(self, props, timeout=-1):
+        """Read several properties with one burst of requests
+        Args:
+            props(list): property names
+            timeout(float): Timeout [s] for the whole burst
+        Returns:
+            (list): reply from the process for each property, None on error
+        """
+        cmds = ["{} {}".format(CMD_PROPERTY_READ, prop) for prop in props]
+        process_returns = []
+        for ret in self.send_receive_many(cmds, timeout):
+            try:
+                process_returns.append(self.__process_return(ret))
+            except Exception:
+                process_returns.append(None)
+        return process_returns
+
     def read_property_as_string_array(self, prop):
         """Read a propery and convert the return value to list of strings.
         Args:
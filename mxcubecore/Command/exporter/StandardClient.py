@@ -21,7 +21,9 @@
 """ ProtocolError and StandardClient implementation"""
 import sys
 import socket
+from collections import deque
 import gevent
+import gevent.event
 import gevent.lock
 
 __copyright__ = """ Copyright © 2019 by the MXCuBE collaboration """
@@ -65,6 +67,10 @@ else:
     encode = str
 
 MAX_SIZE_STREAM_MSG = 500000
+RECV_BUFFER_SIZE = 4096
+
+_STX_BYTE = b"\x02"
+_ETX_BYTE = b"\x03"
 
 
 class PROTOCOL:
@@ -74,10 +80,93 @@ class PROTOCOL:
     STREAM = 2
 
 
-class StandardClient:
-    """Standard JLib client"""
+class StreamFrameParser:
+    """Split a byte stream into the STX/ETX delimited messages it carries.
+
+    Frames are located with bytearray.find and decoded in one step. Bytes
+    outside a frame are dropped, an STX inside a frame restarts it and an
+    incomplete frame is kept until the next chunk completes it.
+    """
+
+    def __init__(self, max_size=MAX_SIZE_STREAM_MSG):
+        self.max_size = max_size
+        self._buffer = bytearray()
+        self._in_frame = False
+
+    def reset(self):
+        """Drop any partially received frame"""
+        self._buffer.clear()
+        self._in_frame = False
+
+    def feed(self, data, size=None):
+        """Parse a received chunk.
+        Args:
+            data(bytes or bytearray): Received data
+            size(int): Number of valid bytes in data, all of them if None
+        Returns:
+            (list): The decoded messages completed by this chunk
+        Raises:
+            ProtocolError: The message is not valid UTF-8
+        """
+        if size is None:
+            size = len(data)
+        view = memoryview(data)
+        messages = []
+        pos = 0
+        # positions of the next delimiters, -1 when there are no more
+        next_stx = data.find(_STX_BYTE, 0, size)
+        next_etx = data.find(_ETX_BYTE, 0, size)
+        while pos < size:
+            if not self._in_frame:
+                if next_stx < 0:
+                    break
+                self._buffer.clear()
+                self._in_frame = True
+                pos = next_stx + 1
+                next_stx = data.find(_STX_BYTE, pos, size)
+                continue
+            if next_etx >= 0 and next_etx < pos:
+                next_etx = data.find(_ETX_BYTE, pos, size)
+            if next_stx >= 0 and (next_etx < 0 or next_stx < next_etx):
+                # frame restarted before it was terminated
+                self._in_frame = False
+                continue
+            if next_etx < 0:
+                self._buffer += view[pos:size]
+                break
+            if self._buffer:
+                self._buffer += view[pos:next_etx]
+                frame = self._buffer
+            else:
+                frame = view[pos:next_etx]
+            try:
+                messages.append(str(frame, "utf-8"))
+            except UnicodeDecodeError:
+                self.reset()
+                raise ProtocolError("UnicodeDecodeError: %s" % (sys.exc_info(),))
+            self._buffer.clear()
+            self._in_frame = False
+            pos = next_etx + 1
+        view.release()
+
+        if len(self._buffer) > self.max_size:
+            self.reset()
+        return messages
 
-    def __init__(self, server_ip, server_port, protocol, timeout, retries):
+
+class StandardClient:
+    """Standard JLib client
+
+    In pipelined mode (stream protocol only) send_receive does not hold the
+    socket for a full round trip: several requests can be in flight and the
+    replies, which the server sends in order, are matched to the requests in
+    order. The reply to a command sent with send() is expected in this mode,
+    and discarded. The mode is fixed when the client is created.
+    """
+
+    def __init__(
+        self, server_ip, server_port, protocol, timeout, retries, pipelined=False
+    ):
         self.server_ip = server_ip
         self.server_port = server_port
         self.timeout = timeout
@@ -89,11 +178,19 @@ class StandardClient:
         self.receiving_greenlet = None
         self.msg_received_event = gevent.event.Event()
         self._lock = gevent.lock.Semaphore()
+        self._send_lock = gevent.lock.Semaphore()
+        self._pending_replies = deque()
+        self._pipelined = bool(pipelined) and protocol == PROTOCOL.STREAM
         self.__msg_index__ = -1
         self.__sock = None
         self.__constant_local_port = True
         self._is_connected = False
 
+    @property
+    def pipelined(self):
+        """True if several requests can be in flight (read only)"""
+        return self._pipelined
+
     def __create_socket(self):
         """Create socket"""
         if self.protocol == PROTOCOL.DATAGRAM:
@@ -111,6 +208,11 @@ class StandardClient:
         self._is_connected = False
         self.__sock = None
         self.received_msg = None
+        # requests in flight will never get their reply
+        while self._pending_replies:
+            self._pending_replies.popleft().set_exception(
+                SocketError("Socket error: connection closed")
+            )
 
     def connect(self):
         """Socket connect"""
@@ -239,6 +341,9 @@ class StandardClient:
         Args:
             msg(str): Message
         """
+        if self._pending_replies:
+            self._pending_replies.popleft().set(msg)
+            return
         self.received_msg = msg
         self.msg_received_event.set()
 
@@ -248,41 +353,17 @@ class StandardClient:
             self.on_connected()
         except Exception:
             pass
-        buffer = empty_buffer()
-        mReceivedSTX = False
+        parser = StreamFrameParser()
+        recv_buffer = bytearray(RECV_BUFFER_SIZE)
         while True:
-            ret = self.__sock.recv(4096)
-            if not ret:
+            nbytes = self.__sock.recv_into(recv_buffer)
+            if not nbytes:
                 # connection reset by peer
                 self.error = "Disconnected"
                 self.__close_socket()
                 break
-            for b in ret:
-                if b == STX:
-                    buffer = empty_buffer()
-                    mReceivedSTX = True
-                elif b == ETX:
-                    if mReceivedSTX:
-                        try:
-                            # Unicode decoding exception catching,
-                            # consider errors='ignore'
-                            buffer_utf8 = buffer.decode()
-                        except UnicodeDecodeError as e:
-                            # Syntax not allowed in Python 2
-                            # raise ProtocolError from e
-                            raise ProtocolError(
-                                "UnicodeDecodeError: %s" % (sys.exc_info(),)
-                            )
-                        self.on_message_received(buffer_utf8)
-                        mReceivedSTX = False
-                        buffer = empty_buffer()
-                else:
-                    if mReceivedSTX:
-                        buffer += _bytes([b])
-
-            if len(buffer) > MAX_SIZE_STREAM_MSG:
-                mReceivedSTX = False
-                buffer = empty_buffer()
+            for msg in parser.feed(recv_buffer, nbytes):
+                self.on_message_received(msg)
         try:
             self.on_disconnected()
         except Exception:
@@ -293,13 +374,14 @@ class StandardClient:
         Args:
             cmd(str): command
         """
-        if not self.is_connected():
-            self.connect()
-        try:
-            pack = _bytes([STX]) + encode(cmd) + _bytes([ETX])
-            self.__sock.send(pack)
-        except SocketError:
-            self.disconnect()
+        with self._send_lock:
+            if not self.is_connected():
+                self.connect()
+            try:
+                pack = _bytes([STX]) + encode(cmd) + _bytes([ETX])
+                self.__sock.send(pack)
+            except SocketError:
+                self.disconnect()
 
     def __send_receive_stream(self, cmd):
         """Send/receive event.
@@ -322,13 +404,96 @@ class StandardClient:
                 self.msg_received_event.wait()
             return self.received_msg
 
+    def __send_receive_pipelined(self, cmd, timeout):
+        """Send a command and wait for its reply, other requests can be sent
+        while waiting.
+        Args:
+            cmd(str): command
+            timeout(float): Timeout [s], None for no timeout
+        Returns:
+            (str): reply form the socket
+        Raises:
+            SocketError, TimeoutError
+        """
+        reply = gevent.event.AsyncResult()
+        self.__send_burst(_bytes([STX]) + encode(cmd) + _bytes([ETX]), [reply])
+        return self.__wait_replies([reply], timeout)[0]
+
+    def send_receive_many(self, cmds, timeout=-1):
+        """Send several commands in one burst and wait for all the replies.
+        The socket is locked once for the whole burst (or only while sending,
+        if pipelined).
+        Args:
+            cmds(list): commands
+            timeout(float): Timeout [s] for the whole burst
+        Returns:
+            (list): the replies, in the order of the commands
+        Raises:
+            ProtocolError, SocketError, TimeoutError
+        """
+        if self.protocol == PROTOCOL.DATAGRAM:
+            return [self.send_receive(cmd, timeout) for cmd in cmds]
+        if timeout is not None and timeout < 0:
+            timeout = self.timeout
+
+        replies = [gevent.event.AsyncResult() for _ in cmds]
+        pack = b"".join(_bytes([STX]) + encode(cmd) + _bytes([ETX]) for cmd in cmds)
+        if self.pipelined:
+            self.__send_burst(pack, replies)
+            return self.__wait_replies(replies, timeout)
+        # no other request may use the socket until all the replies are in
+        with self._lock:
+            self.__send_burst(pack, replies)
+            return self.__wait_replies(replies, timeout)
+
+    def __send_burst(self, pack, replies):
+        """Send packed commands, queueing the replies they expect.
+        Args:
+            pack(bytes): STX/ETX framed commands
+            replies(list): AsyncResult for each command
+        Raises:
+            SocketError
+        """
+        with self._send_lock:
+            if not self.is_connected():
+                self.connect()
+            self._pending_replies.extend(replies)
+            try:
+                self.__sock.sendall(pack)
+            except Exception:
+                self.disconnect()
+                raise SocketError("Socket error:" + str(sys.exc_info()[1]))
+
+    def __wait_replies(self, replies, timeout):
+        """Wait for queued replies.
+        Args:
+            replies(list): AsyncResult for each command
+            timeout(float): Timeout [s] for all the replies, None for none
+        Returns:
+            (list): the replies
+        Raises:
+            SocketError, TimeoutError
+        """
+        try:
+            # a reply arriving after the timeout is still matched to its
+            # request, which keeps the following replies in order
+            with gevent.Timeout(timeout):
+                return [reply.get() for reply in replies]
+        except gevent.Timeout:
+            raise TimeoutError("Timeout error: %d replies missing" % len(replies))
+
     def send_receive(self, cmd, timeout=-1):
-        """Send/receive command, locking the socket.
+        """Send/receive command, locking the socket (unless pipelined).
         Args:
             cmd(str): command
         Returns:
             (str): reply form the socket
         """
+        if self.pipelined:
+            if timeout is not None and timeout < 0:
+                timeout = self.timeout
+            return self.__send_receive_pipelined(cmd, timeout)
+
         self._lock.acquire()
         try:
             if (timeout is None) or (timeout >= 0):
@@ -356,6 +521,12 @@ class StandardClient:
             raise ProtocolError(
                 "Protocol error: send command not support in datagram clients"
             )
+        if self.pipelined:
+            # keep the queue of pending replies in step with the server,
+            # nobody waits for this one
+            reply = gevent.event.AsyncResult()
+            self.__send_burst(_bytes([STX]) + encode(cmd) + _bytes([ETX]), [reply])
+            return None
         return self.__send_stream(cmd)
 
     def on_connected(self):
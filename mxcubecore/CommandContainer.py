@@ -33,7 +33,7 @@ from typing import Any, Callable, Dict, Generator, List, Optional, Tuple, Union
 import weakref
 import logging
 
-from mxcubecore.dispatcher import dispatcher
+from mxcubecore.dispatcher import signal_bus
 
 
 __copyright__ = """ Copyright © 2010 - 2020 by MXCuBE Collaboration """
@@ -90,10 +90,10 @@ class CommandObject:
             callable_func (Callable): Connection method.
         """
         try:
-            dispatcher.disconnect(callable_func, signal_name, self)
+            signal_bus.disconnect(callable_func, signal_name, self)
         except Exception:
             pass
-        dispatcher.connect(callable_func, signal_name, self)
+        signal_bus.connect(callable_func, signal_name, self)
 
     def emit(self, signal: str, *args) -> None:
         """Emit signal message.
@@ -108,7 +108,7 @@ class CommandObject:
             if isinstance(args[0], tuple):
                 args = args[0]
 
-        dispatcher.send(signal, self, *args)
+        signal_bus.send(signal, self, *args)
 
     def add_argument(
         self,
@@ -201,10 +201,10 @@ class ChannelObject:
             callableFunc (Callable): Connection method.
         """
         try:
-            dispatcher.disconnect(callableFunc, signalName, self)
+            signal_bus.disconnect(callableFunc, signalName, self)
         except Exception:
             pass
-        dispatcher.connect(callableFunc, signalName, self)
+        signal_bus.connect(callableFunc, signalName, self)
 
     def disconnect_signal(self, signalName: str, callableFunc: Callable) -> None:
         """Disconnect signal.
@@ -214,7 +214,7 @@ class ChannelObject:
             callableFunc (Callable): Disconnection method.
         """
         try:
-            dispatcher.disconnect(callableFunc, signalName, self)
+            signal_bus.disconnect(callableFunc, signalName, self)
         except Exception:
             pass
 
@@ -240,7 +240,7 @@ class ChannelObject:
             if isinstance(args[0], tuple):
                 args = args[0]
 
-        dispatcher.send(signal, self, *args)
+        signal_bus.send(signal, self, *args)
 
     def userName(self) -> str:
         """Get user name.
@@ -79,6 +79,46 @@ def parse_string(xml_hardware_object, name):
     return cur_handler.get_hardware_object()
 
 
+def record_events(xml_hardware_object):
+    """Parse an XML string into a list of SAX events, for parse_events
+
+    Args:
+        xml_hardware_object (str): XML string
+
+    Returns:
+        (list): Events, as (name, attributes) tuples for start of elements,
+                character strings for element contents and names for ends of
+                elements
+    """
+    recorder = SaxEventRecorder()
+    xml.sax.parseString(str.encode(xml_hardware_object), recorder)
+    return recorder.events
+
+
+def parse_events(events, xml_hardware_object, name):
+    """Create a Hardware Object from SAX events recorded by record_events
+
+    Args:
+        events (list): Events returned by record_events
+        xml_hardware_object (str): XML string the events come from
+        name (str): Hardware Object name
+
+    Returns:
+        The Hardware Object, as for parse_string
+    """
+    global CURRENT_XML
+    CURRENT_XML = xml_hardware_object
+    cur_handler = HardwareObjectHandler(name)
+    for event in events:
+        if isinstance(event, tuple):
+            cur_handler.startElement(*event)
+        elif isinstance(event, list):
+            cur_handler.endElement(event[0])
+        else:
+            cur_handler.characters(event)
+    return cur_handler.get_hardware_object()
+
+
 def load_module(hardware_object_name):
     """[summary]
 
@@ -143,6 +183,26 @@ def instanciate_class(module_name, class_name, object_name):
                 return new_instance
 
 
+class SaxEventRecorder(ContentHandler):
+    """Records SAX events in a compact, marshallable form"""
+
+    def __init__(self):
+        ContentHandler.__init__(self)
+        self.events = []
+
+    def startElement(self, name, attrs):
+        self.events.append((name, dict(attrs)))
+
+    def characters(self, content):
+        if self.events and isinstance(self.events[-1], str):
+            self.events[-1] += content
+        else:
+            self.events.append(content)
+
+    def endElement(self, name):
+        self.events.append([name])
+
+
 class HardwareObjectHandler(ContentHandler):
     def __init__(self, name):
         """[summary]
@@ -26,6 +26,7 @@ import sys
 import gevent
 from mxcubecore.TaskUtils import task
 from mxcubecore.HardwareObjects.abstract.AbstractCollect import AbstractCollect
+from mxcubecore.HardwareObjects.FileWatcher import get_file_watcher
 from mxcubecore import HardwareRepository as HWR
 
 
@@ -452,16 +453,12 @@ class ALBACollect(AbstractCollect):
         filename = template % frame_number
         fullpath = os.path.join(basedir, filename)
 
-        start_wait = time.time()
-
         logging.getLogger("HWR").debug("   waiting for image on disk: %s", fullpath)
 
-        while not os.path.exists(fullpath):
-            dirlist = os.listdir(basedir)  # forces directory flush ?
-            if (time.time() - start_wait) > timeout:
-                logging.getLogger("HWR").debug("   giving up waiting for image")
-                return False
-            time.sleep(0.2)
+        # The file watcher scans the directory, which also flushes it
+        if not get_file_watcher().wait_for(fullpath, timeout):
+            logging.getLogger("HWR").debug("   giving up waiting for image")
+            return False
 
         self.last_saved_image = fullpath
 
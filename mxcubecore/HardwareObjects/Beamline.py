@@ -28,7 +28,7 @@ from __future__ import division, absolute_import
 from __future__ import print_function, unicode_literals
 
 from typing import Union, Any
-from mxcubecore.dispatcher import dispatcher
+from mxcubecore.dispatcher import signal_bus
 
 __copyright__ = """ Copyright © 2019 by the MXCuBE collaboration """
 __license__ = "LGPLv3+"
@@ -263,7 +263,7 @@ class Beamline(ConfiguredObject):
         if len(args) == 1:
             if isinstance(args[0], tuple):
                 args = args[0]
-        responses: list = dispatcher.send(signal, self, *args)
+        responses: list = signal_bus.send(signal, self, *args)
         if not responses:
             raise RuntimeError(
                 "Signal %s is not connected" % signal
@@ -765,6 +765,17 @@ class Beamline(ConfiguredObject):
 
     __content_roles.append("data_publisher")
 
+    @property
+    def file_watcher(self):
+        """File watcher, waiting for image and result files
+
+        Returns:
+            Optional[FileWatcher]:
+        """
+        return self._objects.get("file_watcher")
+
+    __content_roles.append("file_watcher")
+
     # NB this is just an example of a globally shared procedure description
     @property
     def manual_centring(self):
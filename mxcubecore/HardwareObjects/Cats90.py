@@ -21,6 +21,7 @@ Known sites using cats90
 
 from __future__ import print_function
 import time
+import gevent.event
 import PyTango
 import logging
 
@@ -154,8 +155,13 @@ class Cats90(SampleChanger):
 
     default_basket_type = BASKET_SPINE
 
+    # Period [s] of the state reads when waiting, in case no channel update comes
+    STATE_POLL_PERIOD = 0.5
+
     def __init__(self, *args, **kwargs):
         super(Cats90, self).__init__(self.__TYPE__, False, *args, **kwargs)
+        # set on each state update from the Tango channels
+        self._state_update_event = gevent.event.Event()
 
     def init(self):
 
@@ -1164,6 +1170,7 @@ class Cats90(SampleChanger):
 
         status = SampleChangerState.tostring(state)
         self._set_state(state, status)
+        self._state_update_event.set()
 
     def _read_state(self):
         """
@@ -1266,8 +1273,13 @@ class Cats90(SampleChanger):
         :rtype: None
         """
         with gevent.Timeout(timeout, Exception("Timeout waiting for device ready")):
-            while not self._is_device_ready():
-                gevent.sleep(0.01)
+            while True:
+                self._state_update_event.clear()
+                if self._is_device_ready():
+                    break
+                # woken up by the channel updates, read the state again at the
+                # latest after STATE_POLL_PERIOD
+                self._state_update_event.wait(self.STATE_POLL_PERIOD)
 
     def _do_update_loaded_sample(self):
         """
@@ -23,7 +23,6 @@ __license__ = "LGPLv3+"
 
 import os
 import logging
-import time
 import copy
 from mxcubecore.model import queue_model_objects as qmo
 from mxcubecore.model import queue_model_enumerables as qme
@@ -37,6 +36,7 @@ from mxcubecore.HardwareObjects.abstract.AbstractCharacterisation import (
 )
 
 from mxcubecore.HardwareObjects.EDNACharacterisation import EDNACharacterisation
+from mxcubecore.HardwareObjects.FileWatcher import get_file_watcher
 
 from XSDataMXCuBEv1_4 import XSDataInputMXCuBE
 from XSDataMXCuBEv1_4 import XSDataMXCuBEDataSet
@@ -220,20 +220,16 @@ class P11EDNACharacterisation(EDNACharacterisation):
             self.log.debug(f"Cannot write to datasets.txt: {err}")
 
     def wait_for_file(self, file_path, timeout=60, check_interval=1):
-        start_time = time.time()
-        while not os.path.exists(file_path):
-            elapsed_time = time.time() - start_time
-            if elapsed_time >= timeout:
-                self.log.debug(
-                    f"Timeout reached. File '{file_path}' not found within {timeout} seconds."
-                )
-                raise RuntimeWarning(
-                    f"Timeout reached. File '{file_path}' not found within {timeout} seconds."
-                )
-            self.log.info(
-                f"Waiting for file '{file_path}'... ({elapsed_time:.1f}/{timeout} seconds elapsed)"
+        # check_interval is kept for compatibility, the file watcher adapts
+        # its polling interval
+        self.log.info(f"Waiting for file '{file_path}' (timeout {timeout} seconds)")
+        if not get_file_watcher().wait_for(file_path, timeout):
+            self.log.debug(
+                f"Timeout reached. File '{file_path}' not found within {timeout} seconds."
+            )
+            raise RuntimeWarning(
+                f"Timeout reached. File '{file_path}' not found within {timeout} seconds."
             )
-            time.sleep(check_interval)
         self.log.info(f"File '{file_path}' found.")
 
     def input_from_params(self, data_collection, char_params):
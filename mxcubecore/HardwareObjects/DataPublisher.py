@@ -16,11 +16,25 @@
 #
 #  You should have received a copy of the GNU Lesser General Public License
 #  along with MXCuBE. If not, see <http://www.gnu.org/licenses/>.
+"""
+Publishing of data points (e.g. scans) through Redis.
+
+By default each point is published in a JSON message and stored with one
+rpush per axis. In the columnar mode (columnar property, or columnar
+argument of register), the points are buffered by the publisher and
+published in chunks: binary frames of float64 columns, together with the
+appends to the stored columns, in one pipelined round trip. The chunks are
+published when chunk_size points are buffered, or chunk_time [s] after the
+first buffered point, and at stop. get_data then returns NumPy arrays.
+"""
 import redis
 import json
+import struct
 import gevent
 import logging
 
+import numpy
+
 from enum import Enum, unique
 
 from mxcubecore.BaseHardwareObjects import HardwareObject
@@ -62,6 +76,49 @@ class FrameType(Enum):
     STOP = "stop"
 
 
+# Header of the binary chunk frames: magic, number of points, number of columns.
+# The magic tells the chunk frames from the JSON start and stop frames
+CHUNK_MAGIC = b"HWRC"
+CHUNK_HEADER = struct.Struct("<4sII")
+
+# Data type of the columns in the chunk frames and in the stored columns
+COLUMN_DTYPE = numpy.dtype("<f8")
+
+
+def pack_chunk(columns):
+    """
+    Pack columns of the same length in a binary chunk frame
+
+    Args:
+        columns (list): x, y, (z) columns
+    Returns:
+        (bytes): chunk frame
+    """
+    columns = [numpy.asarray(column, dtype=COLUMN_DTYPE) for column in columns]
+    return CHUNK_HEADER.pack(CHUNK_MAGIC, len(columns[0]), len(columns)) + b"".join(
+        column.tobytes() for column in columns
+    )
+
+
+def unpack_chunk(frame):
+    """
+    Unpack the columns of a binary chunk frame
+
+    Args:
+        frame (bytes): chunk frame
+    Returns:
+        (numpy.ndarray): columns, with shape (number of columns, number of points)
+    Raises:
+        ValueError: If frame is not a chunk frame
+    """
+    magic, npoints, ncolumns = CHUNK_HEADER.unpack_from(frame)
+    if magic != CHUNK_MAGIC:
+        raise ValueError("Not a data chunk frame")
+    return numpy.frombuffer(
+        frame, dtype=COLUMN_DTYPE, count=npoints * ncolumns, offset=CHUNK_HEADER.size
+    ).reshape(ncolumns, npoints)
+
+
 def one_d_data(x, y):
     """
     Convenience function for creating x, y data
@@ -84,7 +141,15 @@ class DataPublisher(HardwareObject):
     def __init__(self, name):
         super(DataPublisher, self).__init__(name)
         self._r = None
+        self._rb = None
         self._subsribe_task = None
+        self._chunk_task = None
+        self.columnar = False
+        self.chunk_size = 1000
+        self.chunk_time = 0.1
+        # Points buffered by the publisher, for the columnar sources
+        self._buffers = {}
+        self._flush_tasks = {}
 
     def init(self):
         """
@@ -96,12 +161,20 @@ class DataPublisher(HardwareObject):
         rport = self.get_property("port", 6379)
         rdb = self.get_property("db", 11)
 
+        self.columnar = self.get_property("columnar", False)
+        self.chunk_size = self.get_property("chunk_size", 1000)
+        self.chunk_time = self.get_property("chunk_time", 0.1)
+
         self._r = redis.Redis(
             host=rhost, port=rport, db=rdb, charset="utf-8", decode_responses=True
         )
+        # Connection for the binary data of the columnar sources
+        self._rb = redis.Redis(host=rhost, port=rport, db=rdb)
 
         if not self._subsribe_task:
             self._subsribe_task = gevent.spawn(self._handle_messages)
+        if not self._chunk_task:
+            self._chunk_task = gevent.spawn(self._handle_chunks)
 
     def _handle_messages(self):
         """
@@ -146,10 +219,8 @@ class DataPublisher(HardwareObject):
                         )
                         active_source_desc.pop(redis_channel)
                     elif data["type"] == FrameType.DATA.value:
-                        _data[redis_channel] = {
-                            "x": _data[redis_channel]["x"] + [data["data"]["x"]],
-                            "y": _data[redis_channel]["y"] + [data["data"]["y"]],
-                        }
+                        _data[redis_channel]["x"].append(data["data"]["x"])
+                        _data[redis_channel]["y"].append(data["data"]["y"])
 
                         self.emit(
                             "data",
@@ -166,6 +237,42 @@ class DataPublisher(HardwareObject):
                     msg = "Could not parse data in %s" % message
                     logging.getLogger("HWR").exception(msg)
 
+    def _handle_chunks(self):
+        """
+        Listens for the frames of the columnar sources. The data is already
+        stored by the publisher, the frames are only emitted.
+        """
+        pubsub = self._rb.pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe("HWR_DP_NEW_DATA_CHUNK_*")
+
+        for message in pubsub.listen():
+            if message:
+                try:
+                    self._handle_chunk(message["channel"], message["data"])
+                except Exception:
+                    msg = "Could not parse data chunk of %s" % message["channel"]
+                    logging.getLogger("HWR").exception(msg)
+
+    def _handle_chunk(self, channel, frame):
+        """
+        Emits a frame of a columnar source: start, data chunk or stop
+
+        Args:
+            channel (bytes): Channel of the frame
+            frame (bytes): Binary data chunk, or JSON start or stop frame
+        """
+        _id = channel.decode().split("_")[-1]
+
+        if frame.startswith(CHUNK_MAGIC):
+            columns = unpack_chunk(frame)
+            self.emit("data", {"id": _id, "data": dict(zip(("x", "y", "z"), columns))})
+        else:
+            frame_type = json.loads(frame)["type"]
+            if frame_type == FrameType.START.value:
+                self.emit("start", self.get_description(_id, include_data=True)[0])
+            elif frame_type == FrameType.STOP.value:
+                self.emit("end", self.get_description(_id, include_data=True)[0])
+
     def _remove_available(self, _id):
         """
         Remove source with _id from list of avialable sources
@@ -290,6 +397,88 @@ class DataPublisher(HardwareObject):
         """
         self._r.publish("HWR_DP_NEW_DATA_POINT_%s" % _id, json.dumps(data))
 
+    def _start_columns(self, _id, desc):
+        """
+        Start the publication of columnar source with _id: clears its data,
+        sets it running and publishes the start frame in one round trip
+        """
+        ncolumns = 3 if desc["data_dim"] > 1 else 2
+        self._buffers[_id] = [[] for _ in range(ncolumns)]
+        desc["running"] = True
+
+        pipe = self._rb.pipeline(transaction=False)
+        pipe.set("HWR_DP_%s_DESCRIPTION" % _id, json.dumps(desc))
+        for axis in "XYZ"[:ncolumns]:
+            pipe.delete("HWR_DP_%s_COLUMN_%s" % (_id, axis))
+        pipe.publish(
+            "HWR_DP_NEW_DATA_CHUNK_%s" % _id,
+            json.dumps({"type": FrameType.START.value, "data": {}}),
+        )
+        pipe.execute()
+
+    def _buffer_points(self, _id, columns):
+        """
+        Buffer points of columnar source with _id, publishing them when the
+        buffer is full or chunk_time after the first buffered point
+
+        Args:
+            _id (str): The id of the source
+            columns (list): x, y, (z) values or sequences of values
+        """
+        buffers = self._buffers[_id]
+        for buffer, values in zip(buffers, columns):
+            buffer.extend(values)
+
+        if len(buffers[0]) >= self.chunk_size:
+            self._flush(_id)
+        elif buffers[0] and _id not in self._flush_tasks:
+            self._flush_tasks[_id] = gevent.spawn_later(
+                self.chunk_time, self._flush, _id
+            )
+
+    def _flush(self, _id):
+        """
+        Publish the buffered points of columnar source with _id, and append
+        them to the stored columns, in one round trip
+        """
+        task = self._flush_tasks.pop(_id, None)
+        if task is not None and task is not gevent.getcurrent():
+            task.kill(block=False)
+
+        buffers = self._buffers.get(_id)
+        if not buffers or not buffers[0]:
+            return
+
+        npoints = len(buffers[0])
+        columns = [buffer[:npoints] for buffer in buffers]
+        for buffer in buffers:
+            del buffer[:npoints]
+        frame = pack_chunk(columns)
+
+        pipe = self._rb.pipeline(transaction=False)
+        offset = CHUNK_HEADER.size
+        for axis in "XYZ"[: len(columns)]:
+            column_size = npoints * COLUMN_DTYPE.itemsize
+            pipe.append(
+                "HWR_DP_%s_COLUMN_%s" % (_id, axis),
+                frame[offset : offset + column_size],
+            )
+            offset += column_size
+        pipe.publish("HWR_DP_NEW_DATA_CHUNK_%s" % _id, frame)
+        pipe.execute()
+
+    def _stop_columns(self, _id):
+        """
+        Stop the publication of columnar source with _id
+        """
+        self._flush(_id)
+        self._buffers.pop(_id, None)
+        self._update_description(_id, {"running": False})
+        self._rb.publish(
+            "HWR_DP_NEW_DATA_CHUNK_%s" % _id,
+            json.dumps({"type": FrameType.STOP.value, "data": {}}),
+        )
+
     def register(
         self,
         _id,
@@ -303,7 +492,15 @@ class DataPublisher(HardwareObject):
         sample_rate=0.5,
         _range=(None, None),
         meta={},
+        columnar=None,
     ):
+        """
+        Register a data source
+
+        Args:
+            columnar (bool): Publish the data in chunks of columns.
+                The default is the columnar property.
+        """
 
         plot_description = {
             "id": _id,
@@ -318,6 +515,7 @@ class DataPublisher(HardwareObject):
             "range": _range,
             "meta": meta,
             "running": False,
+            "columnar": self.columnar if columnar is None else columnar,
         }
 
         self._set_description(_id, plot_description)
@@ -326,12 +524,40 @@ class DataPublisher(HardwareObject):
         return _id
 
     def pub(self, _id, data):
-        self._publish(_id, {"type": FrameType.DATA.value, "data": data})
+        if _id in self._buffers:
+            self._buffer_points(_id, [[data.get(axis, float("nan"))] for axis in "xyz"])
+        else:
+            self._publish(_id, {"type": FrameType.DATA.value, "data": data})
+
+    def pub_columns(self, _id, x, y, z=None):
+        """
+        Publish several points of a source at once
+
+        Args:
+            _id (str): The id of the source
+            x, y, z (sequence): Values of the points
+        """
+        if _id in self._buffers:
+            columns = [x, y] if z is None else [x, y, z]
+            self._buffer_points(_id, columns)
+        else:
+            for idx in range(len(x)):
+                data = {"x": x[idx], "y": y[idx]}
+                if z is not None:
+                    data["z"] = z[idx]
+                self.pub(_id, data)
 
     def start(self, _id):
-        self._publish(_id, {"type": FrameType.START.value, "data": {}})
+        desc = self._get_description(_id)
+        if desc.get("columnar"):
+            self._start_columns(_id, desc)
+        else:
+            self._publish(_id, {"type": FrameType.START.value, "data": {}})
 
     def stop(self, _id):
+        if _id in self._buffers:
+            self._stop_columns(_id)
+            return
         self._update_description(_id, {"running": False})
         self._publish(_id, {"type": FrameType.STOP.value, "data": {}})
 
@@ -361,6 +587,16 @@ class DataPublisher(HardwareObject):
 
     def get_data(self, _id):
         desc = self._get_description(_id)
+        if desc.get("columnar"):
+            axes = "xyz" if desc["data_dim"] > 1 else "xy"
+            pipe = self._rb.pipeline(transaction=False)
+            for axis in axes:
+                pipe.get("HWR_DP_%s_COLUMN_%s" % (_id, axis.upper()))
+            return {
+                axis: numpy.frombuffer(column or b"", dtype=COLUMN_DTYPE)
+                for axis, column in zip(axes, pipe.execute())
+            }
+
         data = {
             "x": self._r.lrange("HWR_DP_%s_DATA_X" % _id, 0, -1),
             "y": self._r.lrange("HWR_DP_%s_DATA_Y" % _id, 0, -1),
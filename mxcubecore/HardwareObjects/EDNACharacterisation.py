@@ -12,6 +12,7 @@ from mxcubecore.HardwareObjects.SecureXMLRpcRequestHandler import (
     SecureXMLRpcRequestHandler,
 )
 from mxcubecore import HardwareRepository as HWR
+from mxcubecore.utils import xsdata_stream
 from mxcubecore.HardwareObjects.abstract.AbstractCharacterisation import (
     AbstractCharacterisation,
 )
@@ -91,8 +92,10 @@ class EDNACharacterisation(AbstractCharacterisation):
                 logging.getLogger("queue_exec").info(
                     "Received characterisation results via XMLRPC"
                 )
-                self.result = XSDataResultMXCuBE.parseString(
-                    self.characterisationResult
+                self.result = xsdata_stream.run_in_thread(
+                    xsdata_stream.parse_string,
+                    XSDataResultMXCuBE,
+                    self.characterisationResult,
                 )
                 do_continue = False
             elif p.poll() is not None:
@@ -106,7 +109,9 @@ class EDNACharacterisation(AbstractCharacterisation):
                 time.sleep(1)
 
         if self.result is None and os.path.exists(results_file):
-            self.result = XSDataResultMXCuBE.parseFile(results_file)
+            self.result = xsdata_stream.run_in_thread(
+                xsdata_stream.parse_file, XSDataResultMXCuBE, results_file
+            )
 
         return self.result
 
@@ -32,6 +32,7 @@ from mxcubecore.HardwareObjects.abstract.AbstractEnergyScan import (
     AbstractEnergyScan,
 )
 from mxcubecore.BaseHardwareObjects import HardwareObject
+from mxcubecore.model.queue_model_objects import PathTemplate
 from mxcubecore import HardwareRepository as HWR
 
 
@@ -318,21 +319,14 @@ class EMBLEnergyScan(AbstractEnergyScan, HardwareObject):
                 HWR.beamline.energy.set_break_bragg()
 
     def do_chooch(self, elt, edge, scan_directory, archive_directory, prefix):
-        archive_file_prefix = str(os.path.join(archive_directory, prefix))
-
-        if os.path.exists(archive_file_prefix + ".raw"):
-            i = 1
-            while os.path.exists(archive_file_prefix + "%d.raw" % i):
-                i = i + 1
-            archive_file_prefix += "_%d" % i
-
-        archive_file_raw_filename = os.path.extsep.join((archive_file_prefix, "raw"))
-        archive_file_efs_filename = os.path.extsep.join((archive_file_prefix, "efs"))
-        archive_file_png_filename = os.path.extsep.join((archive_file_prefix, "png"))
-
         try:
-            if not os.path.exists(archive_directory):
-                os.makedirs(archive_directory)
+            # Reserve the raw file, as prefix.raw, prefix_1.raw, ...
+            _, archive_file_raw_name = PathTemplate.get_next_free_name(
+                archive_directory,
+                prefix + "_%d.raw",
+                first=prefix + ".raw",
+                create="file",
+            )
         except Exception:
             logging.getLogger("HWR").exception(
                 "EMBLEnergyScan: could not create results directory."
@@ -341,6 +335,13 @@ class EMBLEnergyScan(AbstractEnergyScan, HardwareObject):
             self.emit("energyScanFailed", ())
             return
 
+        archive_file_prefix = os.path.join(
+            archive_directory, os.path.splitext(archive_file_raw_name)[0]
+        )
+        archive_file_raw_filename = os.path.extsep.join((archive_file_prefix, "raw"))
+        archive_file_efs_filename = os.path.extsep.join((archive_file_prefix, "efs"))
+        archive_file_png_filename = os.path.extsep.join((archive_file_prefix, "png"))
+
         try:
             archive_file_raw = open(archive_file_raw_filename, "w")
         except Exception:
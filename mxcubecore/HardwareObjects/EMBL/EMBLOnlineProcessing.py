@@ -42,11 +42,10 @@ from mxcubecore.HardwareObjects.XSDataCommon import (
 )
 from mxcubecore.HardwareObjects.XSDataControlDozorv1_1 import (
     XSDataInputControlDozor,
-    XSDataResultControlDozor,
-    XSDataControlImageDozor,
 )
 
 
+from mxcubecore.utils import xsdata_stream
 from mxcubecore import HardwareRepository as HWR
 
 __credits__ = ["EMBL Hamburg"]
@@ -284,10 +283,14 @@ class EMBLOnlineProcessing(AbstractOnlineProcessing):
         """
         step = 30
         for key in ["score", "spots_num"]:
-            for index in range(self.results_raw[key].size):
-                self.results_raw[key][index] = numpy.mean(
-                    self.results_raw[key][index - step : index + step]
-                )
+            # Running mean over [index - step, index + step), from the
+            # cumulative sum
+            values = self.results_raw[key]
+            cumsum = np.concatenate(([0], np.cumsum(values, dtype=float)))
+            index = np.arange(values.size)
+            low = np.clip(index - step, 0, values.size)
+            high = np.clip(index + step, 0, values.size)
+            values[:] = (cumsum[high] - cumsum[low]) / (high - low)
 
     def get_spacegroup_dict(self, proc_params, space_group_name):
         spacegroup_dict = {}
@@ -448,32 +451,42 @@ class EMBLOnlineProcessing(AbstractOnlineProcessing):
             else:
                 logging.getLogger("HWR").info("Dozor scores %s of %s %s"%(len(batch), self.params_dict["images_num"],self.batch_count))
 
-            for image in batch:
-                frame_num = int(image[0])
-                self.results_raw["spots_num"][frame_num] = image[1]
-                if image[3] != 0:
-                    self.results_raw["spots_resolution"][frame_num] = 1 / image[3]
-                self.results_raw["score"][frame_num] = image[2]
+            # Whole batch at once: frame number, spots num, score, resolution
+            try:
+                values = np.array(batch, dtype=float)[:, :4]
+            except ValueError:
+                # Frames with different numbers of results
+                values = np.array([image[:4] for image in batch], dtype=float)
+            frame_nums = values[:, 0].astype(int)
+            self.results_raw["spots_num"][frame_nums] = values[:, 1]
+            resolution = values[:, 3]
+            has_resolution = resolution != 0
+            self.results_raw["spots_resolution"][frame_nums[has_resolution]] = (
+                1 / resolution[has_resolution]
+            )
+            self.results_raw["score"][frame_nums] = values[:, 2]
 
-                for score_key in self.results_raw.keys():
-                    self.align_result(score_key, frame_num)
+            for score_key in self.results_raw.keys():
+                self.align_result(score_key, frame_nums)
 
-    def align_result(self, score_key, frame_num):
-        if self.params_dict["lines_num"] > 1:
-            col, row = self.grid.get_col_row_from_image(frame_num)
-            self.results_aligned[score_key][col][row] = self.results_raw[score_key][frame_num]
-        else:
-            self.results_aligned[score_key][frame_num] = self.results_raw[score_key][frame_num]
+    def align_result(self, score_key, frame_nums):
+        """
+        Copies the raw results of the frames to the aligned results
+        :param score_key: str
+        :param frame_nums: int or numpy array of int
+        """
+        self.align_results(score_key, np.atleast_1d(frame_nums))
 
     def dozor_is_changed(self, is_values):
         if self.started:
-            for is_value in is_values:
-                if isinstance(is_value,(list,tuple)):
-                    self.results_raw["is"][is_value[0]] = is_value[1]
-                    self.align_result("is", is_value[0])
-                else:
-                    self.results_raw["is"][is_values[0]] = is_values[1]
-                    self.align_result("is", is_values[0])
+            if isinstance(is_values[0], (list, tuple)):
+                values = np.array([is_value[:2] for is_value in is_values], dtype=float)
+            else:
+                # A single frame
+                values = np.array([is_values[:2]], dtype=float)
+            frame_nums = values[:, 0].astype(int)
+            self.results_raw["is"][frame_nums] = values[:, 1]
+            self.align_result("is", frame_nums)
 
             if isinstance(is_values,tuple):
                 self.is_count = self.is_count + 1
@@ -537,19 +550,17 @@ class EMBLOnlineProcessing(AbstractOnlineProcessing):
         processing_xml_filename = os.path.join(
             self.params_dict["process_directory"], "dozor_result.xml"
         )
-        dozor_result = XSDataResultControlDozor()
-        for index in range(self.params_dict["images_num"]):
-            dozor_image = XSDataControlImageDozor()
-            dozor_image.setNumber(XSDataInteger(index))
-            dozor_image.setScore(XSDataDouble(self.results_raw["score"][index]))
-            dozor_image.setSpots_num_of(
-                XSDataInteger(self.results_raw["spots_num"][index])
-            )
-            dozor_image.setSpots_resolution(
-                XSDataDouble(self.results_raw["spots_resolution"][index])
-            )
-            dozor_result.addImageDozor(dozor_image)
-        dozor_result.exportToFile(processing_xml_filename)
+        # Written from the arrays (copied, as the results may still change),
+        # without an XSData object per image, and off the gevent loop
+        images_num = self.params_dict["images_num"]
+        xsdata_stream.run_in_thread(
+            xsdata_stream.write_dozor_result,
+            processing_xml_filename,
+            number=np.arange(images_num),
+            spots_num_of=self.results_raw["spots_num"][:images_num].copy(),
+            spots_resolution=self.results_raw["spots_resolution"][:images_num].copy(),
+            score=self.results_raw["score"][:images_num].copy(),
+        )
         logging.getLogger("HWR").info(
             "Online processing: Results saved in %s" % processing_xml_filename
         )
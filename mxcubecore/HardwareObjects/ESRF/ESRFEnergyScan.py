@@ -19,6 +19,7 @@ from mxcubecore.BaseHardwareObjects import HardwareObject
 from mxcubecore.HardwareObjects.abstract.AbstractEnergyScan import (
     AbstractEnergyScan,
 )
+from mxcubecore.model.queue_model_objects import PathTemplate
 from mxcubecore import HardwareRepository as HWR
 
 
@@ -210,14 +211,10 @@ class ESRFEnergyScan(AbstractEnergyScan, HardwareObject):
         archive_prefix = "_".join((prefix, symbol))
         raw_scan_file = os.path.join(directory, (archive_prefix + ".raw"))
         efs_scan_file = raw_scan_file.replace(".raw", ".efs")
-        raw_arch_file = os.path.join(archive_directory, (archive_prefix + "1" + ".raw"))
-
-        i = 0
-        while os.path.isfile(raw_arch_file):
-            i += 1
-            raw_arch_file = os.path.join(
-                archive_directory, (archive_prefix + str(i) + ".raw")
-            )
+        _, raw_arch_name = PathTemplate.get_next_free_name(
+            archive_directory, archive_prefix + "%d.raw", create="file"
+        )
+        raw_arch_file = os.path.join(archive_directory, raw_arch_name)
 
         png_scan_file = raw_scan_file.replace(".raw", ".png")
         png_arch_file = raw_arch_file.replace(".raw", ".png")
@@ -318,24 +318,25 @@ class ESRFMultiCollect(AbstractMultiCollect, HardwareObject):
         self, files_directory, prefix, run_number, process_directory
     ):
 
-        autoprocessing_input_file_dirname = "autoprocessing"
+        # The autoprocessing directory is created here, so that two
+        # collections never get the same one
+        i, autoprocessing_input_file_dirname = PathTemplate.get_next_free_name(
+            process_directory,
+            "autoprocessing_%d",
+            first="autoprocessing",
+            create="directory",
+        )
         autoprocessing_directory = os.path.join(
             process_directory, autoprocessing_input_file_dirname
         )
-        xds_input_file_dirname = "xds_%s_run%s" % (prefix, run_number,)
-        mosflm_input_file_dirname = "mosflm_%s_run%s" % (prefix, run_number)
-        hkl2000_dirname = "hkl2000_%s_run%s" % (prefix, run_number)
-
-        i = 1
-        while os.path.exists(autoprocessing_directory):
-            autoprocessing_input_file_dirname = "autoprocessing_%d" % i
-            autoprocessing_directory = os.path.join(
-                process_directory, autoprocessing_input_file_dirname
-            )
+        if i is None:
+            xds_input_file_dirname = "xds_%s_run%s" % (prefix, run_number,)
+            mosflm_input_file_dirname = "mosflm_%s_run%s" % (prefix, run_number)
+            hkl2000_dirname = "hkl2000_%s_run%s" % (prefix, run_number)
+        else:
             xds_input_file_dirname = "xds_%s_run%s_%d" % (prefix, run_number, i)
             mosflm_input_file_dirname = "mosflm_%s_run%s_%d" % (prefix, run_number, i)
             hkl2000_dirname = "hkl2000_%s_run%s_%d" % (prefix, run_number, i)
-            i += 1
 
         self.raw_data_input_file_dir = os.path.join(
             files_directory, "process", xds_input_file_dirname
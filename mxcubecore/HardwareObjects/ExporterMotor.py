@@ -33,13 +33,16 @@ differ from the default ones.
   <state_suffix>State</state_suffix>
   Use the global application state instead of the motor state.
   <use_global_state>False</use_global_state>
+  Wait for ready on the application state events, instead of polling.
+  <state_events>False</state_events>
 """
 
 import sys
 import math
 import logging
 
-from gevent import Timeout, sleep
+from gevent import Timeout
+from gevent.event import Event
 from mxcubecore.HardwareObjects.abstract.AbstractMotor import AbstractMotor
 from mxcubecore.Command.Exporter import Exporter
 from mxcubecore.Command.exporter.ExporterStates import ExporterStates
@@ -51,6 +54,11 @@ __license__ = "LGPLv3+"
 class ExporterMotor(AbstractMotor):
     """Motor using the Exporter protocol, based on AbstractMotor"""
 
+    # Period [s] of the state reads, in case a state event is missed
+    STATE_POLL_PERIOD = 0.5
+    # Period [s] of the state reads, without application state events
+    NO_EVENT_POLL_PERIOD = 0.01
+
     def __init__(self, name):
         super().__init__(name)
         self._motor_pos_suffix = None
@@ -60,6 +68,9 @@ class ExporterMotor(AbstractMotor):
         self.motor_position_chan = None
         self.motor_state_chan = None
         self.use_state = None
+        self.state_events = None
+        self._states = {}
+        self._state_event = Event()
 
     def init(self):
         """Initialise the motor"""
@@ -68,6 +79,7 @@ class ExporterMotor(AbstractMotor):
         self._motor_pos_suffix = self.get_property("position_suffix", "Position")
         self._motor_state_suffix = self.get_property("state_suffix", "State")
         self.use_state = self.get_property("use_global_state", False)
+        self.state_events = self.get_property("state_events", False)
 
         self._exporter_address = self.get_property("exporter_address")
         _host, _port = self._exporter_address.split(":")
@@ -101,6 +113,23 @@ class ExporterMotor(AbstractMotor):
         if self.motor_state_chan:
             self.motor_state_chan.connect_signal("update", self._update_state)
 
+        # application states, pushed by the server, used to wait for ready
+        if self.state_events:
+            for _name, _callback in (
+                ("State", self._update_swstate),
+                ("HardwareState", self._update_hwstate),
+            ):
+                _chan = self.add_channel(
+                    {
+                        "type": "exporter",
+                        "exporter_address": self._exporter_address,
+                        "name": _name.lower(),
+                    },
+                    _name,
+                )
+                if _chan:
+                    _chan.connect_signal("update", _callback)
+
         self.update_state()
 
     def get_state(self):
@@ -115,13 +144,36 @@ class ExporterMotor(AbstractMotor):
         except (KeyError, AttributeError):
             return self.STATES.UNKNOWN
 
-    def _update_state(self, state):
+    def _set_state(self, name, value):
+        """Store a state pushed by the server and wake up the waiters.
+        Args:
+            name (str): State name ("State", "HardwareState" or "motor").
+            value (str): State value.
+        """
+        self._states[name] = value
+        self._state_event.set()
+
+    def _update_swstate(self, state):
+        self._set_state("State", state)
+
+    def _update_hwstate(self, state):
+        self._set_state("HardwareState", state)
+
+    def _to_state(self, state):
+        """Convert an exporter state to a HardwareObjectState.
+        Args:
+            state (str): The exporter state.
+        Returns:
+            (enum 'HardwareObjectState'): Motor state.
+        """
         try:
-            state = state.upper()
-            state = ExporterStates[state].value
+            return ExporterStates[state.upper()].value
         except (AttributeError, KeyError):
-            state = self.STATES.UNKNOWN
-        return self.update_state(state)
+            return self.STATES.UNKNOWN
+
+    def _update_state(self, state):
+        self._set_state("motor", state)
+        return self.update_state(self._to_state(state))
 
     def _get_hwstate(self):
         """Get the hardware state, reported by the MD2 application.
@@ -140,18 +192,45 @@ class ExporterMotor(AbstractMotor):
         """
         return self._exporter.read_property("State")
 
+    def _read_states(self):
+        """Read the software, hardware and motor states from the server."""
+        self._states["State"] = self._get_swstate()
+        self._states["HardwareState"] = self._get_hwstate()
+        self._states["motor"] = self.motor_state_chan.get_value()
+
     def _ready(self):
         """Get the "Ready" state - software and hardware.
         Returns:
             (bool): True if both "Ready", False otherwise.
         """
-        if (
-            self._get_swstate() == "Ready"
-            and self._get_hwstate() == "Ready"
-            and self.motor_state_chan.get_value() == "Ready"
-        ):
-            return True
-        return False
+        self._read_states()
+        return self._states_ready()
+
+    def _states_ready(self):
+        """Check the last known states, without reading from the server.
+        Returns:
+            (bool): True if all "Ready", False otherwise.
+        """
+        return all(
+            self._states.get(name) == "Ready"
+            for name in ("State", "HardwareState", "motor")
+        )
+
+    def _wait_state(self, is_ready, poll, period):
+        """Wait for a state condition, woken up by the state events.
+        The server is polled every period, if no event came.
+        Args:
+            is_ready (callable): Condition on the last known states.
+            poll (callable): Read the states from the server.
+            period (float): Poll period [s].
+        """
+        poll()
+        while True:
+            self._state_event.clear()
+            if is_ready():
+                return
+            if not self._state_event.wait(period):
+                poll()
 
     def _wait_ready(self, timeout=3):
         """Wait for the state to be "Ready".
@@ -161,8 +240,11 @@ class ExporterMotor(AbstractMotor):
             RuntimeError: Execution timeout.
         """
         with Timeout(timeout, RuntimeError("Execution timeout")):
-            while not self._ready():
-                sleep(0.01)
+            if self.state_events:
+                period = self.STATE_POLL_PERIOD
+            else:
+                period = self.NO_EVENT_POLL_PERIOD
+            self._wait_state(self._states_ready, self._read_states, period)
 
     def wait_move(self, timeout=20):
         """Wait until the end of move ended, using the application state.
@@ -179,8 +261,11 @@ class ExporterMotor(AbstractMotor):
             RuntimeError: Execution timeout.
         """
         with Timeout(timeout, RuntimeError("Execution timeout")):
-            while self.get_state() != self.STATES.READY:
-                sleep(0.01)
+            self._wait_state(
+                lambda: self._to_state(self._states.get("motor")) == self.STATES.READY,
+                lambda: self._set_state("motor", self.motor_state_chan.get_value()),
+                self.STATE_POLL_PERIOD,
+            )
 
     def get_value(self):
         """Get the motor position.
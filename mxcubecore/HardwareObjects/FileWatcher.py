@@ -0,0 +1,348 @@
+#
+#  Project: MXCuBE
+#  https://github.com/mxcube
+#
+#  This file is part of MXCuBE software.
+#
+#  MXCuBE is free software: you can redistribute it and/or modify
+#  it under the terms of the GNU Lesser General Public License as published by
+#  the Free Software Foundation, either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  MXCuBE is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU Lesser General Public License for more details.
+#
+#  You should have received a copy of the GNU Lesser General Public License
+#  along with MXCuBE. If not, see <http://www.gnu.org/licenses/>.
+
+"""Wait for files to arrive on disk.
+
+The files waited for in the same directory are checked together, with one
+os.scandir of the directory per pass (run in the gevent thread pool), instead
+of one stat per file. The delay between the passes grows from poll_interval
+to max_poll_interval while no file arrives, and is reset when one does.
+
+Where inotify is available (Linux), the directory is also watched, so that a
+file created there is seen at once, without a pass. inotify does not see files
+written by other hosts on network file systems, hence the polling always
+stays active, as a fallback.
+
+Example xml file:
+<object class="FileWatcher">
+  <poll_interval>0.05</poll_interval>
+  <max_poll_interval>1.0</max_poll_interval>
+  <use_inotify>True</use_inotify>
+</object>
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+import time
+
+import gevent
+import gevent.event
+from gevent.socket import wait_read
+
+from mxcubecore.BaseHardwareObjects import HardwareObject
+from mxcubecore import HardwareRepository as HWR
+
+__copyright__ = """ Copyright © 2010 - 2024 by MXCuBE Collaboration """
+__license__ = "LGPLv3+"
+
+# inotify constants, from sys/inotify.h
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+INOTIFY_EVENT = struct.Struct("iIII")
+
+_DEFAULT_WATCHER = None
+
+
+def get_file_watcher():
+    """Get the file watcher of the beamline, or a default one if there is
+    none in the configuration.
+
+    Returns:
+        (FileWatcher): File watcher.
+    """
+    global _DEFAULT_WATCHER
+    watcher = getattr(HWR.beamline, "file_watcher", None)
+    if watcher is None:
+        if _DEFAULT_WATCHER is None:
+            _DEFAULT_WATCHER = FileWatcher("file_watcher")
+            _DEFAULT_WATCHER.init()
+        watcher = _DEFAULT_WATCHER
+    return watcher
+
+
+def _scan_directory(directory):
+    """Get the names of the files in a directory, with a single os.scandir"""
+    try:
+        with os.scandir(directory) as entries:
+            return {entry.name for entry in entries}
+    except FileNotFoundError:
+        return set()
+
+
+class _Inotify:
+    """Minimal inotify interface, through ctypes"""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path, mask):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed", path)
+        return wd
+
+    def rm_watch(self, wd):
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self):
+        """Wait for events.
+
+        Returns:
+            (list): Watch descriptor and file name of each event.
+        """
+        wait_read(self.fd)
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, _mask, _cookie, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            events.append((wd, os.fsdecode(name)))
+        return events
+
+
+class _DirectoryWatch:
+    """Files waited for in one directory, with the greenlet checking them"""
+
+    def __init__(self, watcher, directory):
+        self.watcher = watcher
+        self.directory = directory
+        # Event and number of waiters, by file name
+        self.pending = {}
+        self.wakeup = gevent.event.Event()
+        self.wd = None
+        self.task = None
+        # Set when the greenlet ends, the watch is not used any more then
+        self.closed = False
+
+    def add(self, name):
+        if name in self.pending:
+            self.pending[name][1] += 1
+        else:
+            self.pending[name] = [gevent.event.Event(), 1]
+        if self.task is None:
+            self.task = gevent.spawn(self._run)
+        else:
+            self.wakeup.set()
+        return self.pending[name][0]
+
+    def remove(self, name):
+        entry = self.pending.get(name)
+        if entry is not None:
+            entry[1] -= 1
+            if entry[1] <= 0:
+                del self.pending[name]
+                if not self.pending:
+                    # Let the greenlet end
+                    self.wakeup.set()
+
+    def arrived(self, name):
+        """Release the waiters of a file seen created"""
+        entry = self.pending.pop(name, None)
+        if entry is not None:
+            entry[0].set()
+            if not self.pending:
+                # Let the greenlet end
+                self.wakeup.set()
+
+    def _scan(self):
+        return _scan_directory(self.directory)
+
+    def _run(self):
+        self.watcher._add_inotify_watch(self)
+        interval = self.watcher.poll_interval
+        try:
+            while self.pending:
+                self.wakeup.clear()
+                names = gevent.get_hub().threadpool.apply(self._scan)
+                arrived = [name for name in self.pending if name in names]
+                for name in arrived:
+                    self.pending.pop(name)[0].set()
+                if arrived:
+                    interval = self.watcher.poll_interval
+                else:
+                    interval = min(1.5 * interval, self.watcher.max_poll_interval)
+                if self.pending:
+                    self.wakeup.wait(interval)
+        finally:
+            self.task = None
+            self.closed = True
+            self.watcher._remove_directory(self)
+
+
+class FileWatcher(HardwareObject):
+    """Waits for files to arrive on disk"""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.poll_interval = 0.05
+        self.max_poll_interval = 1.0
+        self._directories = {}
+        self._inotify = None
+        self._inotify_task = None
+        # Directory watches by inotify watch descriptor. inotify gives the same
+        # descriptor to all the watches of a directory
+        self._watches = {}
+
+    def init(self):
+        """Initialise the polling intervals and inotify"""
+        super().init()
+        self.poll_interval = self.get_property("poll_interval", 0.05)
+        self.max_poll_interval = self.get_property("max_poll_interval", 1.0)
+        if self.get_property("use_inotify", True):
+            try:
+                self._inotify = _Inotify()
+            except (AttributeError, OSError, TypeError):
+                # Not on Linux
+                logging.getLogger("HWR").debug(
+                    "FileWatcher: inotify not available, polling only"
+                )
+
+    def wait_for(self, path, timeout=None):
+        """Wait until a file exists.
+
+        Args:
+            path (str): File path.
+            timeout (float): Timeout [s]. Wait forever if None.
+        Returns:
+            (bool): True if the file exists, False on timeout.
+        """
+        return self.wait_for_many([path], timeout)
+
+    def wait_for_many(self, paths, timeout=None):
+        """Wait until all the files exist.
+
+        Args:
+            paths (list): File paths.
+            timeout (float): Timeout [s]. Wait forever if None.
+        Returns:
+            (bool): True if all the files exist, False on timeout.
+        """
+        names_by_directory = {}
+        for path in paths:
+            directory, name = os.path.split(os.path.abspath(path))
+            names_by_directory.setdefault(directory, []).append(name)
+
+        waits = []
+        for directory, names in names_by_directory.items():
+            # Check first the files already there
+            if len(names) == 1:
+                if os.path.exists(os.path.join(directory, names[0])):
+                    continue
+            else:
+                existing = _scan_directory(directory)
+                names = [name for name in names if name not in existing]
+                if not names:
+                    continue
+
+            watch = self._directories.get(directory)
+            if watch is None or watch.closed:
+                watch = _DirectoryWatch(self, directory)
+                self._directories[directory] = watch
+            for name in names:
+                waits.append((watch, name, watch.add(name)))
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            for _watch, _name, event in waits:
+                remaining = None
+                if deadline is not None:
+                    remaining = max(0, deadline - time.monotonic())
+                if not event.wait(remaining):
+                    return False
+            return True
+        finally:
+            for watch, name, event in waits:
+                if not event.is_set():
+                    watch.remove(name)
+
+    def wait_for_stable_size(self, path, timeout=None, stable_time=1.0):
+        """Wait until a file exists and its size stopped changing.
+
+        Args:
+            path (str): File path.
+            timeout (float): Timeout [s]. Wait forever if None.
+            stable_time (float): Time [s] without size change.
+        Returns:
+            (bool): True if the file size is stable, False on timeout.
+        """
+        start_time = time.monotonic()
+        if not self.wait_for(path, timeout):
+            return False
+        try:
+            with gevent.Timeout(
+                None if timeout is None else timeout - (time.monotonic() - start_time)
+            ):
+                size = os.path.getsize(path)
+                while True:
+                    gevent.sleep(stable_time)
+                    new_size = os.path.getsize(path)
+                    if new_size == size:
+                        return True
+                    size = new_size
+        except gevent.Timeout:
+            return False
+
+    def _add_inotify_watch(self, watch):
+        if self._inotify is None:
+            return
+        try:
+            watch.wd = self._inotify.add_watch(
+                watch.directory, IN_CREATE | IN_MOVED_TO | IN_CLOSE_WRITE
+            )
+        except OSError:
+            # e.g. the directory does not exist yet
+            return
+        self._watches.setdefault(watch.wd, []).append(watch)
+        if self._inotify_task is None:
+            self._inotify_task = gevent.spawn(self._read_inotify)
+
+    def _remove_directory(self, watch):
+        if self._directories.get(watch.directory) is watch:
+            del self._directories[watch.directory]
+        if watch.wd is not None:
+            watches = self._watches.get(watch.wd, [])
+            if watch in watches:
+                watches.remove(watch)
+            if not watches:
+                # Last watch of the directory
+                self._watches.pop(watch.wd, None)
+                self._inotify.rm_watch(watch.wd)
+            watch.wd = None
+
+    def _read_inotify(self):
+        while True:
+            for wd, name in self._inotify.read_events():
+                for watch in list(self._watches.get(wd, ())):
+                    watch.arrived(name)
@@ -36,8 +36,10 @@ from typing import List, Tuple, Union, Dict, Optional
 from pydantic.v1 import BaseModel, Field, ValidationError
 
 from mxcubecore.HardwareObjects import sample_centring
+from mxcubecore.Command.Exporter import ExporterChannel, read_channels
 from mxcubecore.model import queue_model_objects
 from mxcubecore.BaseHardwareObjects import HardwareObject
+from mxcubecore.utils.move_group import MoveGroup
 from mxcubecore import HardwareRepository as HWR
 
 try:
@@ -221,6 +223,11 @@ class GenericDiffractometer(HardwareObject):
     MOTOR_POSITION_CHANGED_EVENT = "motorPositionsChanged"
     MOTOR_STATUS_CHANGED_EVENT = "motorStatusChanged"
 
+    # Period [s] of the state checks when waiting, in case no state change is sent
+    STATE_POLL_PERIOD = 0.1
+    # Period [s] of the state checks when waiting, without state change signals
+    NO_EVENT_POLL_PERIOD = 0.01
+
     HEAD_TYPE_MINIKAPPA = "MiniKappa"
     HEAD_TYPE_SMARTMAGNET = "SmartMagnet"
     HEAD_TYPE_PLATE = "Plate"
@@ -272,8 +279,16 @@ class GenericDiffractometer(HardwareObject):
         )
         # not updating state inmediately after cmd started
 
+        # wait for the ready state of each motor in move_motors, instead of
+        # the diffractometer ready state only
+        self.wait_motors_ready = False
+
         # Internal values -----------------------------------------------------
         self.ready_event = None
+        # set on each state change, to wake up the greenlets waiting for a state
+        self.state_changed_event = gevent.event.Event()
+        # True once a state change signal has been received
+        self.state_events = False
         self.head_type = GenericDiffractometer.HEAD_TYPE_MINIKAPPA
         self.phase_list = []
         self.grid_direction = None
@@ -310,6 +325,7 @@ class GenericDiffractometer(HardwareObject):
 
         self.connect(self, "equipmentReady", self.equipment_ready)
         self.connect(self, "equipmentNotReady", self.equipment_not_ready)
+        self.connect(self, "minidiffStateChanged", self._state_changed_notify)
 
         # HACK
         self.get_motor_positions = self.get_positions
@@ -473,6 +489,8 @@ class GenericDiffractometer(HardwareObject):
         except Exception:
             pass
 
+        self.wait_motors_ready = self.get_property("wait_motors_ready", False)
+
         # Other parameters ---------------------------------------------------
         try:
             self.zoom_centre = eval(self.get_property("zoom_centre"))
@@ -620,10 +638,33 @@ class GenericDiffractometer(HardwareObject):
             DiffractometerState.Ready
         )
 
+    def _state_changed_notify(self, *args):
+        """Wake up the greenlets waiting for a state"""
+        self.state_events = True
+        self.state_changed_event.set()
+
+    def _wait_state(self, ready):
+        """Waits until the diffractometer readiness is the requested one.
+        Woken up by the state changes; the state is also checked every
+        STATE_POLL_PERIOD, or every NO_EVENT_POLL_PERIOD as long as no
+        minidiffStateChanged has been received (subclasses only setting
+        current_state).
+
+        :param ready: True to wait for ready, False for not ready
+        :type ready: bool
+        """
+        while True:
+            self.state_changed_event.clear()
+            if self.is_ready() == ready:
+                return
+            if self.state_events:
+                self.state_changed_event.wait(self.STATE_POLL_PERIOD)
+            else:
+                self.state_changed_event.wait(self.NO_EVENT_POLL_PERIOD)
+
     def wait_device_not_ready(self, timeout=5):
         with gevent.Timeout(timeout, Exception("Timeout waiting for device not ready")):
-            while self.is_ready():
-                time.sleep(0.01)
+            self._wait_state(False)
 
     def wait_device_ready(self, timeout=30):
         """Waits when diffractometer status is ready:
@@ -632,8 +673,7 @@ class GenericDiffractometer(HardwareObject):
         :type timeout: int
         """
         with gevent.Timeout(timeout, Exception("Timeout waiting for device ready")):
-            while not self.is_ready():
-                time.sleep(0.01)
+            self._wait_state(True)
 
     wait_ready = wait_device_ready
 
@@ -648,6 +688,7 @@ class GenericDiffractometer(HardwareObject):
         """
         # self.ready_event.clear()
         self.current_state = DiffractometerState.tostring(DiffractometerState.Busy)
+        self.state_changed_event.set()
         method(*args)
         time.sleep(5)
         # gevent.sleep(2)
@@ -761,8 +802,10 @@ class GenericDiffractometer(HardwareObject):
     # TODO rename to get_motor_positions
     def get_positions(self):
         """
-        Descript. :
+        Descript. : refreshes the motor positions, see refresh_motor_positions,
+                    and adds the beam position relative to the zoom centre
         """
+        self.refresh_motor_positions()
 
         self.current_motor_positions["beam_x"] = (
             self.beam_position[0] - self.zoom_centre["x"]
@@ -773,6 +816,51 @@ class GenericDiffractometer(HardwareObject):
 
         return self.current_motor_positions
 
+    def refresh_motor_positions(self):
+        """Read the positions of all the motors, see read_motor_values.
+        Returns:
+            (dict): motor_name: position
+        """
+        positions = dict(
+            zip(
+                self.motor_hwobj_dict,
+                self.read_motor_values(list(self.motor_hwobj_dict.values())),
+            )
+        )
+        self.current_motor_positions.update(positions)
+        return positions
+
+    def read_motor_values(self, motors):
+        """Read the positions of motors. Motors with an exporter position
+        channel are read together, with one burst of requests per exporter
+        server. Motors emit valueChanged if their position changed.
+        Args:
+            motors (list): Motor hardware objects
+        Returns:
+            (list): The position of each motor
+        """
+        values = [None] * len(motors)
+        exporter_motors = []
+        for idx, motor in enumerate(motors):
+            channel = getattr(motor, "motor_position_chan", None)
+            if isinstance(channel, ExporterChannel):
+                exporter_motors.append((idx, channel))
+            else:
+                values[idx] = motor.get_value()
+        if not exporter_motors:
+            return values
+
+        channel_values = read_channels([channel for _, channel in exporter_motors])
+        for (idx, _), value in zip(exporter_motors, channel_values):
+            motor = motors[idx]
+            if not isinstance(value, (int, float)) or math.isnan(value):
+                # not a valid position, let the motor deal with it
+                value = motor.get_value()
+            else:
+                motor.update_value(value)
+            values[idx] = value
+        return values
+
     def get_motors(self):
         """Get motor_name:Motor dictionary"""
         return self.motor_hwobj_dict.copy()
@@ -1035,46 +1123,74 @@ class GenericDiffractometer(HardwareObject):
 
     def motor_positions_to_screen(self, centred_positions_dict):
         """ """
-        if self.use_sample_centring:
-            self.update_zoom_calibration()
-            if None in (self.pixels_per_mm_x, self.pixels_per_mm_y):
-                return 0, 0
-            phi_angle = math.radians(
-                self.centring_phi.direction * self.centring_phi.get_value()
-            )
-            sampx = self.centring_sampx.direction * (
-                centred_positions_dict["sampx"] - self.centring_sampx.get_value()
-            )
-            sampy = self.centring_sampy.direction * (
-                centred_positions_dict["sampy"] - self.centring_sampy.get_value()
-            )
-            phiy = self.centring_phiy.direction * (
-                centred_positions_dict["phiy"] - self.centring_phiy.get_value()
-            )
-            phiz = self.centring_phiz.direction * (
-                centred_positions_dict["phiz"] - self.centring_phiz.get_value()
-            )
-            rot_matrix = numpy.matrix(
-                [
-                    math.cos(phi_angle),
-                    -math.sin(phi_angle),
-                    math.sin(phi_angle),
-                    math.cos(phi_angle),
-                ]
-            )
-            rot_matrix.shape = (2, 2)
-            inv_rot_matrix = numpy.array(rot_matrix.I)
-            dx, dy = (
-                numpy.dot(numpy.array([sampx, sampy]), inv_rot_matrix)
-                * self.pixels_per_mm_x
-            )
+        return self._project_motor_positions([centred_positions_dict])[0]
 
-            x = (phiy * self.pixels_per_mm_x) + self.beam_position[0]
-            y = dy + (phiz * self.pixels_per_mm_y) + self.beam_position[1]
+    def motor_positions_to_screen_batch(self, centred_positions_dicts):
+        """Converts a list of motor positions to screen coordinates.
+        The motors are read once and all the positions projected together.
+        Subclasses reimplementing motor_positions_to_screen get one
+        motor_positions_to_screen call per position.
 
-            return x, y
-        else:
+        :param centred_positions_dicts: motor positions dictionaries
+        :type centred_positions_dicts: list
+        :returns: list of (x, y) screen coordinates
+        """
+        if (
+            type(self).motor_positions_to_screen
+            is not GenericDiffractometer.motor_positions_to_screen
+        ):
+            return [
+                self.motor_positions_to_screen(centred_positions_dict)
+                for centred_positions_dict in centred_positions_dicts
+            ]
+        return self._project_motor_positions(centred_positions_dicts)
+
+    def _project_motor_positions(self, centred_positions_dicts):
+        """Projects motor positions on the screen, from a single motors snapshot
+
+        :param centred_positions_dicts: motor positions dictionaries
+        :type centred_positions_dicts: list
+        :returns: list of (x, y) screen coordinates
+        """
+        if not self.use_sample_centring:
             raise NotImplementedError
+        if not centred_positions_dicts:
+            return []
+
+        self.update_zoom_calibration()
+        if None in (self.pixels_per_mm_x, self.pixels_per_mm_y):
+            return [(0, 0)] * len(centred_positions_dicts)
+
+        motors = (
+            self.centring_sampx,
+            self.centring_sampy,
+            self.centring_phiy,
+            self.centring_phiz,
+        )
+        # one row per motor, one column per position
+        positions = numpy.array(
+            [
+                [pos[name] for name in ("sampx", "sampy", "phiy", "phiz")]
+                for pos in centred_positions_dicts
+            ],
+            dtype=float,
+        ).T
+        # single snapshot of the motors, for all the positions
+        values = self.read_motor_values(motors + (self.centring_phi,))
+        current = numpy.array(values[:-1], dtype=float)
+        directions = numpy.array([motor.direction for motor in motors], dtype=float)
+        sampx, sampy, phiy, phiz = directions[:, None] * (positions - current[:, None])
+
+        phi_angle = math.radians(self.centring_phi.direction * values[-1])
+        # (sampx, sampy) multiplied by the inverse of the phi rotation matrix
+        dy = (
+            sampx * math.sin(phi_angle) + sampy * math.cos(phi_angle)
+        ) * self.pixels_per_mm_x
+
+        x = (phiy * self.pixels_per_mm_x) + self.beam_position[0]
+        y = dy + (phiz * self.pixels_per_mm_y) + self.beam_position[1]
+
+        return list(zip(x.tolist(), y.tolist()))
 
     def move_to_centred_position(self, centred_position):
         """ """
@@ -1103,34 +1219,51 @@ class GenericDiffractometer(HardwareObject):
 
         self.wait_device_ready(timeout)
 
-        for motor in motor_positions.keys():
-            position = motor_positions[motor]
+        motors_positions = {}
+        for motor, position in motor_positions.items():
             self.log.debug(f"moving motor {motor} to position {position}")
-            """
             if isinstance(motor, (str, unicode)):
-                logging.getLogger("HWR").debug(" Moving %s to %s" % (motor, position))
-            else:
-                logging.getLogger("HWR").debug(
-                    " Moving %s to %s" % (str(motor.name()), position)
-                )
-            """
-            if isinstance(motor, (str, unicode)):
-                motor_role = motor
-                motor = self.motor_hwobj_dict.get(motor_role)
-                # del motor_positions[motor_role]
-                if None in (motor, position):
-                    continue
-                # motor_positions[motor] = position
-            motor.set_value(position)
-        self.wait_device_ready(timeout)
+                motor = self.motor_hwobj_dict.get(motor)
+            motors_positions[motor] = position
+
+        # all the motors are started, then waited for together. The end of
+        # the moves is the diffractometer ready state, unless the motors are
+        # moved one by one and wait_motors_ready is configured
+        start_move = None
+        wait_ready = self.wait_device_ready
+        if "startSimultaneousMoveMotors" in self.command_dict:
+            start_move = self.start_simultaneous_move
+        elif self.wait_motors_ready:
+            wait_ready = None
+        move_group = MoveGroup(motors_positions, start_move, wait_ready)
+        move_group.start()
 
         if self.delay_state_polling is not None and self.delay_state_polling > 0:
             # delay polling for state in the
             # case of controller not reporting MOVING inmediately after cmd
             gevent.sleep(self.delay_state_polling)
 
+        move_group.wait(timeout)
         self.wait_device_ready(timeout)
 
+    def start_simultaneous_move(self, motors_positions):
+        """
+        Starts the move of several motors with a single
+        startSimultaneousMoveMotors command
+
+        :param motors_positions: target position of each motor hwobj
+        :type motors_positions: dict
+        """
+        argin = ""
+        for motor, position in motors_positions.items():
+            actuator_name = motor.get_property("actuator_name")
+            if actuator_name is None:
+                motor.set_value(position)
+            else:
+                argin += "%s=%0.3f;" % (actuator_name, position)
+        if argin:
+            self.command_dict["startSimultaneousMoveMotors"](argin)
+
     def move_motors_done(self, move_motors_procedure):
         """
         Descript. :
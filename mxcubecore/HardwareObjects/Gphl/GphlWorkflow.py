@@ -41,7 +41,7 @@ import gevent.event
 import gevent.queue
 import f90nml
 
-from mxcubecore.dispatcher import dispatcher
+from mxcubecore.dispatcher import dispatcher, signal_bus
 from mxcubecore.BaseHardwareObjects import HardwareObjectYaml
 from mxcubecore.model import queue_model_objects
 from mxcubecore.model import crystal_symmetry
@@ -673,7 +673,7 @@ class GphlWorkflow(HardwareObjectYaml):
                 self.PARAMETER_RETURN_SIGNAL,
                 dispatcher.Any,
             )
-            responses = dispatcher.send(
+            responses = signal_bus.send(
                 self.PARAMETERS_NEEDED,
                 self,
                 schema,
@@ -809,12 +809,12 @@ class GphlWorkflow(HardwareObjectYaml):
             HWR.beamline.gphl_connection.software_paths["GPHL_WDIR"], "recen.nml"
         )
 
-        dispatcher.connect(
+        signal_bus.connect(
             self.handle_collection_start,
             "collectOscillationStarted",
             HWR.beamline.collect,
         )
-        dispatcher.connect(
+        signal_bus.connect(
             self.handle_collection_end,
             "collectOscillationFinished",
             HWR.beamline.collect,
@@ -848,12 +848,12 @@ class GphlWorkflow(HardwareObjectYaml):
                     if result_list is not None:
                         result_list.append((response, correlation_id))
         finally:
-            dispatcher.disconnect(
+            signal_bus.disconnect(
                 self.handle_collection_start,
                 "collectOscillationStarted",
                 HWR.beamline.collect,
             )
-            dispatcher.disconnect(
+            signal_bus.disconnect(
                 self.handle_collection_end,
                 "collectOscillationFinished",
                 HWR.beamline.collect,
@@ -1322,7 +1322,7 @@ class GphlWorkflow(HardwareObjectYaml):
                 self.PARAMETER_RETURN_SIGNAL,
                 dispatcher.Any,
             )
-            responses = dispatcher.send(
+            responses = signal_bus.send(
                 self.PARAMETERS_NEEDED,
                 self,
                 schema,
@@ -2790,7 +2790,7 @@ class GphlWorkflow(HardwareObjectYaml):
                     instruction,
                 )
             finally:
-                responses = dispatcher.send(
+                responses = signal_bus.send(
                     self.PARAMETER_UPDATE_SIGNAL,
                     self,
                     update_dict,
@@ -2839,7 +2839,7 @@ class GphlWorkflow(HardwareObjectYaml):
                     instruction,
                 )
             finally:
-                responses = dispatcher.send(
+                responses = signal_bus.send(
                     self.PARAMETER_UPDATE_SIGNAL,
                     self,
                     update_dict,
@@ -63,6 +63,8 @@ class ISPyBAbstractLIMS(AbstractLims):
             self.ws_username,
             self.ws_password,
             self.beamline_name,
+            wsdl_cache_dir=self.get_property("wsdl_cache_dir"),
+            wsdl_cache_days=self.get_property("wsdl_cache_days", 1),
         )
         logging.getLogger("HWR").debug("[ISPYB] Proxy address: %s" % self.proxy)
 
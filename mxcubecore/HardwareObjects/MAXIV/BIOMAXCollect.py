@@ -25,6 +25,7 @@ from EigerDataSet import EigerDataSet
 from mxcubecore.TaskUtils import task
 from mxcubecore.BaseHardwareObjects import HardwareObject
 from mxcubecore.HardwareObjects.abstract.AbstractCollect import AbstractCollect
+from mxcubecore.HardwareObjects.FileWatcher import get_file_watcher
 
 from mxcubecore import HardwareRepository as HWR
 
@@ -816,21 +817,14 @@ class BIOMAXCollect(AbstractCollect, HardwareObject):
             print(ex)
 
     def wait_for_file_copied(self, full_file_path):
+        file_watcher = get_file_watcher()
         # first wait for the file being created
-        with gevent.Timeout(
-            30, Exception("Timeout waiting for the data file available.")
-        ):
-            while not os.path.exists(full_file_path):
-                gevent.sleep(0.1)
+        if not file_watcher.wait_for(full_file_path, 30):
+            raise Exception("Timeout waiting for the data file available.")
 
         # then wait to finish the copy
-        size1 = -1
-        with gevent.Timeout(
-            300, Exception("Timeout waiting for the data to be copied available.")
-        ):
-            while size1 != os.path.getsize(full_file_path):
-                size1 = os.path.getsize(full_file_path)
-                gevent.sleep(1)
+        if not file_watcher.wait_for_stable_size(full_file_path, 300):
+            raise Exception("Timeout waiting for the data to be copied available.")
 
     def _store_image_in_lims(self, frame_number, motor_position_id=None):
         """
@@ -47,6 +47,8 @@ import math
 import logging
 from datetime import datetime
 
+import numpy as np
+
 from mxcubecore.utils import qt_import
 
 from mxcubecore.model import queue_model_objects
@@ -740,6 +742,7 @@ class GraphicsItemGrid(GraphicsItem):
         self.__draw_mode = False
         self.__draw_projection = False
         self.__coordinate_map = []
+        self.__col_row_index = None
 
         self.__osc_start = None
         self.__osc_range = 0.1
@@ -1510,6 +1513,55 @@ class GraphicsItemGrid(GraphicsItem):
         (line, image, pos_x, pos_y, col, row) = self.__coordinate_map[image_num]
         return col, row
 
+    def get_col_row_index(self):
+        """
+        Returns col and row of all the images, as two integer arrays
+        indexed by the image index (serial image number - first image number).
+        Same as get_col_row_from_image_serial for each image, computed once
+        for the grid geometry
+        :return: np.array, np.array
+        """
+        geometry = (
+            self.__num_cols,
+            self.__num_rows,
+            self.__num_lines,
+            self.__num_images_per_line,
+            self.__reversing_rotation,
+            tuple(self.grid_direction["fast"]),
+            tuple(self.grid_direction["slow"]),
+        )
+        if self.__col_row_index is None or self.__col_row_index[0] != geometry:
+            image_index = np.arange(self.__num_cols * self.__num_rows)
+            line = image_index // self.__num_images_per_line
+            image = image_index - line * self.__num_images_per_line
+
+            ref_fast = np.full(image_index.shape, 0.5)
+            if self.__num_images_per_line > 1:
+                ref_fast = 0.5 - image / float(self.__num_images_per_line - 1)
+            if self.__reversing_rotation:
+                ref_fast = np.where(line % 2, -ref_fast, ref_fast)
+            ref_slow = np.full(image_index.shape, 0.5)
+            if self.__num_lines > 1:
+                ref_slow = 0.5 - line / float(self.__num_lines - 1)
+
+            col = (
+                self.__num_cols / 2.0
+                + (self.__num_images_per_line - 1)
+                * self.grid_direction["fast"][0]
+                * ref_fast
+                + (self.__num_lines - 1) * self.grid_direction["slow"][0] * ref_slow
+            )
+            row = (
+                self.__num_rows / 2.0
+                + (self.__num_images_per_line - 1)
+                * self.grid_direction["fast"][1]
+                * ref_fast
+                + (self.__num_lines - 1) * self.grid_direction["slow"][1] * ref_slow
+            )
+            # astype truncates towards zero, as int() does
+            self.__col_row_index = (geometry, col.astype(int), row.astype(int))
+        return self.__col_row_index[1], self.__col_row_index[2]
+
     def get_col_row_from_line_image(self, line, image):
         """converts frame grid coordinates from scan grid "slow","fast") to screen grid
         ("col","raw"), i.e. rotates/inverts the scan coordinates
@@ -6,6 +6,11 @@ XML configuration for more details.
 The Queue manager acts as both the controller of execution and as the root/
 container of the queue, note the inheritance from QueueEntryContainer. See the
 documentation for the queue_entry module for more information.
+
+In lookahead mode (property lookahead set to True), the sample changer
+pre-stages the next sample to mount while the current one is collected, and
+the post-processing launched at the end of each sample runs in the background
+instead of delaying the next sample.
 """
 
 import logging
@@ -13,6 +18,7 @@ import gevent
 import traceback
 
 from mxcubecore import queue_entry
+from mxcubecore import HardwareRepository as HWR
 from mxcubecore.BaseHardwareObjects import HardwareObject
 from mxcubecore.queue_entry.base_queue_entry import QUEUE_ENTRY_STATUS
 from mxcubecore.model.queue_model_enumerables import CENTRING_METHOD
@@ -34,8 +40,11 @@ class QueueManager(HardwareObject, QueueEntryContainer):
         self._running = False
         self._disable_collect = False
         self._is_stopped = False
+        self.lookahead = False
+        self._prepare_load_task = None
 
     def init(self):
+        self.lookahead = self.get_property("lookahead", False)
         site_entry_path = self.get_property("site_entry_path")
         if site_entry_path:
             queue_entry.import_queue_entries(site_entry_path.split(","))
@@ -46,6 +55,7 @@ class QueueManager(HardwareObject, QueueEntryContainer):
         d = dict(self.__dict__)
         d["_root_task"] = None
         d["_paused_event"] = None
+        d["_prepare_load_task"] = None
         return d
 
     def __setstate__(self, d):
@@ -203,8 +213,14 @@ class QueueManager(HardwareObject, QueueEntryContainer):
             # Procedure to be done before main implementation
             # of task.
             entry.status = QUEUE_ENTRY_STATUS.RUNNING
+            is_sample_entry = isinstance(entry, base_queue_entry.SampleQueueEntry)
+            if is_sample_entry:
+                # the sample changer must be done with the pre-staging
+                self._wait_prepare_load()
             entry.pre_execute()
             entry.execute()
+            if is_sample_entry and self.lookahead:
+                self._start_prepare_load(entry)
 
             for child in entry._queue_entry_list:
                 self.__execute_entry(child)
@@ -260,6 +276,80 @@ class QueueManager(HardwareObject, QueueEntryContainer):
             self.set_current_entry(None)
             self._current_queue_entries.pop(self._current_queue_entries.index(entry))
 
+    def get_next_sample_entry(self, entry):
+        """
+        Gets the next sample entry to be mounted after <entry>, in execution
+        order.
+
+        :param entry: The current sample entry.
+        :type entry: SampleQueueEntry
+
+        :returns: The next SampleQueueEntry needing a mount, or None
+        :rtype: SampleQueueEntry
+        """
+        found = False
+        pending = list(reversed(self._queue_entry_list))
+        while pending:
+            qe = pending.pop()
+            if not qe.is_enabled():
+                continue
+            if isinstance(qe, base_queue_entry.SampleQueueEntry):
+                if found and qe.is_mount_needed():
+                    return qe
+                found = found or qe is entry
+            pending.extend(reversed(qe._queue_entry_list))
+        return None
+
+    def _start_prepare_load(self, entry):
+        """
+        Starts the pre-staging of the sample following <entry>.
+
+        :param entry: The sample entry being executed.
+        :type entry: SampleQueueEntry
+        """
+        next_entry = self.get_next_sample_entry(entry)
+        if next_entry is None:
+            return
+        loc_str = next_entry.get_data_model().loc_str
+        logging.getLogger("queue_exec").info("Pre-staging sample " + loc_str)
+        self._prepare_load_task = gevent.spawn(
+            HWR.beamline.sample_changer.prepare_load, loc_str
+        )
+
+    def _wait_prepare_load(self):
+        """
+        Waits for the end of the sample pre-staging, if any. A failed
+        pre-staging is only logged, the sample is then loaded normally.
+        """
+        task = self._prepare_load_task
+        self._prepare_load_task = None
+        if task is None:
+            return
+        try:
+            task.get()
+        except Exception:
+            logging.getLogger("HWR").exception("Sample pre-staging failed")
+
+    def run_post_processing(self, func, *args):
+        """
+        Runs a post-processing launch. In lookahead mode it runs in the
+        background, so that the queue can go on with the next entry.
+
+        :param func: The function launching the post-processing.
+        :type func: callable
+        """
+        if not self.lookahead:
+            return func(*args)
+
+        task = gevent.spawn(func, *args)
+        task.link_exception(self._post_processing_failed)
+        return task
+
+    def _post_processing_failed(self, task):
+        logging.getLogger("HWR").error(
+            "Post-processing launch failed: %s" % task.exception
+        )
+
     def stop(self):
         """
         Stops the queue execution.
@@ -282,6 +372,10 @@ class QueueManager(HardwareObject, QueueEntryContainer):
         if self._root_task:
             self._root_task.kill(block=False)
 
+        if self._prepare_load_task:
+            self._prepare_load_task.kill(block=False)
+            self._prepare_load_task = None
+
         self._queue_end()
 
     def _queue_end(self):
@@ -165,6 +165,7 @@ class QueueModel(HardwareObject):
             child._node_id = self._selected_model._total_node_count
             parent._children.append(child)
             child._set_name(child._name)
+            self._index_nodes(child)
             self.emit("child_added", (parent, child))
         else:
             raise TypeError("Expected type TaskNode, got %s " % str(type(child)))
@@ -193,14 +194,15 @@ class QueueModel(HardwareObject):
         :param _id: The id of the node to retrieve.
         :type _id: int
 
-        :param parent: parent node to search in.
+        :param parent: parent node to search in, the selected model is
+                       searched through its node index if None.
         :type parent: TaskNode
 
         :returns: The node with the id <_id>
         :rtype: TaskNode
         """
         if parent is None:
-            parent = self._selected_model
+            return self._selected_model._node_index.get(_id)
 
         for node in parent._children:
             if node._node_id == _id:
@@ -223,6 +225,7 @@ class QueueModel(HardwareObject):
         """
         if child in parent._children:
             parent._children.remove(child)
+            self._unindex_nodes(child)
             self.emit("child_removed", (parent, child))
 
     def _detach_child(self, parent, child):
@@ -232,10 +235,11 @@ class QueueModel(HardwareObject):
         :param child: Child to detach.
         :type child: TaskNode
 
-        :returns: None
-        :rtype: None
+        :returns: The detached child
+        :rtype: TaskNode
         """
-        child = parent._children.pop(child)
+        parent._children.remove(child)
+        self._unindex_nodes(child)
         return child
 
     def set_parent(self, parent, child):
@@ -248,11 +252,61 @@ class QueueModel(HardwareObject):
         :param child: The child
         :type child: TaskNode Object
         """
-        if child._parent:
-            self._detach_child(parent, child)
-            child.set_parent(parent)
-        else:
-            child._parent = parent
+        if child._parent and child in child._parent._children:
+            self._detach_child(child._parent, child)
+        child._parent = parent
+
+    def get_sample(self, location):
+        """
+        Retrieves the sample node at <location> in the selected model
+
+        :param location: Sample location, (basket number, sample number)
+        :type location: tuple
+
+        :returns: The sample node, None if there is none
+        :rtype: Sample
+        """
+        return self._selected_model._sample_index.get(tuple(location))
+
+    def _index_nodes(self, node):
+        """
+        Adds <node> and its descendants, and their path templates, to the
+        indexes of the selected model
+        """
+        root = self._selected_model
+        nodes = [node]
+        while nodes:
+            node = nodes.pop()
+            if node._node_id is not None:
+                root._node_index[node._node_id] = node
+            path_template = node.get_path_template()
+            if path_template is not None:
+                root._path_templates.add(path_template, node)
+            if (
+                isinstance(node, queue_model_objects.Sample)
+                and None not in node.location
+            ):
+                root._sample_index[tuple(node.location)] = node
+            nodes.extend(node._children)
+
+    def _unindex_nodes(self, node):
+        """
+        Removes <node> and its descendants from the indexes of the selected model
+        """
+        root = self._selected_model
+        nodes = [node]
+        while nodes:
+            node = nodes.pop()
+            if root._node_index.get(node._node_id) is node:
+                del root._node_index[node._node_id]
+            path_template = node.get_path_template()
+            if path_template is not None:
+                root._path_templates.remove(path_template, node)
+            if isinstance(node, queue_model_objects.Sample):
+                location = tuple(node.location)
+                if root._sample_index.get(location) is node:
+                    del root._sample_index[location]
+            nodes.extend(node._children)
 
     def view_created(self, view_item, task_model):
         """
@@ -303,19 +357,9 @@ class QueueModel(HardwareObject):
         :returns: The next available run number for the given path_template.
         :rtype: int
         """
-        all_path_templates = self.get_path_templates()
-        conflicting_path_templates = [0]
-
-        for pt in all_path_templates:
-            if exclude_current:
-                if pt[1] is not new_path_template:
-                    if pt[1] == new_path_template:
-                        conflicting_path_templates.append(pt[1].run_number)
-            else:
-                if pt[1] == new_path_template:
-                    conflicting_path_templates.append(pt[1].run_number)
-
-        return max(conflicting_path_templates) + 1
+        return self._selected_model._path_templates.get_next_run_number(
+            new_path_template, exclude_current
+        )
 
     def get_path_templates(self):
         """
@@ -349,15 +393,7 @@ class QueueModel(HardwareObject):
 
         :returns: True if there is a potential path collision.
         """
-        result = False
-        path_template_list = self.get_path_templates()
-
-        for pt in path_template_list:
-            if pt[1] is not new_path_template:
-                if new_path_template.intersection(pt[1]):
-                    result = True
-
-        return result
+        return self._selected_model._path_templates.has_collision(new_path_template)
 
     def copy_node(self, node):
         """
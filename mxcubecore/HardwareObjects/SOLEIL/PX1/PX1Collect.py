@@ -16,6 +16,7 @@ from mxcubecore.Command.Tango import DeviceProxy
 from mxcubecore.TaskUtils import task
 from mxcubecore.BaseHardwareObjects import HardwareObject
 from mxcubecore.HardwareObjects.abstract.AbstractCollect import AbstractCollect
+from mxcubecore.HardwareObjects.FileWatcher import get_file_watcher
 
 from SOLEILMergeImage import merge as merge_images
 
@@ -467,11 +468,8 @@ class PX1Collect(AbstractCollect, HardwareObject):
     ## FILE SYSTEM ##
     def wait_image_on_disk(self, filename, timeout=20.0):
         start_wait = time.time()
-        while not os.path.exists(filename):
-            if time.time() - start_wait > timeout:
-                logging.info("PX1Collect: Giving up waiting for image. Timeout")
-                break
-            time.sleep(0.1)
+        if not get_file_watcher().wait_for(filename, timeout):
+            logging.info("PX1Collect: Giving up waiting for image. Timeout")
         logging.info(
             "PX1Collect: Waiting for image %s ended in  %3.2f secs"
             % (filename, time.time() - start_wait)
@@ -29,6 +29,7 @@ from xabs_lib import McMaster
 from mxcubecore.Command.Tango import DeviceProxy
 
 from mxcubecore.BaseHardwareObjects import HardwareObject
+from mxcubecore.model.queue_model_objects import PathTemplate
 from mxcubecore import HardwareRepository as HWR
 
 
@@ -404,16 +405,14 @@ class PX1EnergyScan(AbstractEnergyScan, Equipment):
 
         self.log.info("EnergyScan. executing do_chooch")
 
+        i, _ = PathTemplate.get_next_free_name(
+            scan_directory, prefix + "_%d.raw", first=prefix + ".raw"
+        )
+        if i is not None:
+            prefix += "_%d" % i
         scan_file_prefix = os.path.join(scan_directory, prefix)
         archive_file_prefix = os.path.join(archive_directory, prefix)
 
-        if os.path.exists(scan_file_prefix + ".raw"):
-            i = 1
-            while os.path.exists(scan_file_prefix + "%d.raw" % i):
-                i = i + 1
-                scan_file_prefix += "_%d" % i
-                archive_file_prefix += "_%d" % i
-
         scan_file_raw_filename = os.path.extsep.join((scan_file_prefix, "raw"))
         archive_file_raw_filename = os.path.extsep.join((archive_file_prefix, "raw"))
 
@@ -386,7 +386,7 @@ class PX2Collect(AbstractCollect, HardwareObject):
         """
         image_id = None
         self.trigger_auto_processing("image", self.current_dc_parameters, frame)
-        image_id = self.store_image_in_lims(frame)
+        image_id = self.store_image_in_lims(frame, return_id=True)
         return image_id
 
     def stopCollect(self, owner="MXCuBE"):
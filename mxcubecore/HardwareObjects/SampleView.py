@@ -76,9 +76,31 @@ class SampleView(AbstractSampleView):
                 motor_ho.connect("stateChanged", self._update_shape_positions)
 
     def _update_shape_positions(self, *args, **kwargs):
-
-        for shape in self.get_shapes():
-            shape.update_position(HWR.beamline.diffractometer.motor_positions_to_screen)
+        diffractometer = HWR.beamline.diffractometer
+        shapes = self.get_shapes()
+
+        phi_pos = None
+        if any(isinstance(shape, Grid) for shape in shapes):
+            phi_pos = diffractometer.omega.get_value() % 360
+        shapes = [shape for shape in shapes if shape.update_visibility(phi_pos)]
+
+        # Project the centred positions of all the shapes at once, if the
+        # diffractometer can
+        mpos_list = [cp.as_dict() for shape in shapes for cp in shape.cp_list]
+        to_screen_batch = getattr(
+            diffractometer, "motor_positions_to_screen_batch", None
+        )
+        if to_screen_batch is not None:
+            spos_list = to_screen_batch(mpos_list)
+        else:
+            spos_list = [
+                diffractometer.motor_positions_to_screen(mpos) for mpos in mpos_list
+            ]
+        start = 0
+        for shape in shapes:
+            end = start + len(shape.cp_list)
+            shape.set_screen_position(spos_list[start:end])
+            start = end
 
         self.emit("shapesChanged")
 
@@ -489,9 +511,23 @@ class Shape(object):
         return self.selected
 
     def update_position(self, transform):
-        spos_list = [transform(cp.as_dict()) for cp in self.cp_list]
-        spos_list = tuple([pos for l in spos_list for pos in l])
-        self.screen_coord = spos_list
+        self.set_screen_position([transform(cp.as_dict()) for cp in self.cp_list])
+
+    def set_screen_position(self, spos_list):
+        """
+        :param spos_list: Screen coordinates (x, y) of the centred positions
+        :type spos_list: list
+        """
+        self.screen_coord = tuple([pos for l in spos_list for pos in l])
+
+    def update_visibility(self, phi_pos):
+        """
+        :param phi_pos: Current omega position, modulo 360
+        :type phi_pos: float
+        :returns: True if the shape is shown at this omega position
+        :rtype: bool
+        """
+        return True
 
     def add_cp_from_mp(self, mpos_list):
         for mp in mpos_list:
@@ -624,13 +660,19 @@ class Grid(Shape):
 
     def update_position(self, transform):
         phi_pos = HWR.beamline.diffractometer.omega.get_value() % 360
+
+        if self.update_visibility(phi_pos):
+            super(Grid, self).update_position(transform)
+
+    def update_visibility(self, phi_pos):
         _d = abs((self.get_centred_position().phi % 360) - phi_pos)
 
         if min(_d, 360 - _d) > self.shapes_hw_object.hide_grid_threshold:
             self.state = "HIDDEN"
-        else:
-            super(Grid, self).update_position(transform)
-            self.state = "SAVED"
+            return False
+
+        self.state = "SAVED"
+        return True
 
     def get_centred_position(self):
         return self.cp_list[0]
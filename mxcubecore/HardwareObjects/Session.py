@@ -266,6 +266,24 @@ class Session(HardwareObject):
 
         return self.get_image_directory(subdir), self.get_process_directory(subdir)
 
+    def get_next_free_name(
+        self, directory: str, pattern: str, first: str = None, create: str = None
+    ) -> Tuple[int, str]:
+        """
+        Returns the next free name of a numbered series in directory,
+        see PathTemplate.get_next_free_name
+
+        :param directory: directory of the name
+        :param pattern: name with a %-format for the index, e.g. "run_%d"
+        :param first: name tried before the numbered ones, e.g. "run"
+        :param create: None, "file" or "directory" to create the name
+
+        :returns: Tuple with the index (None for first) and the name
+        """
+        return PathTemplate.get_next_free_name(
+            directory, pattern, first=first, create=create
+        )
+
     def get_default_prefix(self, sample_data_node=None, generic_name=False):
         """
         Returns the default prefix, using sample data such as the
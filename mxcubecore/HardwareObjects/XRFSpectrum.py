@@ -6,6 +6,7 @@ import gevent.event
 import gevent
 from mxcubecore import HardwareRepository as HWR
 from mxcubecore.BaseHardwareObjects import HardwareObject
+from mxcubecore.model.queue_model_objects import PathTemplate
 
 
 class XRFSpectrum(HardwareObject):
@@ -143,17 +144,11 @@ class XRFSpectrum(HardwareObject):
                 return False
 
         _pattern = "%s_%s_%%02d" % (prefix, time.strftime("%d_%b_%Y"))
-        filename_pattern = os.path.join(directory, _pattern)
-
-        filename_pattern = os.path.extsep.join((filename_pattern, "dat"))
-        filename = filename_pattern % 1
-        fileprefix = _pattern % 1
-
-        i = 2
-        while os.path.isfile(filename):
-            filename = filename_pattern % i
-            fileprefix = _pattern % i
-            i = i + 1
+        i, _ = PathTemplate.get_next_free_name(
+            directory, os.path.extsep.join((_pattern, "dat"))
+        )
+        fileprefix = _pattern % i
+        filename = os.path.extsep.join((os.path.join(directory, fileprefix), "dat"))
 
         archive_path = os.path.join(archive_directory, fileprefix)
         self.spectrumInfo["filename"] = filename
@@ -29,11 +29,13 @@ import time
 import errno
 import abc
 import collections
+import functools
 import gevent
 import gevent.event
 from mxcubecore.TaskUtils import task
 from mxcubecore.BaseHardwareObjects import HardwareObject
 from mxcubecore import HardwareRepository as HWR
+from mxcubecore.utils.lims_writer import LimsWriteQueue
 
 
 __credits__ = ["MXCuBE collaboration"]
@@ -63,6 +65,10 @@ BeamlineConfig = collections.namedtuple(
     ],
 )
 
+# Step preparing a data collection: name, function called without arguments and
+# names of the steps which must be done before
+SetupStep = collections.namedtuple("SetupStep", ["name", "function", "depends"])
+
 
 class AbstractCollect(HardwareObject, object):
     __metaclass__ = abc.ABCMeta
@@ -83,9 +89,18 @@ class AbstractCollect(HardwareObject, object):
         self.run_offline_processing = None
         self.run_online_processing = None
         self.ready_event = None
+        self.parallel_setup = False
+        self.lims_writer = None
 
     def init(self):
         self.ready_event = gevent.event.Event()
+        self.parallel_setup = self.get_property("parallel_setup", False)
+        if self.get_property("lims_write_behind", False):
+            # Data collection updates and images are sent to the LIMS
+            # in the background, out of the acquisition
+            self.lims_writer = LimsWriteQueue(
+                spool_file=self.get_property("lims_spool_file")
+            )
 
         undulators = []
         try:
@@ -158,13 +173,6 @@ class AbstractCollect(HardwareObject, object):
             # ----------------------------------------------------------------
             # Prepare data collection
 
-            self.open_detector_cover()
-            self.open_safety_shutter()
-            self.open_fast_shutter()
-
-            # ----------------------------------------------------------------
-            # Store information in LIMS
-
             self.current_dc_parameters["status"] = "Running"
             self.current_dc_parameters["collection_start_time"] = time.strftime(
                 "%Y-%m-%d %H:%M:%S"
@@ -174,89 +182,7 @@ class AbstractCollect(HardwareObject, object):
                 "Collection parameters: %s" % str(self.current_dc_parameters)
             )
 
-            log.info("Collection: Storing data collection in LIMS")
-            self.store_data_collection_in_lims()
-
-            log.info(
-                "Collection: Creating directories for raw images and processing files"
-            )
-            self.create_file_directories()
-
-            log.info("Collection: Getting sample info from parameters")
-            self.get_sample_info()
-
-            log.info("Collection: Storing sample info in LIMS")
-            self.store_sample_info_in_lims()
-
-            if all(
-                item is None for item in self.current_dc_parameters["motors"].values()
-            ):
-                # No centring point defined
-                # create point based on the current position
-                current_diffractometer_position = (
-                    HWR.beamline.diffractometer.get_positions()
-                )
-                for motor in self.current_dc_parameters["motors"].keys():
-                    self.current_dc_parameters["motors"][
-                        motor
-                    ] = current_diffractometer_position.get(motor)
-
-            # ----------------------------------------------------------------
-            # Move to the centered position and take crystal snapshots
-
-            log.info("Collection: Moving to centred position")
-            self.move_to_centered_position()
-            self.take_crystal_snapshots()
-            self.move_to_centered_position()
-
-            # ----------------------------------------------------------------
-            # Set data collection parameters
-
-            if "transmission" in self.current_dc_parameters:
-                log.info(
-                    "Collection: Setting transmission to %.2f",
-                    self.current_dc_parameters["transmission"],
-                )
-                self.set_transmission(self.current_dc_parameters["transmission"])
-
-            wavelength = self.current_dc_parameters.get("wavelength")
-            energy = self.current_dc_parameters.get("energy")
-            detector_distance = self.current_dc_parameters.get("detector_distance")
-            try:
-               resolution = self.current_dc_parameters.get("resolution").get("upper")
-            except AttributeError:
-               resolution = None
-
-            if wavelength:
-                # Wavelength (not having a default) overrides energy
-                log.info(
-                    "Collection: Setting wavelength to %.4f",
-                    self.current_dc_parameters["wavelength"],
-                )
-                energy = HWR.beamline.energy.calculate_energy(wavelength)
-            elif energy:
-                log.info(
-                    "Collection: Setting energy to %.4f",
-                    self.current_dc_parameters["energy"],
-                )
-                wavelength = HWR.beamline.energy.calculate_wavelength(energy)
-            if energy:
-                self.set_energy(energy)
-
-            if detector_distance:
-                # detector_distance (not having a default) overrides resolution
-                resolution = HWR.beamline.resolution.distance_to_resolution(
-                    detector_distance, wavelength
-                )
-                log.info(
-                    "Collection: Setting detector distance to %.2f", detector_distance,
-                )
-                self.set_resolution(resolution)
-            elif resolution:
-                log.info(
-                    "Collection: Setting resolution to %.2f", resolution,
-                )
-                self.set_resolution(resolution)
+            self.run_setup_steps(self.get_setup_steps())
 
             # ----------------------------------------------------------------
             # Site specific implementation of a data collection
@@ -280,6 +206,201 @@ class AbstractCollect(HardwareObject, object):
             self.collection_finished()
         finally:
             self.data_collection_cleanup()
+            self.flush_background_writes()
+
+    def get_setup_steps(self):
+        """
+        Steps preparing the beamline for the current data collection.
+        Steps which do not depend on each other (e.g. the LIMS store, the
+        safety shutter opening and the energy change) are run concurrently
+        if the parallel_setup property is True.
+        Sites can add dependencies to steps which must not overlap, or
+        remove, replace and add steps.
+
+        :returns: setup steps, each one after the steps it depends on
+        :rtype: list of SetupStep
+        """
+        params = self.current_dc_parameters
+        steps = [
+            SetupStep("open_detector_cover", self.open_detector_cover, ()),
+            SetupStep("open_safety_shutter", self.open_safety_shutter, ()),
+            SetupStep(
+                "open_fast_shutter",
+                self.open_fast_shutter,
+                ("open_detector_cover", "open_safety_shutter"),
+            ),
+            SetupStep("store_data_collection_in_lims", self._setup_store_in_lims, ()),
+            SetupStep("create_file_directories", self._setup_directories, ()),
+            SetupStep("get_sample_info", self.get_sample_info, ()),
+            SetupStep(
+                "store_sample_info_in_lims",
+                self.store_sample_info_in_lims,
+                ("store_data_collection_in_lims", "get_sample_info"),
+            ),
+            SetupStep("move_to_centered_position", self._setup_centring, ()),
+            SetupStep(
+                "take_crystal_snapshots",
+                self.take_crystal_snapshots,
+                ("move_to_centered_position", "create_file_directories"),
+            ),
+            SetupStep(
+                "return_to_centered_position",
+                self.move_to_centered_position,
+                ("take_crystal_snapshots",),
+            ),
+        ]
+
+        if "transmission" in params:
+            steps.append(
+                SetupStep(
+                    "set_transmission",
+                    functools.partial(self._setup_transmission, params["transmission"]),
+                    (),
+                )
+            )
+
+        wavelength = params.get("wavelength")
+        energy = params.get("energy")
+        detector_distance = params.get("detector_distance")
+        try:
+            resolution = params.get("resolution").get("upper")
+        except AttributeError:
+            resolution = None
+
+        if wavelength:
+            # Wavelength (not having a default) overrides energy
+            energy = HWR.beamline.energy.calculate_energy(wavelength)
+            step = functools.partial(self._setup_energy, energy, wavelength)
+        elif energy:
+            wavelength = HWR.beamline.energy.calculate_wavelength(energy)
+            step = functools.partial(self._setup_energy, energy)
+        if energy:
+            steps.append(SetupStep("set_energy", step, ()))
+
+        if detector_distance:
+            # detector_distance (not having a default) overrides resolution
+            resolution = HWR.beamline.resolution.distance_to_resolution(
+                detector_distance, wavelength
+            )
+        if resolution:
+            # The resolution is converted to a distance at the new energy
+            steps.append(
+                SetupStep(
+                    "set_resolution",
+                    functools.partial(
+                        self._setup_resolution, resolution, detector_distance
+                    ),
+                    ("set_energy",) if energy else (),
+                )
+            )
+
+        return steps
+
+    def run_setup_steps(self, steps):
+        """
+        Run the data collection setup steps, each one as soon as the steps
+        it depends on are done, or one after the other if the parallel_setup
+        property is False. The duration of each step [s] is recorded in the
+        setup_step_times collection parameter.
+
+        :param steps: setup steps, each one after the steps it depends on
+        :type steps: list of SetupStep
+        :raises ValueError: a step depends on an unknown or a later step
+        """
+        step_times = collections.OrderedDict()
+        self.current_dc_parameters["setup_step_times"] = step_times
+        start_time = time.monotonic()
+        tasks = collections.OrderedDict()
+        try:
+            for step in steps:
+                unknown = [name for name in step.depends if name not in tasks]
+                if unknown:
+                    raise ValueError(
+                        "Setup step %s depends on unknown steps %s"
+                        % (step.name, ", ".join(unknown))
+                    )
+                if self.parallel_setup:
+                    depends = [tasks[name] for name in step.depends]
+                    tasks[step.name] = gevent.spawn(
+                        self._run_setup_step, step, depends, step_times
+                    )
+                else:
+                    self._run_setup_step(step, (), step_times)
+                    tasks[step.name] = None
+            if self.parallel_setup:
+                gevent.joinall(list(tasks.values()), raise_error=True)
+        finally:
+            if self.parallel_setup:
+                gevent.killall(list(tasks.values()))
+
+        logging.getLogger("HWR").info(
+            "Collection: setup done in %.3f s (%s)",
+            time.monotonic() - start_time,
+            ", ".join("%s %.3f s" % item for item in step_times.items()),
+        )
+
+    def _run_setup_step(self, step, depends, step_times):
+        gevent.joinall(depends, raise_error=True)
+        start_time = time.monotonic()
+        step.function()
+        step_times[step.name] = time.monotonic() - start_time
+
+    def _setup_store_in_lims(self):
+        logging.getLogger("user_level_log").info(
+            "Collection: Storing data collection in LIMS"
+        )
+        self.store_data_collection_in_lims()
+
+    def _setup_transmission(self, transmission):
+        logging.getLogger("user_level_log").info(
+            "Collection: Setting transmission to %.2f", transmission
+        )
+        self.set_transmission(transmission)
+
+    def _setup_energy(self, energy, wavelength=None):
+        if wavelength:
+            logging.getLogger("user_level_log").info(
+                "Collection: Setting wavelength to %.4f", wavelength
+            )
+        else:
+            logging.getLogger("user_level_log").info(
+                "Collection: Setting energy to %.4f", energy
+            )
+        self.set_energy(energy)
+
+    def _setup_resolution(self, resolution, detector_distance=None):
+        if detector_distance:
+            logging.getLogger("user_level_log").info(
+                "Collection: Setting detector distance to %.2f", detector_distance
+            )
+        else:
+            logging.getLogger("user_level_log").info(
+                "Collection: Setting resolution to %.2f", resolution
+            )
+        self.set_resolution(resolution)
+
+    def _setup_directories(self):
+        logging.getLogger("user_level_log").info(
+            "Collection: Creating directories for raw images and processing files"
+        )
+        self.create_file_directories()
+
+    def _setup_centring(self):
+        if all(item is None for item in self.current_dc_parameters["motors"].values()):
+            # No centring point defined
+            # create point based on the current position
+            current_diffractometer_position = (
+                HWR.beamline.diffractometer.get_positions()
+            )
+            for motor in self.current_dc_parameters["motors"].keys():
+                self.current_dc_parameters["motors"][
+                    motor
+                ] = current_diffractometer_position.get(motor)
+
+        logging.getLogger("user_level_log").info(
+            "Collection: Moving to centred position"
+        )
+        self.move_to_centered_position()
 
     def data_collection_cleanup(self):
         """
@@ -289,6 +410,18 @@ class AbstractCollect(HardwareObject, object):
         self.close_safety_shutter()
         self.close_detector_cover()
 
+    def flush_background_writes(self):
+        """
+        Waits, at the end of a collection, for the LIMS records still queued,
+        at most background_flush_timeout [s].
+        """
+        timeout = float(self.get_property("background_flush_timeout", 60))
+        if self.lims_writer is not None and not self.lims_writer.flush(timeout):
+            logging.getLogger("HWR").warning(
+                "LIMS writer: %d records not sent at the end of the collection",
+                self.lims_writer.pending,
+            )
+
     def collection_failed(self, failed_msg=None):
         """Collection failed method"""
 
@@ -620,6 +753,9 @@ class AbstractCollect(HardwareObject, object):
             hor_gap, vert_gap = self.get_slit_gaps()
             params["slitGapHorizontal"] = hor_gap
             params["slitGapVertical"] = vert_gap
+            if self.lims_writer is not None:
+                self.lims_writer.submit("update_data_collection", params)
+                return
             try:
                 HWR.beamline.lims.update_data_collection(params)
             except BaseException:
@@ -635,9 +771,15 @@ class AbstractCollect(HardwareObject, object):
         if lims and lims.is_connected() and not self.current_dc_parameters["in_interleave"]:
             HWR.beamline.lims.update_bl_sample(self.current_lims_sample)
 
-    def store_image_in_lims(self, frame_number, motor_position_id=None):
+    def store_image_in_lims(self, frame_number, motor_position_id=None, return_id=False):
         """
-        Descript. :
+        Stores the image in LIMS.
+        With the LIMS writer, the image is stored in the background and
+        None is returned, unless return_id is True.
+
+        :param return_id: store the image at once, to return its id
+        :type return_id: bool
+        :returns: the LIMS image id
         """
         lims = HWR.beamline.lims
         if lims and lims.is_connected() and not self.current_dc_parameters["in_interleave"]:
@@ -674,6 +816,9 @@ class AbstractCollect(HardwareObject, object):
                 lims_image["jpegThumbnailFileFullPath"] = jpeg_thumbnail_full_path
             if motor_position_id:
                 lims_image["motorPositionId"] = motor_position_id
+            if self.lims_writer is not None and not return_id:
+                self.lims_writer.submit("store_image", lims_image)
+                return None
             image_id = HWR.beamline.lims.store_image(lims_image)
             return image_id
 
@@ -11,6 +11,8 @@ import autoprocessing
 import gevent
 import socket
 from mxcubecore.TaskUtils import task, cleanup, error_cleanup
+from mxcubecore.utils.image_preview import ImagePreviewService, make_jpeg
+from mxcubecore.utils.lims_writer import LimsWriteQueue
 
 from mxcubecore import HardwareRepository as HWR
 
@@ -84,6 +86,8 @@ class AbstractMultiCollect(object):
         self.mesh_center = None
 
         self.number_of_snapshots = 4
+        self.image_preview = None
+        self.lims_writer = None
 
     def setControlObjects(self, **control_objects):
         self.bl_control = BeamlineControl(**control_objects)
@@ -284,6 +288,67 @@ class AbstractMultiCollect(object):
                 if e.errno != errno.EEXIST:
                     raise
 
+    def get_image_preview(self):
+        """
+        Returns the service making the JPEG previews of the frames and
+        storing the frames in LIMS, in the background.
+
+        With the jpeg_processes property > 0 the previews are made locally,
+        by make_jpeg in that many processes, otherwise by generate_image_jpeg,
+        called by jpeg_workers greenlets.
+
+        Returns:
+            (ImagePreviewService): The image preview service
+        """
+        if self.image_preview is None:
+            processes = int(self.get_property("jpeg_processes", 0))
+            if processes:
+                convert = make_jpeg
+            else:
+                convert = self._generate_image_jpeg
+            self.image_preview = ImagePreviewService(
+                convert,
+                processes=processes,
+                workers=int(self.get_property("jpeg_workers", 4)),
+                max_pending=int(self.get_property("jpeg_queue_size", 100)),
+                lims_writer=self.get_lims_writer(),
+            )
+        return self.image_preview
+
+    def get_lims_writer(self):
+        """
+        Returns the queue storing the records of the collection in LIMS in
+        the background, shared by the image previews.
+
+        Returns:
+            (LimsWriteQueue): The LIMS write-behind queue
+        """
+        if self.lims_writer is None:
+            self.lims_writer = LimsWriteQueue(
+                spool_file=self.get_property("lims_spool_file")
+            )
+        return self.lims_writer
+
+    def flush_background_writes(self):
+        """
+        Waits, at the end of a collection, for the JPEG previews and the LIMS
+        records still queued, at most background_flush_timeout [s] for each.
+        """
+        timeout = float(self.get_property("background_flush_timeout", 60))
+        if self.image_preview is not None and not self.image_preview.flush(timeout):
+            logging.getLogger("HWR").warning(
+                "Image preview: %d frames not converted at the end of the collection",
+                self.image_preview.pending,
+            )
+        if self.lims_writer is not None and not self.lims_writer.flush(timeout):
+            logging.getLogger("HWR").warning(
+                "LIMS writer: %d records not sent at the end of the collection",
+                self.lims_writer.pending,
+            )
+
+    def _generate_image_jpeg(self, filename, jpeg_path, jpeg_thumbnail_path):
+        self.generate_image_jpeg(filename, jpeg_path, jpeg_thumbnail_path, wait=True)
+
     def adxv_notify(self, image_filename: str, image_num: int = 1):
         """
         Notify ADXV of new image
@@ -793,7 +858,7 @@ class AbstractMultiCollect(object):
         # 0: software binned, 1: unbinned, 2:hw binned
         # self.set_detector_mode(data_collect_parameters["detector_mode"])
 
-        with cleanup(self.data_collection_cleanup):
+        with cleanup(self.data_collection_cleanup, self.flush_background_writes):
             # if not self.safety_shutter_opened():
             self.open_safety_shutter()
 
@@ -988,18 +1053,13 @@ class AbstractMultiCollect(object):
                                         jpeg_thumbnail_full_path
                                     )
 
-                                try:
-                                    HWR.beamline.lims.store_image(lims_image)
-                                except Exception:
-                                    logging.getLogger("HWR").exception(
-                                        "Could not store store image in LIMS"
-                                    )
-
-                                self.generate_image_jpeg(
+                                # JPEG made and image stored in LIMS in the
+                                # background
+                                self.get_image_preview().frame_ready(
                                     str(file_path),
                                     str(jpeg_full_path),
                                     str(jpeg_thumbnail_full_path),
-                                    wait=False,
+                                    lims_image,
                                 )
 
                         if data_collect_parameters.get("processing", False) == "True":
@@ -88,6 +88,7 @@ class AbstractOnlineProcessing(HardwareObject):
 
         self.current_grid_index = None
         self.grid_properties = []
+        self.grid_col_row_index = None
 
     def init(self):
         self.done_event = gevent.event.Event()
@@ -111,6 +112,7 @@ class AbstractOnlineProcessing(HardwareObject):
         acquisition = self.data_collection.acquisitions[0]
         acq_params = acquisition.acquisition_parameters
         self.grid = self.data_collection.grid
+        self.grid_col_row_index = None
 
         grid_params = None
         if self.grid:
@@ -726,22 +728,13 @@ class AbstractOnlineProcessing(HardwareObject):
         """
         # Each result array is realigned
 
+        indexes = np.arange(start_index, end_index + 1)
         for score_key in self.results_raw:
             if (
                 self.grid
                 and self.results_raw[score_key].size == self.params_dict["images_num"]
             ):
-                for cell_index in range(start_index, end_index + 1):
-                    col, row = self.grid.get_col_row_from_image_serial(
-                        cell_index + self.params_dict["first_image_num"]
-                    )
-                    if (
-                        col < self.results_aligned[score_key].shape[0]
-                        and row < self.results_aligned[score_key].shape[1]
-                    ):
-                        self.results_aligned[score_key][col][row] = self.results_raw[
-                            score_key
-                        ][cell_index]
+                self.align_results(score_key, indexes)
             else:
                 self.results_aligned[score_key] = self.results_raw[score_key]
                 if self.interpolate_results:
@@ -829,6 +822,59 @@ class AbstractOnlineProcessing(HardwareObject):
 
         self.results_aligned["best_positions"] = best_positions_list
 
+    def get_grid_col_row_index(self):
+        """Returns the grid column and row of each image, as two integer
+        numpy arrays indexed by the image index (from 0).
+        Computed once per processing, by the grid if it can, otherwise
+        with get_col_row_from_image_serial for each image.
+
+        :return: columns and rows
+        :rtype: tuple
+        """
+        if self.grid_col_row_index is None:
+            if hasattr(self.grid, "get_col_row_index"):
+                cols, rows = self.grid.get_col_row_index()
+            else:
+                first_image_num = self.params_dict["first_image_num"]
+                cols_rows = [
+                    self.grid.get_col_row_from_image_serial(index + first_image_num)
+                    for index in range(self.params_dict["images_num"])
+                ]
+                cols_rows = np.array(cols_rows, dtype=int).reshape(-1, 2)
+                cols, rows = cols_rows[:, 0], cols_rows[:, 1]
+            self.grid_col_row_index = (cols, rows)
+        return self.grid_col_row_index
+
+    def align_results(self, score_key, indexes):
+        """Copies raw results of several images to the aligned results,
+        at their grid column and row if the aligned results are two
+        dimensional. Images outside the grid or the results are skipped.
+
+        :param score_key: result key
+        :type score_key: str
+        :param indexes: image indexes (from 0)
+        :type indexes: numpy array of int
+        """
+        raw = self.results_raw[score_key]
+        aligned = self.results_aligned[score_key]
+        indexes = np.asarray(indexes, dtype=int)
+
+        if aligned.ndim == 2 and self.grid:
+            cols, rows = self.get_grid_col_row_index()
+            indexes = indexes[(indexes >= 0) & (indexes < min(raw.size, cols.size))]
+            cols = cols[indexes]
+            rows = rows[indexes]
+            inside = (
+                (cols >= 0)
+                & (cols < aligned.shape[0])
+                & (rows >= 0)
+                & (rows < aligned.shape[1])
+            )
+            aligned[cols[inside], rows[inside]] = raw[indexes[inside]]
+        else:
+            indexes = indexes[(indexes >= 0) & (indexes < min(raw.size, aligned.size))]
+            aligned[indexes] = raw[indexes]
+
     def extract_sweeps(self):
         """Extracts sweeps from processing results"""
 
@@ -621,6 +621,22 @@ class SampleChanger(Container, HardwareObject):
         self.wait_ready(timeout=10)
         return self.load(sample_to_load)
 
+    def prepare_load(self, sample):
+        """
+        Pre-stage the next sample to load while the current one is still in use,
+        e.g. pick it with the second gripper of a double gripper, so that the
+        following load is shorter. Sample changers without such a feature
+        return at once. Loading another sample afterwards must still work.
+
+        Args:
+            sample (tuple): sample address on the form
+                            (component1, ... ,component_N-1, component_N)
+        Returns:
+            (boolean): True if the sample was pre-staged, False otherwise
+        """
+        sample = self._resolve_component(sample)
+        return self._do_prepare_load(sample)
+
     def load(self, sample=None, wait=True):
         """
         Load a sample.
@@ -691,6 +707,12 @@ class SampleChanger(Container, HardwareObject):
     def _unload(self, sample_slot=None):
         self._do_unload(sample_slot)
 
+    def _do_prepare_load(self, sample):
+        """
+        Pre-stage sample for the next load, not supported by default
+        """
+        return False
+
     def _resolve_component(self, component):
         if component is not None and isinstance(component, str):
             comp = self.get_component_by_address(component)
@@ -6,6 +6,7 @@ from typing import List, Dict
 from mxcubecore.HardwareObjects.abstract.ISPyBValueFactory import (
     ISPyBValueFactory,
 )
+from mxcubecore.utils.config_cache import is_private_file, make_private_directory
 from mxcubecore.utils.conversion import string_types
 
 try:
@@ -23,8 +24,14 @@ from mxcubecore.model.lims_session import (
 )
 from suds.sudsobject import asdict
 from suds import WebFault
+from suds.cache import ObjectCache
 from suds.client import Client
+from suds.transport import Reply, Transport, TransportError
+import io
 import logging
+import os
+import re
+import requests
 import sys
 
 suds_encode = str.encode
@@ -68,6 +75,105 @@ def utf_decode(res_d):
     return res_d
 
 
+# Default directory of the parsed WSDL cache, kept between starts
+WSDL_CACHE_DIR = os.path.join("~", ".cache", "mxcube", "wsdl")
+
+# Name of the operation called by a SOAP message: first element of the body
+SOAP_OPERATION = re.compile(rb"<(?:[\w.-]+:)?Body[^>]*>\s*<(?:[\w.-]+:)?([\w.-]+)")
+
+
+class PooledTransport(Transport):
+    """
+    suds transport sending the requests with a requests.Session, so that the
+    HTTP connections are kept alive and shared by the clients of the session.
+    The duration of each SOAP call is recorded by operation name.
+    """
+
+    def __init__(self, session: requests.Session, call_times: dict):
+        """
+        Args:
+            session: HTTP session, holding the connection pool and credentials.
+            call_times: SOAP call times [s], as [count, total, max] by operation.
+        """
+        Transport.__init__(self)
+        self.session = session
+        self.call_times = call_times
+        self.logger = logging.getLogger("ispyb_adapter")
+
+    def open(self, request):
+        response = self._request("GET", request)
+        return io.BytesIO(response.content)
+
+    def send(self, request):
+        match = SOAP_OPERATION.search(request.message or b"")
+        operation = match.group(1).decode() if match else request.url
+
+        start_time = time.monotonic()
+        response = self._request("POST", request)
+        call_time = time.monotonic() - start_time
+
+        times = self.call_times.setdefault(operation, [0, 0.0, 0.0])
+        times[0] += 1
+        times[1] += call_time
+        times[2] = max(times[2], call_time)
+        self.logger.debug("SOAP call %s took %.3f s", operation, call_time)
+
+        if response.status_code in (202, 204):
+            # No reply, the suds client expects a TransportError, as raised by
+            # the default suds transport
+            raise TransportError(
+                response.reason, response.status_code, io.BytesIO(response.content)
+            )
+        return Reply(200, response.headers, response.content)
+
+    def _request(self, method: str, request):
+        try:
+            response = self.session.request(
+                method,
+                request.url,
+                data=request.message,
+                headers=request.headers,
+                timeout=self.options.timeout,
+                proxies=self.options.proxy or None,
+            )
+        except requests.RequestException as e:
+            # As urllib, used by the default suds transport
+            raise URLError(e)
+        if response.status_code >= 400:
+            raise TransportError(
+                response.reason, response.status_code, io.BytesIO(response.content)
+            )
+        return response
+
+
+class PrivateObjectCache(ObjectCache):
+    """
+    suds cache of pickled objects in a directory private to the user.
+    The cache files which are not owned by the user, or are writable by
+    others, are not loaded.
+    """
+
+    def __init__(self, location: str, **duration):
+        """
+        Args:
+            location: Cache directory, created if needed.
+            duration: Lifetime of the entries, e.g. days=1.
+        Raises:
+            PermissionError: The directory belongs to another user.
+        """
+        ObjectCache.__init__(self, make_private_directory(location), **duration)
+
+    def open(self, fn, *args):
+        fp0 = ObjectCache.open(self, fn, *args)
+        if not is_private_file(os.fstat(fp0.fileno())):
+            fp0.close()
+            # suds ignores the entry, and removes it when reading
+            raise PermissionError(
+                "WSDL cache file %s not owned by the user or writable by others" % fn
+            )
+        return fp0
+
+
 class ISPyBDataAdapter:
     def __init__(
         self,
@@ -76,7 +182,16 @@ class ISPyBDataAdapter:
         ws_username: str,
         ws_password: str,
         beamline_name: str,
+        wsdl_cache_dir: str = None,
+        wsdl_cache_days: float = 1,
     ):
+        """
+        Args:
+            wsdl_cache_dir: Directory of the parsed WSDL cache, private to
+                the user. The default is ~/.cache/mxcube/wsdl.
+            wsdl_cache_days: Lifetime of the parsed WSDL cache entries [days].
+                No WSDL cache if 0.
+        """
         self.ws_root = ws_root
         self.ws_username = ws_username
         self.ws_password = ws_password
@@ -88,6 +203,23 @@ class ISPyBDataAdapter:
 
         self.logger = logging.getLogger("ispyb_adapter")
 
+        # HTTP connections shared by the service clients
+        self._http_session = requests.Session()
+        if self.ws_username:
+            self._http_session.auth = (self.ws_username, self.ws_password)
+        # Time [s] of the SOAP calls, as [count, total, max] by operation name
+        self.call_times = {}
+        self._wsdl_cache = None
+        if wsdl_cache_days:
+            try:
+                self._wsdl_cache = PrivateObjectCache(
+                    wsdl_cache_dir or WSDL_CACHE_DIR, days=wsdl_cache_days
+                )
+            except OSError:
+                self.logger.exception(
+                    "Cannot use the WSDL cache %s", wsdl_cache_dir or WSDL_CACHE_DIR
+                )
+
         self._shipping = self.__create_client(
             self.ws_root + "ToolsForShippingWebService?wsdl"
         )
@@ -100,27 +232,35 @@ class ISPyBDataAdapter:
 
     def __create_client(self, url: str):
         """
-        Given a url it will create
+        Given a url it will create a client of the web service, sharing the
+        HTTP connections of the adapter and using the parsed WSDL cache
         """
-        if self.ws_root.strip().startswith("https://"):
-            from suds.transport.https import HttpAuthenticated
-        else:
-            from suds.transport.http import HttpAuthenticated
-
+        start_time = time.monotonic()
         client = Client(
             url,
             timeout=3,
-            transport=HttpAuthenticated(
-                username=self.ws_username,  # type: ignore
-                password=self.ws_password,
-                proxy=self.proxy,
-            ),
-            cache=None,
+            transport=PooledTransport(self._http_session, self.call_times),
+            cache=self._wsdl_cache,
             proxy=self.proxy,
         )
-        client.set_options(cache=None, location=url)
+        client.set_options(location=url)
+        self.logger.debug(
+            "Client of %s created in %.3f s", url, time.monotonic() - start_time
+        )
         return client
 
+    def get_call_times(self) -> Dict[str, Dict[str, float]]:
+        """
+        Get the statistics of the SOAP call times.
+
+        Returns:
+            Number of calls, mean and maximum time [s] by operation name.
+        """
+        return {
+            operation: {"count": count, "mean": total / count, "max": max_time}
+            for operation, (count, total, max_time) in self.call_times.items()
+        }
+
     def isEnabled(self) -> object:
         return self._shipping  # type: ignore
 
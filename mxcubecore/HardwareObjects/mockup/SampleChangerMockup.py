@@ -10,9 +10,12 @@ class SampleChangerMockup(AbstractSampleChanger.SampleChanger):
     __TYPE__ = "Mockup"
     NO_OF_BASKETS = 5
     NO_OF_SAMPLES_IN_BASKET = 10
+    # Simulated load time [s], half of it to pick the sample from the dewar
+    LOAD_TIME = 2.0
 
     def __init__(self, *args, **kwargs):
         super(SampleChangerMockup, self).__init__(self.__TYPE__, False, *args, **kwargs)
+        self._prepared_sample = None
 
     def init(self):
         self._selected_sample = -1
@@ -38,6 +41,7 @@ class SampleChangerMockup(AbstractSampleChanger.SampleChanger):
         AbstractSampleChanger.SampleChanger.init(self)
 
         self.log_filename = self.get_property("log_filename")
+        self.load_time = self.get_property("load_time", SampleChangerMockup.LOAD_TIME)
 
     def get_log_filename(self):
         return self.log_filename
@@ -61,14 +65,18 @@ class SampleChangerMockup(AbstractSampleChanger.SampleChanger):
             "Sample changer: %s. Please wait..." % msg
         )
 
-        self.emit("progressInit", (msg, 100))
-        for step in range(2 * 100):
-            self.emit("progressStep", int(step / 2.0))
-            time.sleep(0.01)
-
         mounted_sample = self.get_component_by_address(
             Container.Pin.get_sample_address(basket, sample)
         )
+
+        # a pre-staged sample is already picked, only the mount is left
+        first_step = 100 if mounted_sample is self._prepared_sample else 0
+        self._prepared_sample = None
+
+        self.emit("progressInit", (msg, 100))
+        for step in range(first_step, 2 * 100):
+            self.emit("progressStep", int(step / 2.0))
+            time.sleep(self.load_time / 200)
         self._set_state(AbstractSampleChanger.SampleChangerState.Ready)
 
         if mounted_sample is not previous_sample:
@@ -82,6 +90,18 @@ class SampleChangerMockup(AbstractSampleChanger.SampleChanger):
 
         return self.get_loaded_sample()
 
+    def prepare_load(self, sample):
+        if isinstance(sample, tuple):
+            basket, sample = sample
+        else:
+            basket, sample = sample.split(":")
+
+        return self._do_prepare_load(
+            self.get_component_by_address(
+                Container.Pin.get_sample_address(int(basket), int(sample))
+            )
+        )
+
     def unload(self, sample_slot=None, wait=None):
         logging.getLogger("user_level_log").info("Unloading sample")
         sample = self.get_loaded_sample()
@@ -124,6 +144,12 @@ class SampleChangerMockup(AbstractSampleChanger.SampleChanger):
     def _do_load(self, sample=None):
         return
 
+    def _do_prepare_load(self, sample):
+        # Simulate picking the sample with the second gripper
+        time.sleep(self.load_time / 2)
+        self._prepared_sample = sample
+        return True
+
     def _do_unload(self, sample_slot=None):
         return
 
@@ -7,6 +7,8 @@ import logging
 import os
 import tempfile
 
+from mxcubecore.utils.move_group import MoveGroup
+
 try:
     import lucid3 as lucid
 except ImportError:
@@ -410,8 +412,7 @@ def move_motors(motor_positions_dict):
 
     wait_ready(motor_positions_dict, timeout=30)
 
-    for motor, position in motor_positions_dict.items():
-        motor.set_value(position)
+    MoveGroup(motor_positions_dict).move(timeout=60)
 
     wait_ready(motor_positions_dict, timeout=60)
 
@@ -32,15 +32,20 @@ import logging
 import weakref
 import sys
 import os
+import re
 import time
 import importlib
 import traceback
 from typing import Union, TYPE_CHECKING
 from datetime import datetime
 
+import gevent
+import gevent.event
+import gevent.lock
 from ruamel.yaml import YAML
 
 from mxcubecore.utils.conversion import string_types, make_table
+from mxcubecore.utils.config_cache import ConfigCache
 from mxcubecore.dispatcher import dispatcher
 from mxcubecore import BaseHardwareObjects
 from mxcubecore import HardwareObjectFileParser
@@ -66,22 +71,47 @@ TIMERS = []
 beamline = None
 BEAMLINE_CONFIG_FILE = "beamline_config.yml"
 
+# Cache of parsed configuration files, None if not in use
+CONFIG_CACHE = None
 
-def load_from_yaml(configuration_file, role, _container=None, _table=None):
+
+def load_from_yaml(
+    configuration_file,
+    role,
+    _container=None,
+    _table=None,
+    _parallel=False,
+    _timing=None,
+):
     """
 
+    Contained objects are loaded in the order of the '_objects' tag, or
+    concurrently if the '_load_parallel' tag is true (the setting is passed on
+    to the contained yaml configured objects). In the parallel mode an object
+    waits for the objects listed for its role in the '_dependencies' tag,
+    and for the objects its configuration refers to.
+
     Args:
         configuration_file (str):
         role (str): Role name of configured object, used as its name
         _container (ConfiguredObject): Container object for recursive loading
         _table Optional[List]: Internal, collecting summary output
+        _parallel (bool): Internal, load contained objects concurrently
+        _timing Optional[dict]: Internal, returns the critical path time (ms)
 
     Returns:
 
     """
     global beamline
 
-    column_names = ("role", "Class", "file", "Time (ms)", "Comment")
+    column_names = (
+        "role",
+        "Class",
+        "file",
+        "Time (ms)",
+        "Critical path (ms)",
+        "Comment",
+    )
     if _table is None:
         # This is the topmopst call
         _table = []
@@ -90,6 +120,7 @@ def load_from_yaml(configuration_file, role, _container=None, _table=None):
     msg0 = ""
     result = None
     class_name = "None"
+    contents_time = contents_critical_path = 0.0
 
     # Get full path for configuration file
     if _instance is None:
@@ -100,8 +131,7 @@ def load_from_yaml(configuration_file, role, _container=None, _table=None):
 
     if not msg0:
         # Load the configuration file
-        with open(configuration_path, "r") as fp0:
-            configuration = yaml.load(fp0)
+        configuration = _load_yaml_file(configuration_path)
 
         # Get actual class
         initialise_class = configuration.pop("_initialise_class", None)
@@ -172,40 +202,20 @@ def load_from_yaml(configuration_file, role, _container=None, _table=None):
     if not msg0:
         # Recursively load contained objects (of any type that the system can support)
         _objects = configuration.pop("_objects", {})
+        dependencies = configuration.pop("_dependencies", {})
+        _parallel = configuration.pop("_load_parallel", _parallel)
         if _objects:
             load_time = 1000 * (time.time() - start_time)
             msg1 = "Start loading contents:"
             _table.append(
-                (role, class_name, configuration_file, "%.1d" % load_time, msg1)
+                (role, class_name, configuration_file, "%.1d" % load_time, "", msg1)
             )
             msg0 = "Done loading contents"
-        for role1, config_file in _objects.items():
-            fname, fext = os.path.splitext(config_file)
-            if fext in (".yaml", ".yml"):
-                load_from_yaml(
-                    config_file, role=role1, _container=result, _table=_table
-                )
-            elif fext == ".xml":
-                msg1 = ""
-                time0 = time.time()
-                try:
-                    hwobj = _instance.get_hardware_object(fname)
-                    if hwobj is None:
-                        msg1 = "No object loaded"
-                        class_name1 = "None"
-                    else:
-                        class_name1 = hwobj.__class__.__name__
-                        if hasattr(result, role1):
-                            result.replace_object(role1, hwobj)
-                        else:
-                            msg1 = "No such role: %s.%s" % (class_name, role1)
-                except Exception as ex:
-                    msg1 = "Loading error (%s)" % str(ex)
-                    class_name = ""
-                load_time = 1000 * (time.time() - time0)
-                _table.append(
-                    (role1, class_name1, config_file, "%.1d" % load_time, msg1)
-                )
+            time0 = time.time()
+            contents_critical_path = _load_contents(
+                result, class_name, _objects, dependencies, _parallel, _table
+            )
+            contents_time = 1000 * (time.time() - time0)
 
         # Set simple, miscellaneous properties.
         # NB the attribute must have been initialied in the class __init__ first.
@@ -237,7 +247,19 @@ def load_from_yaml(configuration_file, role, _container=None, _table=None):
                 raise
 
     load_time = 1000 * (time.time() - start_time)
-    _table.append((role, class_name, configuration_file, "%.1d" % load_time, msg0))
+    critical_path = load_time - contents_time + contents_critical_path
+    _table.append(
+        (
+            role,
+            class_name,
+            configuration_file,
+            "%.1d" % load_time,
+            "%.1d" % critical_path,
+            msg0,
+        )
+    )
+    if _timing is not None:
+        _timing["critical_path"] = critical_path
 
     if _container is None:
         print(make_table(column_names, _table))
@@ -245,6 +267,226 @@ def load_from_yaml(configuration_file, role, _container=None, _table=None):
     return result
 
 
+def _load_contents(container, class_name, objects, dependencies, parallel, table):
+    """Load the objects contained in a yaml configured object
+
+    Args:
+        container (ConfiguredObject): Container object
+        class_name (str): Container class name, for messages
+        objects (dict): role: configuration file of each contained object
+        dependencies (dict): role: roles to load first, in parallel mode
+        parallel (bool): Load the independent objects concurrently
+        table (list): Collecting summary output
+
+    Returns:
+        (float): Critical path time (ms) of the loading of the contents
+    """
+    critical_paths = {}
+
+    def load(role, config_file):
+        fext = os.path.splitext(config_file)[1]
+        if fext in (".yaml", ".yml"):
+            timing = {}
+            load_from_yaml(
+                config_file,
+                role=role,
+                _container=container,
+                _table=table,
+                _parallel=parallel,
+                _timing=timing,
+            )
+            critical_paths[role] = timing.get("critical_path", 0.0)
+        elif fext == ".xml":
+            critical_paths[role] = _load_xml_object(
+                role, config_file, container, class_name, table
+            )
+
+    if parallel:
+        dependencies = _get_load_dependencies(objects, dependencies)
+        if dependencies is None:
+            logging.getLogger("HWR").error(
+                "%s: circular loading dependencies, loading contents in order",
+                class_name,
+            )
+            parallel = False
+
+    if not parallel:
+        for role, config_file in objects.items():
+            load(role, config_file)
+        return sum(critical_paths.values())
+
+    loaded = dict((role, gevent.event.Event()) for role in objects)
+
+    def load_after_dependencies(role, config_file):
+        try:
+            for dependency in dependencies[role]:
+                loaded[dependency].wait()
+            load(role, config_file)
+        finally:
+            loaded[role].set()
+
+    tasks = [
+        gevent.spawn(load_after_dependencies, role, config_file)
+        for role, config_file in objects.items()
+    ]
+    gevent.joinall(tasks)
+    for task in tasks:
+        if task.exception is not None:
+            raise task.exception
+
+    # The longest chain of dependent loads
+    chains = {}
+
+    def chain(role):
+        if role not in chains:
+            chains[role] = critical_paths.get(role, 0.0) + max(
+                [chain(dependency) for dependency in dependencies[role]], default=0.0
+            )
+        return chains[role]
+
+    return max([chain(role) for role in objects], default=0.0)
+
+
+def _load_xml_object(role, config_file, container, class_name, table):
+    """Load an xml configured object contained in a yaml configured object
+
+    Args:
+        role (str): Role name of the object in the container
+        config_file (str): xml configuration file
+        container (ConfiguredObject): Container object
+        class_name (str): Container class name, for messages
+        table (list): Collecting summary output
+
+    Returns:
+        (float): Load time (ms)
+    """
+    msg1 = ""
+    class_name1 = "None"
+    time0 = time.time()
+    try:
+        hwobj = _instance.get_hardware_object(os.path.splitext(config_file)[0])
+        if hwobj is None:
+            msg1 = "No object loaded"
+        else:
+            class_name1 = hwobj.__class__.__name__
+            if hasattr(container, role):
+                container.replace_object(role, hwobj)
+            else:
+                msg1 = "No such role: %s.%s" % (class_name, role)
+    except Exception as ex:
+        msg1 = "Loading error (%s)" % str(ex)
+        class_name1 = ""
+    load_time = 1000 * (time.time() - time0)
+    table.append(
+        (role, class_name1, config_file, "%.1d" % load_time, "%.1d" % load_time, msg1)
+    )
+    return load_time
+
+
+def _load_yaml_file(configuration_path):
+    """Load a yaml configuration file, through the configuration cache if in use
+
+    Args:
+        configuration_path (str): Configuration file path
+
+    Returns:
+        The loaded configuration
+    """
+    if CONFIG_CACHE is None:
+        with open(configuration_path, "r") as fp0:
+            return yaml.load(fp0)
+    return CONFIG_CACHE.load(configuration_path, yaml.load)
+
+
+def _config_file_key(config_file):
+    """Configuration file name, without extension nor leading separator"""
+    return os.path.splitext(config_file.lstrip(os.path.sep))[0]
+
+
+def _get_config_references(config_file, _references=None):
+    """Get the configuration files referred to by a configuration file,
+    directly or through other configuration files
+
+    Args:
+        config_file (str): Configuration file name, relative to the lookup path
+        _references Optional[set]: Internal, collecting the result
+
+    Returns:
+        (set): The configuration files, as given by _config_file_key
+    """
+    if _references is None:
+        _references = set()
+    configuration_path = _instance.find_in_repository(config_file)
+    if configuration_path is None:
+        return _references
+
+    fext = os.path.splitext(config_file)[1]
+    if fext == ".xml":
+        with open(configuration_path, "r") as fp0:
+            references = [
+                href + ".xml"
+                for href in re.findall(r'href\s*=\s*"([^"]+)"', fp0.read())
+            ]
+    elif fext in (".yaml", ".yml"):
+        configuration = _load_yaml_file(configuration_path) or {}
+        references = list(configuration.get("_objects", {}).values())
+    else:
+        references = []
+
+    for reference in references:
+        key = _config_file_key(reference)
+        if key not in _references:
+            _references.add(key)
+            _get_config_references(reference, _references)
+    return _references
+
+
+def _get_load_dependencies(objects, dependencies):
+    """Get the roles each contained object must wait for, when loading in
+    parallel.
+
+    The explicit dependencies are completed with the configuration file
+    references: an object referring (directly or not) to the configuration
+    file of another contained object is loaded after it.
+
+    Args:
+        objects (dict): role: configuration file of each contained object
+        dependencies (dict): role: explicit list of roles to load first
+
+    Returns:
+        (dict): role: set of roles to load first. None if there is a cycle
+    """
+    roles_by_file = dict(
+        (_config_file_key(config_file), role) for role, config_file in objects.items()
+    )
+    result = {}
+    for role, config_file in objects.items():
+        result[role] = set()
+        for dependency in dependencies.get(role, ()):
+            if dependency in objects:
+                result[role].add(dependency)
+            else:
+                logging.getLogger("HWR").error(
+                    "Unknown role %s in loading dependencies of %s", dependency, role
+                )
+        for key in _get_config_references(config_file):
+            dependency = roles_by_file.get(key)
+            if dependency is not None and dependency != role:
+                result[role].add(dependency)
+
+    # Check that the objects can all be loaded
+    remaining = dict((role, set(roles)) for role, roles in result.items())
+    while remaining:
+        ready = [role for role, roles in remaining.items() if not roles]
+        if not ready:
+            return None
+        for role in ready:
+            del remaining[role]
+        for roles in remaining.values():
+            roles.difference_update(ready)
+    return result
+
+
 def add_hardware_objects_dirs(ho_dirs):
     """Adds directories with xml/yaml config files
 
@@ -268,18 +510,27 @@ def set_user_file_directory(user_file_directory):
     BaseHardwareObjects.HardwareObjectNode.set_user_file_directory(user_file_directory)
 
 
-def init_hardware_repository(configuration_path):
+def init_hardware_repository(
+    configuration_path, cache_directory=None, poll_workers=None
+):
     """Initialise hardware repository - must be run at program start
 
     Args:
         configuration_path (str): PATHSEP-separated string of directories
         giving configuration file lookup path
+        cache_directory (str): Directory for the cache of parsed configuration
+        files. Defaults to the MXCUBE_CONFIG_CACHE environment variable; no
+        cache is used if neither is set.
+        poll_workers (int): Number of threads of the shared poll scheduler
+        (see Poller.use_scheduler). Defaults to the MXCUBE_POLL_WORKERS
+        environment variable; each poller has its own thread if neither is set.
 
     Returns:
 
     """
     global _instance
     global beamline
+    global CONFIG_CACHE
 
     if _instance is not None or beamline is not None:
         raise RuntimeError(
@@ -301,6 +552,25 @@ def init_hardware_repository(configuration_path):
         configuration_path = lookup_path
 
     logging.getLogger("HWR").info("Hardware repository: %s", configuration_path)
+    cache_directory = cache_directory or os.environ.get("MXCUBE_CONFIG_CACHE")
+    if cache_directory:
+        try:
+            CONFIG_CACHE = ConfigCache(cache_directory)
+        except OSError:
+            logging.getLogger("HWR").exception(
+                "Cannot use the configuration cache %s", cache_directory
+            )
+        else:
+            logging.getLogger("HWR").info(
+                "Configuration cache: %s", CONFIG_CACHE.directory
+            )
+    poll_workers = int(poll_workers or os.environ.get("MXCUBE_POLL_WORKERS") or 0)
+    if poll_workers > 0:
+        # imported here, it needs the sys.path set by the mxcubecore package
+        from mxcubecore import Poller
+
+        Poller.use_scheduler(poll_workers)
+        logging.getLogger("HWR").info("Poll scheduler: %d workers", poll_workers)
     _instance = __HardwareRepositoryClient(configuration_path)
     _instance.connect()
     beamline = load_from_yaml(BEAMLINE_CONFIG_FILE, role="beamline")
@@ -308,9 +578,14 @@ def init_hardware_repository(configuration_path):
 
 
 def uninit_hardware_repository():
-    global _instance, beamline
+    global _instance, beamline, CONFIG_CACHE
     _instance = None
     beamline = None
+    CONFIG_CACHE = None
+
+    from mxcubecore import Poller
+
+    Poller.stop_scheduler()
 
 
 def get_hardware_repository():
@@ -349,6 +624,8 @@ class __HardwareRepositoryClient:
         self.hwobj_info_list = []
         self.invalid_hardware_objects = None
         self.hardware_objects = None
+        # prevents concurrent loading of the same object, by name
+        self._loading_locks = {}
 
     def connect(self):
         if self.__connected:
@@ -429,7 +706,7 @@ class __HardwareRepositoryClient:
 
         if xml_data:
             try:
-                hwobj_instance = self.parse_xml(xml_data, hwobj_name)
+                hwobj_instance = self.parse_xml(xml_data, hwobj_name, file_path)
                 if isinstance(hwobj_instance, string_types):
                     # We have redirection to another file
                     # Enter in dictionaries also under original names
@@ -531,18 +808,29 @@ class __HardwareRepositoryClient:
 
         dispatcher.send("hardwareObjectDiscarded", ho_name, self)
 
-    def parse_xml(self, xml_string, ho_name):
+    def parse_xml(self, xml_string, ho_name, file_path=None):
         """Load a Hardware Object from its XML string representation
 
         Parameters :
           xml_string -- the XML string
           ho_name -- the name of the Hardware Object to load (i.e. '/motors/m0')
+          file_path -- the XML file, to use the configuration cache (optional)
 
         Return :
           the Hardware Object, or None if it fails
         """
         try:
-            hardware_obj = HardwareObjectFileParser.parse_string(xml_string, ho_name)
+            if CONFIG_CACHE is not None and file_path is not None:
+                events = CONFIG_CACHE.load(
+                    file_path, HardwareObjectFileParser.record_events, xml_string
+                )
+                hardware_obj = HardwareObjectFileParser.parse_events(
+                    events, xml_string, ho_name
+                )
+            else:
+                hardware_obj = HardwareObjectFileParser.parse_string(
+                    xml_string, ho_name
+                )
         except Exception:
             logging.getLogger("HWR").exception(
                 "Cannot parse Hardware Repository file %s", ho_name
@@ -661,10 +949,19 @@ class __HardwareRepositoryClient:
                 if object_name in self.invalid_hardware_objects:
                     return None
 
-                if object_name in self.hardware_objects:
-                    hardware_obj = self.hardware_objects[object_name]
-                else:
-                    hardware_obj = self._load_hardware_object(object_name)
+                hardware_obj = self.hardware_objects.get(object_name)
+                if hardware_obj is None:
+                    lock = self._loading_locks.setdefault(
+                        object_name, gevent.lock.RLock()
+                    )
+                    with lock:
+                        # it may have been loaded while waiting for the lock
+                        hardware_obj = self.hardware_objects.get(object_name)
+                        if (
+                            hardware_obj is None
+                            and object_name not in self.invalid_hardware_objects
+                        ):
+                            hardware_obj = self._load_hardware_object(object_name)
                 return hardware_obj
         except TypeError as err:
             logging.getLogger("HWR").exception(
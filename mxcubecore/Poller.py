@@ -1,4 +1,7 @@
+import heapq
+import itertools
 import logging
+import time
 
 from dispatcher import saferef
 import gevent
@@ -19,6 +22,14 @@ log = logging.getLogger("HWR")
 
 POLLERS = {}
 
+# shared poll scheduler, see use_scheduler()
+SCHEDULER = None
+
+# longest time an idle scheduler worker sleeps before checking its heap (s)
+SCHEDULER_IDLE_WAIT = 1.0
+
+_allocate_lock = gevent.monkey.get_original("_thread", "allocate_lock")
+
 gevent_version = list(map(int, gevent.__version__.split(".")))
 
 
@@ -35,10 +46,100 @@ class PollingException:
         self.poller_id = poller_id
 
 
+class PollStatistics:
+    """Latency and overrun statistics of a poller, all times in ms
+
+    latency is the time spent in the polled call, lateness is the delay between
+    the time a poll was due and the time it actually started. A poll overruns
+    when it finishes after the next poll was due.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.max_lateness = 0.0
+        self.overruns = 0
+
+    def record(self, latency, lateness, polling_period):
+        self.calls += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        self.max_lateness = max(self.max_lateness, lateness)
+        if latency + lateness > polling_period:
+            self.overruns += 1
+
+    @property
+    def mean_latency(self):
+        return self.total_latency / self.calls if self.calls else 0.0
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "mean_latency": self.mean_latency,
+            "max_latency": self.max_latency,
+            "max_lateness": self.max_lateness,
+            "overruns": self.overruns,
+        }
+
+
 def get_poller(poller_id):
     return POLLERS.get(poller_id)
 
 
+def get_statistics():
+    """Get the statistics of all running pollers
+
+    Returns:
+        (dict): PollStatistics.as_dict() of each poller, keyed by poller id
+    """
+    return {
+        poller_id: poller.statistics.as_dict()
+        for poller_id, poller in list(POLLERS.items())
+    }
+
+
+def use_scheduler(max_workers=1):
+    """Serve the pollers by a shared scheduler instead of one thread each
+
+    Only pollers created after the call are affected, so this should be
+    called before the hardware objects are loaded. Calling it again with
+    a larger max_workers grows the pool of the existing scheduler.
+
+    Args:
+        max_workers (int): Number of native threads executing polled calls
+
+    Returns:
+        (_PollScheduler): The shared scheduler
+    """
+    global SCHEDULER
+
+    if SCHEDULER is None:
+        SCHEDULER = _PollScheduler(max_workers)
+    else:
+        SCHEDULER.set_max_workers(max_workers)
+    return SCHEDULER
+
+
+def stop_scheduler():
+    """Stop the shared scheduler, if any
+
+    The pollers it serves are stopped and removed, so that polling the same
+    call again creates a new poller. Pollers created afterwards get a thread
+    each, until use_scheduler is called again.
+    """
+    global SCHEDULER
+
+    if SCHEDULER is not None:
+        SCHEDULER.stop()
+        for poller in list(POLLERS.values()):
+            if poller.scheduler is SCHEDULER:
+                poller.stop()
+        SCHEDULER = None
+
+
 def poll(
     polled_call,
     polled_call_args=(),
@@ -93,15 +194,24 @@ class _Poller:
         self.queue = queue.Queue()
         self.delay = 0
         self.stop_event = Event()
-
-        #if gevent_version < [1,3,0]:
-            #self.async_watcher = gevent.get_hub().loop.async()
-        #else:
-        self.async_watcher = gevent.get_hub().loop.async_()
+        self.statistics = PollStatistics()
+        self.scheduler = SCHEDULER
+
+        if self.scheduler is None:
+            # if gevent_version < [1,3,0]:
+            #    self.async_watcher = gevent.get_hub().loop.async()
+            # else:
+            self.async_watcher = gevent.get_hub().loop.async_()
+        else:
+            # results are dispatched by the scheduler watcher
+            self.async_watcher = None
 
     def start_delayed(self, delay):
         self.delay = delay
-        _threading.start_new_thread(self.run, ())
+        if self.scheduler is None:
+            _threading.start_new_thread(self.run, ())
+        else:
+            self.scheduler.add(self, delay)
 
     def stop(self):
         self.stop_event.set()
@@ -143,75 +253,208 @@ class _Poller:
                 res = self.queue.get_nowait()
             except queue.Empty:
                 break
+            self.deliver(res)
+
+    def deliver(self, res):
+        """Pass a polling result to the callbacks - in the gevent hub thread"""
+        if isinstance(res, PollingException):
+            cb = self.error_callback_ref()
+            if cb is not None:
+                gevent.spawn(cb, res.original_exception, res.poller_id)
+        else:
+            cb = self.value_changed_callback_ref()
+            if cb is not None:
+                gevent.spawn(cb, res)
+
+    def _notify(self, res):
+        if self.scheduler is None:
+            self.queue.put(res)
+            self.async_watcher.send()
+        else:
+            self.scheduler.notify(self, res)
 
-            if isinstance(res, PollingException):
-                cb = self.error_callback_ref()
-                if cb is not None:
-                    gevent.spawn(cb, res.original_exception, res.poller_id)
-            else:
-                cb = self.value_changed_callback_ref()
-                if cb is not None:
-                    gevent.spawn(cb, res)
-
-    def run(self):
-        sleep = gevent.monkey._get_original("time", ["sleep"])[0]
-
-        self.async_watcher.start(self.new_event)
+    def poll_once(self, deadline):
+        """Execute the polled call once - in a native thread
 
-        err_callback_args = None
-        error_cb = None
-        first_run = True
+        Args:
+            deadline (float): time.monotonic() time at which the poll was due
 
-        while not self.stop_event.is_set():
-            if first_run and self.delay:
-                sleep(self.delay / 1000.0)
-            first_run = False
+        Returns:
+            (bool): True if polling should go on
+        """
+        if self.stop_event.is_set():
+            return False
 
+        polled_call = self.polled_call_ref()
+        if polled_call is None:
+            return False
+
+        start = time.monotonic()
+        try:
+            res = polled_call(*self.args)
+        except Exception as e:
+            self.statistics.errors += 1
             if self.stop_event.is_set():
-                break
+                return False
+            error_cb = self.error_callback_ref()
+            if error_cb is not None:
+                self._notify(PollingException(e, self.get_id()))
+            return False
+        finally:
+            del polled_call
+        end = time.monotonic()
+        self.statistics.record(
+            1000 * (end - start),
+            1000 * max(0.0, start - deadline),
+            self.polling_period,
+        )
+
+        if self.stop_event.is_set():
+            return False
+
+        if isinstance(res, numpy.ndarray):  # for arrays
+            comparison = res == self.old_res
+            if isinstance(comparison, bool):
+                is_equal = comparison
+            else:
+                is_equal = all(comparison)
+        else:
+            is_equal = res == self.old_res
 
-            polled_call = self.polled_call_ref()
-            if polled_call is None:
-                break
+        if self.compare and is_equal:
+            # do nothing: previous value is the same as "new" value
+            pass
+        else:
+            new_value = True
+            if self.compare:
+                new_value = not is_equal
 
-            try:
-                res = polled_call(*self.args)
-            except Exception as e:
-                if self.stop_event.is_set():
-                    break
-                error_cb = self.error_callback_ref()
-                if error_cb is not None:
-                    self.queue.put(PollingException(e, self.get_id()))
-                break
+            if new_value:
+                self.old_res = res
+                self._notify(res)
 
-            del polled_call
+        return True
 
-            if self.stop_event.is_set():
-                break
-
-            if isinstance(res, numpy.ndarray):  # for arrays
-                comparison = res == self.old_res
-                if isinstance(comparison, bool):
-                    is_equal = comparison
-                else:
-                    is_equal = all(comparison)
-            else:
-                is_equal = res == self.old_res
+    def run(self):
+        sleep = gevent.monkey.get_original("time", "sleep")
 
-            if self.compare and is_equal:
-                # do nothing: previous value is the same as "new" value
-                pass
-            else:
-                new_value = True
-                if self.compare:
-                    new_value = not is_equal
+        self.async_watcher.start(self.new_event)
 
-                if new_value:
-                    self.old_res = res
-                    self.queue.put(res)
-                    self.async_watcher.send()
+        if self.delay:
+            sleep(self.delay / 1000.0)
 
+        deadline = time.monotonic()
+        while self.poll_once(deadline):
             sleep(self.polling_period / 1000.0)
+            deadline = time.monotonic()
+
+
+class _PollScheduler:
+    """Serve all pollers from a single deadline heap
+
+    Polled calls are executed by a bounded pool of native threads, that take
+    the earliest due poller from the heap and put it back with its next
+    deadline. Results are handed back to the gevent hub through one async
+    watcher shared by all pollers.
+    """
+
+    def __init__(self, max_workers=1):
+        self.max_workers = 0
+        # number of worker threads still running
+        self.running_workers = 0
+        self._stopped = False
+        self._heap = []
+        self._counter = itertools.count()
+        self._lock = _allocate_lock()
+        self._wakeup = _allocate_lock()
+        self._wakeup.acquire()
+        self._results = queue.Queue()
+        self.async_watcher = gevent.get_hub().loop.async_()
+        self.async_watcher.start(self._dispatch)
+        self.set_max_workers(max_workers)
 
-        if error_cb is not None:
-            self.async_watcher.send()
+    def set_max_workers(self, max_workers):
+        """Grow the worker pool to max_workers threads"""
+        while self.max_workers < max_workers:
+            self.max_workers += 1
+            with self._lock:
+                self.running_workers += 1
+            _threading.start_new_thread(self._run, ())
+
+    def stop(self):
+        """Stop the worker threads. The pollers in the heap are dropped"""
+        with self._lock:
+            self._stopped = True
+            self._heap = []
+        self._release_wakeup()
+        self.async_watcher.stop()
+
+    def is_stopped(self):
+        return self._stopped
+
+    def add(self, poller, delay=0):
+        self._push(poller, time.monotonic() + delay / 1000.0)
+
+    def notify(self, poller, res):
+        self._results.put((poller, res))
+        self.async_watcher.send()
+
+    def get_pending(self):
+        """Get the number of pollers waiting for their next poll"""
+        with self._lock:
+            return len(self._heap)
+
+    def _push(self, poller, deadline):
+        with self._lock:
+            if self._stopped:
+                return
+            heapq.heappush(self._heap, (deadline, next(self._counter), poller))
+        self._release_wakeup()
+
+    def _release_wakeup(self):
+        try:
+            self._wakeup.release()
+        except RuntimeError:
+            # not locked: a worker is about to wake up anyway
+            pass
+
+    def _pop_due(self):
+        with self._lock:
+            if not self._heap:
+                timeout = SCHEDULER_IDLE_WAIT
+            else:
+                deadline, _, poller = self._heap[0]
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    heapq.heappop(self._heap)
+                    return poller, deadline
+        self._wakeup.acquire(True, min(timeout, SCHEDULER_IDLE_WAIT))
+        return None, None
+
+    def _run(self):
+        while not self._stopped:
+            poller, deadline = self._pop_due()
+            if poller is None:
+                continue
+            try:
+                keep_polling = poller.poll_once(deadline)
+            except Exception:
+                log.exception("Error in poller %s", poller.get_id())
+                keep_polling = False
+            if keep_polling:
+                period = poller.get_polling_period() / 1000.0
+                # skip missed ticks instead of polling in a burst to catch up
+                deadline = max(deadline + period, time.monotonic())
+                self._push(poller, deadline)
+        with self._lock:
+            self.running_workers -= 1
+        # wake up the next worker, so that they all end
+        self._release_wakeup()
+
+    def _dispatch(self):
+        while True:
+            try:
+                poller, res = self._results.get_nowait()
+            except queue.Empty:
+                break
+            poller.deliver(res)
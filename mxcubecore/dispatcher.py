@@ -14,6 +14,10 @@ except ImportError:
     louie = 0
 
 import sys
+import types
+import weakref
+
+import gevent
 
 if not hasattr(robustapply, "_robust_apply"):
     # patch robustapply.robust_apply to display exceptions, but to ignore them
@@ -34,3 +38,325 @@ if not hasattr(robustapply, "_robust_apply"):
         robustapply.robustApply = __my_robust_apply
     del louie
     del __my_robust_apply
+
+
+_ANY = getattr(dispatcher, "Any", None)
+_ANONYMOUS = getattr(dispatcher, "Anonymous", None)
+
+if not hasattr(dispatcher, "_signal_buses"):
+    # patch dispatcher.send to deliver the signals to the receivers connected
+    # through the signal buses too, so that code sending signals on behalf of
+    # a hardware object with dispatcher.send reaches all of its receivers.
+    # The patch is kept on the dispatcher module, that may be shared by
+    # several imports of this module
+    dispatcher._signal_buses = weakref.WeakSet()
+    dispatcher._send = dispatcher.send
+
+    def __send_through_buses(signal=_ANY, sender=_ANONYMOUS, *arguments, **named):
+        responses = dispatcher._send(signal, sender, *arguments, **named)
+        for bus in list(dispatcher._signal_buses):
+            responses.extend(bus._deliver(signal, sender, arguments, named))
+        return responses
+
+    dispatcher.send = __send_through_buses
+    del __send_through_buses
+
+_dispatcher_send = dispatcher._send
+# Named arguments that dispatcher.send passes to the receivers accepting them
+_NAMED_ARGUMENTS = ("signal", "sender")
+
+
+class _Receiver(object):
+    """Weakly referenced receiver, with the named arguments it accepts"""
+
+    __slots__ = ("ref", "named", "var_keywords")
+
+    def __init__(self, receiver, on_delete):
+        if hasattr(receiver, "__func__"):
+            self.ref = weakref.WeakMethod(receiver, on_delete)
+        elif isinstance(
+            getattr(receiver, "__self__", None), (type(None), types.ModuleType)
+        ):
+            self.ref = weakref.ref(receiver, on_delete)
+        else:
+            # Bound builtin method, only its object could be referenced
+            raise TypeError("Cannot weakly reference %r" % receiver)
+
+        # Signature inspection, done once instead of on every send
+        self.named = ()
+        self.var_keywords = False
+        func = receiver
+        if not hasattr(func, "__code__") and hasattr(func, "__call__"):
+            func = func.__call__
+        code = getattr(getattr(func, "__func__", func), "__code__", None)
+        if code is not None:
+            start = 1 if hasattr(func, "__func__") else 0
+            params = code.co_varnames[start : code.co_argcount]
+            self.named = tuple(
+                (name, params.index(name))
+                for name in _NAMED_ARGUMENTS
+                if name in params
+            )
+            self.var_keywords = bool(code.co_flags & 8)
+
+    def get_named(self, nargs, signal, sender):
+        """Named arguments for a call with nargs positional arguments"""
+        values = {"signal": signal, "sender": sender}
+        if self.var_keywords:
+            filled = set(name for name, index in self.named if index < nargs)
+            return dict((k, v) for k, v in values.items() if k not in filled)
+        return dict(
+            (name, values[name]) for name, index in self.named if index >= nargs
+        )
+
+
+class SignalBus(object):
+    """Signal dispatching with the connect/disconnect/send API of dispatcher
+
+    Receivers and senders are weakly referenced, as with dispatcher.
+    Receivers are stored per sender and signal, together with the result of
+    the inspection of their signature, so that send does no lookup through
+    Any senders or signals and no introspection. Exceptions in receivers are
+    reported and do not stop the dispatching.
+
+    Connections that the bus cannot hold (Any or anonymous sender, objects
+    that cannot be weakly referenced) are passed on to dispatcher, and send
+    also delivers to the receivers connected directly through dispatcher.
+    Conversely, dispatcher.send delivers to the receivers held by the buses.
+    In both cases the dispatcher receivers are called first.
+    """
+
+    def __init__(self):
+        # id(sender) -> signal -> tuple of _Receiver
+        self._connections = {}
+        # id(sender) -> weak reference to the sender
+        self._senders = {}
+        dispatcher._signal_buses.add(self)
+
+    def connect(self, receiver, signal, sender):
+        """Connect receiver to signal sent by sender
+
+        Args:
+            receiver (callable): Called with the arguments of the signal
+            signal (str): Signal name
+            sender (object): Sender of the signal
+        """
+        senderkey = id(sender)
+        if sender is None or sender is _ANY or sender is _ANONYMOUS or signal is _ANY:
+            return dispatcher.connect(receiver, signal, sender)
+        try:
+            if senderkey not in self._senders:
+                self._senders[senderkey] = weakref.ref(
+                    sender, lambda ref, key=senderkey: self._remove_sender(key)
+                )
+            entry = _Receiver(
+                receiver,
+                lambda ref, key=senderkey, sig=signal: self._remove_dead(key, sig),
+            )
+        except TypeError:
+            return dispatcher.connect(receiver, signal, sender)
+
+        signals = self._connections.setdefault(senderkey, {})
+        receivers = tuple(
+            other for other in signals.get(signal, ()) if other.ref() != receiver
+        )
+        signals[signal] = receivers + (entry,)
+
+    def disconnect(self, receiver, signal, sender):
+        """Disconnect receiver from signal sent by sender
+
+        Raises:
+            DispatcherKeyError: If the receiver was not connected
+        """
+        signals = self._connections.get(id(sender), {})
+        receivers = signals.get(signal, ())
+        remaining = tuple(entry for entry in receivers if entry.ref() != receiver)
+        if len(remaining) == len(receivers):
+            # Maybe connected directly through dispatcher
+            return dispatcher.disconnect(receiver, signal, sender)
+        if remaining:
+            signals[signal] = remaining
+        else:
+            del signals[signal]
+
+    def send(self, signal, sender, *args):
+        """Send signal from sender to the connected receivers
+
+        The receivers connected directly through dispatcher are called
+        first, then the receivers held by the bus, each in connection order.
+
+        Returns:
+            (list): (receiver, response) pairs
+        """
+        responses = []
+        if self._dispatcher_has_receivers(signal, sender):
+            responses.extend(_dispatcher_send(signal, sender, *args))
+        responses.extend(self._deliver(signal, sender, args))
+        return responses
+
+    def _deliver(self, signal, sender, args, named=None):
+        """Call the receivers held by the bus
+
+        Returns:
+            (list): (receiver, response) pairs
+        """
+        responses = []
+        signals = self._connections.get(id(sender))
+        if not signals:
+            return responses
+        nargs = len(args)
+        for entry in signals.get(signal, ()):
+            receiver = entry.ref()
+            if receiver is None:
+                continue
+            try:
+                if entry.named or entry.var_keywords:
+                    kwargs = entry.get_named(nargs, signal, sender)
+                    if named and entry.var_keywords:
+                        kwargs.update(named)
+                    response = receiver(*args, **kwargs)
+                else:
+                    response = receiver(*args)
+            except Exception:
+                sys.excepthook(*sys.exc_info())
+                response = None
+            responses.append((receiver, response))
+        return responses
+
+    def get_receivers(self, signal, sender):
+        """Get the live receivers of signal sent by sender, held by the bus"""
+        signals = self._connections.get(id(sender), {})
+        receivers = (entry.ref() for entry in signals.get(signal, ()))
+        return [receiver for receiver in receivers if receiver is not None]
+
+    @staticmethod
+    def _dispatcher_has_receivers(signal, sender):
+        connections = getattr(dispatcher, "connections", None)
+        if connections is None:
+            return True
+        for senderkey in (id(sender), id(_ANY)):
+            signals = connections.get(senderkey)
+            if signals and (signal in signals or _ANY in signals):
+                return True
+        return False
+
+    def _remove_sender(self, senderkey):
+        self._connections.pop(senderkey, None)
+        self._senders.pop(senderkey, None)
+
+    def _remove_dead(self, senderkey, signal):
+        signals = self._connections.get(senderkey)
+        if not signals or signal not in signals:
+            return
+        remaining = tuple(entry for entry in signals[signal] if entry.ref() is not None)
+        if remaining:
+            signals[signal] = remaining
+        else:
+            del signals[signal]
+
+
+signal_bus = SignalBus()
+
+
+class SignalCoalescer(object):
+    """Rate limiting of the signals of one sender
+
+    Within the interval of a rate limited signal the latest arguments win.
+    They are sent at the end of the interval (trailing edge) and, if the
+    signal was quiet before, the first arguments are sent at once (leading
+    edge). Signals without a limit are not affected, but the pending signals
+    to the same receivers should be flushed before sending them, so that
+    they are not overtaken by pending values (e.g. the last position of a
+    motor before its READY state).
+
+    Limits are given per signal, as an interval in milliseconds or as a
+    dictionary with keys "interval" (ms), "leading" and "trailing" (bool,
+    both True by default), e.g.::
+
+        {"valueChanged": 100, "stateChanged": {"interval": 100, "leading": True}}
+    """
+
+    def __init__(self, send, limits):
+        """
+        Args:
+            send (callable): Called with the signal and its arguments tuple
+            limits (dict): Rate limits per signal name
+
+        Raises:
+            ValueError: If a limit is not valid
+        """
+        self._send = send
+        # signal -> (interval (s), leading, trailing)
+        self._limits = {}
+        # signal -> arguments of the latest signal, to send at the trailing edge
+        self._pending = {}
+        # signal -> end of the current interval
+        self._timers = {}
+
+        for signal, limit in limits.items():
+            if not isinstance(limit, dict):
+                limit = {"interval": limit}
+            leading = limit.get("leading", True)
+            trailing = limit.get("trailing", True)
+            interval = float(limit["interval"]) / 1000.0
+            if interval < 0 or not (leading or trailing):
+                raise ValueError("Invalid rate limit for %s: %s" % (signal, limit))
+            self._limits[str(signal)] = (interval, leading, trailing)
+
+    def __bool__(self):
+        return bool(self._limits)
+
+    def is_limited(self, signal):
+        """
+        Returns:
+            (bool): True if the signal is rate limited
+        """
+        return signal in self._limits
+
+    def emit(self, signal, args):
+        """Send or delay a rate limited signal"""
+        interval, leading, trailing = self._limits[signal]
+        if signal in self._timers:
+            if trailing:
+                self._pending[signal] = args
+            return
+        if leading:
+            self._send(signal, args)
+        else:
+            self._pending[signal] = args
+        self._start_interval(signal, interval)
+
+    def get_pending(self):
+        """
+        Returns:
+            (list): Names of the signals waiting for the end of their interval
+        """
+        return list(self._pending)
+
+    def flush(self, signals=None):
+        """Send pending signals now, ending their intervals
+
+        Args:
+            signals (list): Names of the signals to send, all if None
+        """
+        if signals is None:
+            signals = list(self._pending)
+        for signal in signals:
+            args = self._pending.pop(signal, None)
+            if args is None:
+                continue
+            timer = self._timers.pop(signal, None)
+            if timer is not None:
+                timer.kill(block=False)
+            self._send(signal, args)
+
+    def _start_interval(self, signal, interval):
+        self._timers[signal] = gevent.spawn_later(interval, self._end_interval, signal)
+
+    def _end_interval(self, signal):
+        del self._timers[signal]
+        args = self._pending.pop(signal, None)
+        if args is not None:
+            self._send(signal, args)
+            # The trailing send opens a new interval
+            self._start_interval(signal, self._limits[signal][0])
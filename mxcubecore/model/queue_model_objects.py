@@ -26,8 +26,10 @@ the QueueModel.
 import copy
 import os
 import logging
+import weakref
 
 from mxcubecore.model import queue_model_enumerables
+from mxcubecore.utils import name_allocator
 
 try:
     from mxcubecore.model import crystal_symmetry
@@ -77,6 +79,12 @@ class TaskNode(object):
         self._origin = None
         self._task_data = task_data
 
+    def __setattr__(self, name, value):
+        old_value = self.__dict__.get(name)
+        object.__setattr__(self, name, value)
+        if name == "path_template":
+            _path_template_replaced(old_value, value)
+
     @property
     def task_data(self):
         return self._task_data
@@ -278,6 +286,10 @@ class RootNode(TaskNode):
         TaskNode.__init__(self)
         self._name = "root"
         self._total_node_count = 0
+        # Maintained by QueueModel: node id -> node, sample location -> sample
+        self._node_index = {}
+        self._sample_index = {}
+        self._path_templates = PathTemplateRegistry()
 
 
 class TaskGroup(TaskNode):
@@ -1451,6 +1463,12 @@ class Acquisition(object):
         self.path_template = PathTemplate()
         self.acquisition_parameters = AcquisitionParameters()
 
+    def __setattr__(self, name, value):
+        old_value = self.__dict__.get(name)
+        object.__setattr__(self, name, value)
+        if name == "path_template":
+            _path_template_replaced(old_value, value)
+
     def get_preview_image_paths(self):
         """Returns the full paths, including the filename, to preview/thumbnail
         images stored in the archive directory.
@@ -1475,6 +1493,20 @@ class Acquisition(object):
 
 
 class PathTemplate(object):
+    # Attributes that change the files a path template stands for
+    _FILE_ATTRIBUTES = frozenset(
+        (
+            "directory",
+            "base_prefix",
+            "mad_prefix",
+            "reference_image_prefix",
+            "wedge_prefix",
+            "run_number",
+            "start_num",
+            "num_files",
+        )
+    )
+
     @staticmethod
     def set_data_base_path(base_directory):
         # os.path.abspath returns path without trailing slash, if any
@@ -1513,6 +1545,29 @@ class PathTemplate(object):
 
         return prefix_path, run_number, img_number
 
+    @staticmethod
+    def get_next_free_name(directory, pattern, start=1, first=None, create=None):
+        """
+        Finds the next free name of a numbered series in directory, with
+        one scan of the directory (cached) instead of one stat per name.
+
+        :param directory: Directory of the name
+        :type directory: str
+        :param pattern: Name with a %-format for the index, e.g. "run_%d"
+        :type pattern: str
+        :param start: First index tried
+        :type start: int
+        :param first: Name tried before the numbered ones, e.g. "run"
+        :type first: str
+        :param create: None, "file" or "directory" to create the name
+                       atomically, so that concurrent writers never share it
+        :type create: str
+
+        :returns: The index (None for first) and the name
+        :rtype: tuple
+        """
+        return name_allocator.next_free_name(directory, pattern, start, first, create)
+
     def __init__(self):
         object.__init__(self)
 
@@ -1532,6 +1587,12 @@ class PathTemplate(object):
         if not hasattr(self, "precision"):
             self.precision = str()
 
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in PathTemplate._FILE_ATTRIBUTES:
+            for registry in list(_PATH_TEMPLATE_REGISTRIES):
+                registry.update(self)
+
     def as_dict(self):
         return {
             "directory": self.directory,
@@ -1696,6 +1757,138 @@ class PathTemplate(object):
         return copy.deepcopy(self)
 
 
+# All PathTemplateRegistry instances, updated when a path template changes
+_PATH_TEMPLATE_REGISTRIES = weakref.WeakSet()
+
+
+def _path_template_replaced(old_path_template, new_path_template):
+    """Moves the registrations of a replaced path template"""
+    if old_path_template is not None and old_path_template is not new_path_template:
+        for registry in list(_PATH_TEMPLATE_REGISTRIES):
+            registry.replace(old_path_template, new_path_template)
+
+
+class PathTemplateRegistry(object):
+    """
+    Index of path templates by (normalised directory, prefix) and run
+    number, for run number allocation and path collision checks.
+
+    Path templates are registered per node, a path template shared by
+    several nodes stays registered until the last of them is removed.
+    Registered path templates are re-indexed when their directory, prefix,
+    run number or file interval attributes are set, and registrations
+    follow the nodes when the path template of an acquisition is replaced.
+    """
+
+    def __init__(self):
+        # (directory, prefix) -> run number -> id(path template) -> path template
+        self._index = {}
+        # id(path template) -> ((directory, prefix), run number)
+        self._keys = {}
+        # id(path template) -> id(node) -> node
+        self._nodes = {}
+        _PATH_TEMPLATE_REGISTRIES.add(self)
+
+    def __len__(self):
+        return len(self._keys)
+
+    @staticmethod
+    def get_key(path_template):
+        """
+        :returns: The (normalised directory, prefix) registry key
+        :rtype: tuple
+        """
+        return (os.path.normpath(path_template.directory), path_template.get_prefix())
+
+    def add(self, path_template, node=None):
+        """
+        Registers <path_template> for <node>, and (re-)indexes it
+        """
+        self._nodes.setdefault(id(path_template), {})[id(node)] = node
+        self._index_template(path_template)
+
+    def remove(self, path_template, node=None):
+        """
+        Removes the registration of <path_template> for <node>, the path
+        template is removed from the index with its last registration
+        """
+        nodes = self._nodes.get(id(path_template), {})
+        nodes.pop(id(node), None)
+        if not nodes:
+            self._nodes.pop(id(path_template), None)
+            self._unindex_template(path_template)
+
+    def update(self, path_template):
+        """
+        Re-indexes <path_template> after a change, if it is registered
+        """
+        if id(path_template) in self._keys:
+            self._index_template(path_template)
+
+    def replace(self, old_path_template, new_path_template):
+        """
+        Moves the registrations of <old_path_template> to <new_path_template>
+        for the nodes that now have <new_path_template> as path template
+        """
+        nodes = self._nodes.get(id(old_path_template), {})
+        for node in list(nodes.values()):
+            if node is not None and node.get_path_template() is new_path_template:
+                self.remove(old_path_template, node)
+                self.add(new_path_template, node)
+
+    def _index_template(self, path_template):
+        self._unindex_template(path_template)
+        key = self.get_key(path_template)
+        run_number = path_template.run_number
+        runs = self._index.setdefault(key, {})
+        runs.setdefault(run_number, {})[id(path_template)] = path_template
+        self._keys[id(path_template)] = (key, run_number)
+
+    def _unindex_template(self, path_template):
+        key, run_number = self._keys.pop(id(path_template), (None, None))
+        if key is None:
+            return
+        runs = self._index[key]
+        del runs[run_number][id(path_template)]
+        if not runs[run_number]:
+            del runs[run_number]
+            if not runs:
+                del self._index[key]
+
+    def get_next_run_number(self, path_template, exclude_current=True):
+        """
+        :param path_template: PathTemplate to match with.
+        :type path_template: PathTemplate
+        :param exclude_current: Ignore <path_template> itself if registered
+        :type exclude_current: bool
+
+        :returns: The next available run number for <path_template>
+        :rtype: int
+        """
+        runs = self._index.get(self.get_key(path_template), {})
+        run_numbers = [0]
+        for run_number, templates in runs.items():
+            if (
+                not exclude_current
+                or len(templates) > 1
+                or id(path_template) not in templates
+            ):
+                run_numbers.append(run_number)
+        return max(run_numbers) + 1
+
+    def has_collision(self, path_template):
+        """
+        :returns: True if another registered path template produces
+                  some of the files of <path_template>
+        :rtype: bool
+        """
+        runs = self._index.get(self.get_key(path_template), {})
+        for other in runs.get(path_template.run_number, {}).values():
+            if other is not path_template and path_template.intersection(other):
+                return True
+        return False
+
+
 class AcquisitionParameters(object):
     def __init__(self):
         object.__init__(self)
@@ -651,6 +651,19 @@ class SampleQueueEntry(BaseQueueEntry):
     def __setstate__(self, d):
         self.__dict__.update(d)
 
+    def is_mount_needed(self):
+        """
+        :returns: True if the sample changer mounts the sample when this
+                  entry is executed.
+        :rtype: bool
+        """
+        return (
+            len(self.get_data_model().get_children()) != 0
+            and not self._data_model.free_pin_mode
+            and HWR.beamline.sample_changer is not None
+            and not HWR.beamline.diffractometer.in_plate_mode()
+        )
+
     def execute(self):
         BaseQueueEntry.execute(self)
         log = logging.getLogger("queue_exec")
@@ -741,15 +754,24 @@ class SampleQueueEntry(BaseQueueEntry):
                         }
                     )
 
+        queue_controller = self.get_queue_controller()
+        if queue_controller is None:
+            self._start_autoprocessing(params)
+        else:
+            queue_controller.run_post_processing(self._start_autoprocessing, params)
+
+        self._set_background_color()
+        self._view.setText(1, "")
+
+    def _start_autoprocessing(self, params):
+        if HWR.beamline.collect is None:
+            return
         try:
             programs = HWR.beamline.collect["auto_processing"]
             autoprocessing.start(programs, "end_multicollect", params)
         except KeyError:
             pass
 
-        self._set_background_color()
-        self._view.setText(1, "")
-
     def _set_background_color(self):
         BaseQueueEntry._set_background_color(self)
 
@@ -0,0 +1,234 @@
+#! /usr/bin/env python
+# encoding: utf-8
+#
+# License:
+#
+# This file is part of MXCuBE.
+#
+# MXCuBE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MXCuBE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with MXCuBE. If not, see <https://www.gnu.org/licenses/>.
+
+"""On-disk cache of parsed configuration files
+
+Each configuration file has its own cache entry, a file named from the
+hash of the configuration file path. The entry is used as long as the
+configuration file has the same modification time and size; if these changed,
+the entry is still used when the content hash is unchanged. Otherwise the file
+is parsed again and the entry rewritten.
+
+The entries hold the parsed data in marshal format, which only stores plain
+values (loading it runs no code, unlike pickle), preceded by the SHA-256 of
+the data. Mappings such as the yaml !!omap ones are stored as plain (ordered)
+dict, and parse results that marshal cannot store are not cached. The cache
+directory is private to the user (mode 0700), and entries that are not owned
+by the user, or writable by others, are ignored.
+"""
+
+import hashlib
+import logging
+import marshal
+import os
+import stat
+import sys
+import tempfile
+
+__credits__ = ["MXCuBE collaboration"]
+
+# Change when the format of the cached data changes
+CACHE_VERSION = 2
+
+ENTRY_SUFFIX = ".marshal"
+
+# marshal format version, fixed so that all the entries can be read back
+_MARSHAL_VERSION = 4
+
+
+class ConfigCache:
+    """Cache of parsed configuration files, stored in a directory"""
+
+    def __init__(self, directory):
+        """
+        Args:
+            directory (str): Cache directory, created if needed
+        Raises:
+            PermissionError: The directory belongs to another user
+        """
+        self.directory = make_private_directory(directory)
+        # Cache key, to discard entries written by a different parser
+        self.version = (CACHE_VERSION, sys.version_info[:2])
+        self.hits = 0
+        self.misses = 0
+
+    def entry_path(self, file_path):
+        """Get the path of the cache entry of a configuration file
+
+        Args:
+            file_path (str): Configuration file path
+
+        Returns:
+            (str): Cache entry path
+        """
+        key = hashlib.sha1(os.path.abspath(file_path).encode()).hexdigest()
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def load(self, file_path, parse, content=None):
+        """Get the parsed content of a configuration file
+
+        Args:
+            file_path (str): Configuration file path
+            parse (callable): Parser, taking the file content (str)
+            content (str): File content, if already read
+
+        Returns:
+            The parse result, from the cache if the file is unchanged
+        """
+        stat = os.stat(file_path)
+        file_info = (stat.st_mtime_ns, stat.st_size)
+        entry_path = self.entry_path(file_path)
+        entry = self._read_entry(entry_path)
+
+        if entry is not None and entry["file_info"] == file_info:
+            self.hits += 1
+            return entry["data"]
+
+        if content is None:
+            with open(file_path, "r") as fp0:
+                content = fp0.read()
+        content_hash = hashlib.sha1(content.encode()).hexdigest()
+        if entry is not None and entry["content_hash"] == content_hash:
+            data = entry["data"]
+            self.hits += 1
+        else:
+            data = parse(content)
+            self.misses += 1
+
+        self._write_entry(
+            entry_path,
+            {
+                "version": self.version,
+                "path": os.path.abspath(file_path),
+                "file_info": file_info,
+                "content_hash": content_hash,
+                "data": data,
+            },
+        )
+        return data
+
+    def clear(self):
+        """Remove all cache entries"""
+        for name in os.listdir(self.directory):
+            # .pickle: entries of CACHE_VERSION 1
+            if name.endswith((ENTRY_SUFFIX, ".pickle")):
+                os.remove(os.path.join(self.directory, name))
+
+    def _read_entry(self, entry_path):
+        try:
+            with open(entry_path, "rb") as fp0:
+                if not is_private_file(os.fstat(fp0.fileno())):
+                    logging.getLogger("HWR").warning(
+                        "Ignoring configuration cache entry %s, not owned by "
+                        "the user or writable by others",
+                        entry_path,
+                    )
+                    return None
+                digest = fp0.read(hashlib.sha256().digest_size)
+                payload = fp0.read()
+            if hashlib.sha256(payload).digest() != digest:
+                raise ValueError("Corrupted entry")
+            entry = marshal.loads(payload)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logging.getLogger("HWR").debug(
+                "Ignoring unreadable configuration cache entry %s", entry_path
+            )
+            return None
+        if not isinstance(entry, dict) or entry.get("version") != self.version:
+            return None
+        return entry
+
+    def _write_entry(self, entry_path, entry):
+        # Write to a temporary file, so that concurrent readers
+        # never see a partial entry
+        try:
+            payload = marshal.dumps(_plain(entry), _MARSHAL_VERSION)
+        except ValueError:
+            # e.g. dates in a yaml file
+            logging.getLogger("HWR").debug(
+                "Not caching %s, its content cannot be marshalled", entry["path"]
+            )
+            return
+        try:
+            # mkstemp creates the file with mode 0600
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as fp0:
+                fp0.write(hashlib.sha256(payload).digest())
+                fp0.write(payload)
+            os.replace(tmp_path, entry_path)
+        except Exception:
+            logging.getLogger("HWR").exception(
+                "Cannot write configuration cache entry %s", entry_path
+            )
+
+
+def make_private_directory(directory):
+    """Create a directory private to the user (mode 0700), if needed
+
+    Args:
+        directory (str): Directory path
+
+    Returns:
+        (str): Absolute directory path
+
+    Raises:
+        PermissionError: The directory belongs to another user
+    """
+    directory = os.path.abspath(os.path.expanduser(directory))
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    dir_stat = os.stat(directory)
+    if not _is_owned(dir_stat):
+        raise PermissionError("Directory %s is not owned by the user" % directory)
+    if stat.S_IMODE(dir_stat.st_mode) != 0o700:
+        os.chmod(directory, 0o700)
+    return directory
+
+
+def is_private_file(file_stat):
+    """Check that a file belongs to the user and is not writable by others
+
+    Args:
+        file_stat (os.stat_result): File status
+
+    Returns:
+        (bool): True if the file can be trusted
+    """
+    return _is_owned(file_stat) and not file_stat.st_mode & 0o022
+
+
+def _is_owned(file_stat):
+    """Check that a file belongs to the user running the process"""
+    if not hasattr(os, "getuid"):
+        # no file ownership check on this platform
+        return True
+    return file_stat.st_uid == os.getuid()
+
+
+def _plain(data):
+    """Copy of data with the dict and list subclasses made plain, for marshal"""
+    if isinstance(data, dict):
+        return {key: _plain(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_plain(value) for value in data]
+    if isinstance(data, tuple):
+        return tuple(_plain(value) for value in data)
+    return data
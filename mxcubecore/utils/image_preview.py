@@ -0,0 +1,232 @@
+#! /usr/bin/env python
+# encoding: utf-8
+#
+# License:
+#
+# This file is part of MXCuBE.
+#
+# MXCuBE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MXCuBE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with MXCuBE. If not, see <https://www.gnu.org/licenses/>.
+
+"""Background generation of the JPEG previews of the collected frames
+
+The data collection notifies each frame ready with frame_ready, which only
+queues it: the JPEG and thumbnail are made by background greenlets, and the
+image is then stored in the LIMS through a LimsWriteQueue, so that neither
+the conversion nor the LIMS call delays the acquisition.
+
+With processes > 0 the conversion function runs in a pool of processes
+(it must then be a module level function, such as make_jpeg), otherwise it
+runs in several greenlets, which suits conversions done by a remote service.
+
+A frame already queued is not queued again. When max_pending frames are
+queued, the frames notified are not converted, but still stored in the LIMS.
+
+Example:
+    previews = ImagePreviewService(make_jpeg, processes=2)
+    previews.frame_ready(image_path, jpeg_path, thumbnail_path, lims_image)
+    previews.flush(timeout=60)
+"""
+
+import collections
+import concurrent.futures
+import logging
+import multiprocessing
+import time
+
+import gevent
+import gevent.event
+
+from mxcubecore.utils.lims_writer import LimsWriteQueue
+
+__credits__ = ["MXCuBE collaboration"]
+
+Frame = collections.namedtuple(
+    "Frame", ["image_path", "jpeg_path", "thumbnail_path", "lims_image"]
+)
+
+
+def make_jpeg(image_path, jpeg_path, thumbnail_path, thumbnail_size=256):
+    """Make the JPEG and the thumbnail of a diffraction image.
+
+    The image is read with fabio if available, otherwise with PIL. The
+    intensities are scaled between their 1 and 99.5 percentiles, and shown
+    dark on white.
+
+    Args:
+        image_path (str): Image file.
+        jpeg_path (str): JPEG file to write.
+        thumbnail_path (str): Thumbnail file to write.
+        thumbnail_size (int): Maximum width and height of the thumbnail.
+    """
+    import numpy
+    from PIL import Image
+
+    try:
+        import fabio
+    except ImportError:
+        with Image.open(image_path) as image:
+            data = numpy.asarray(image, dtype=numpy.float32)
+    else:
+        data = numpy.asarray(fabio.open(image_path).data, dtype=numpy.float32)
+
+    low, high = numpy.percentile(data, (1, 99.5))
+    scale = 255.0 / max(high - low, 1)
+    pixels = numpy.clip((data - low) * scale, 0, 255).astype(numpy.uint8)
+    image = Image.fromarray(255 - pixels)
+    image.save(jpeg_path, "JPEG", quality=90)
+    image.thumbnail((thumbnail_size, thumbnail_size))
+    image.save(thumbnail_path, "JPEG", quality=90)
+
+
+class ImagePreviewService:
+    """Frames converted to JPEG and stored in the LIMS in the background"""
+
+    def __init__(
+        self,
+        convert=make_jpeg,
+        processes=2,
+        max_pending=100,
+        lims_writer=None,
+        workers=4,
+    ):
+        """
+        Args:
+            convert (callable): Make the JPEG and thumbnail, called with the
+                image, JPEG and thumbnail paths.
+            processes (int): Number of conversion processes. The conversions
+                run in the greenlets if 0.
+            max_pending (int): Maximum number of frames queued.
+            lims_writer (LimsWriteQueue): Queue storing the images in the LIMS.
+                The default is a queue without spool file.
+            workers (int): Number of greenlets converting frames at the same
+                time, if processes is 0.
+        """
+        self.convert = convert
+        self.processes = processes
+        self.workers = workers
+        self.max_pending = max_pending
+        self.lims_writer = lims_writer or LimsWriteQueue()
+        # Time [s] of the last conversions
+        self.conversion_times = collections.deque(maxlen=100)
+        self._queue = collections.deque()
+        # Paths of the frames queued or being converted
+        self._paths = set()
+        self._submitted = gevent.event.Event()
+        self._idle = gevent.event.Event()
+        self._idle.set()
+        self._workers = []
+        self._executor = None
+
+    @property
+    def pending(self):
+        """Number of frames queued or being converted"""
+        return len(self._paths)
+
+    def frame_ready(self, image_path, jpeg_path, thumbnail_path, lims_image=None):
+        """Queue the conversion of a frame, without waiting for it.
+
+        Args:
+            image_path (str): Image file.
+            jpeg_path (str): JPEG file to write.
+            thumbnail_path (str): Thumbnail file to write.
+            lims_image (dict): Image stored in the LIMS after the conversion.
+                The image is not stored if None.
+        Returns:
+            (bool): True if the frame was queued, False if it was already
+                    queued or the queue is full.
+        """
+        if image_path in self._paths:
+            return False
+        if len(self._paths) >= self.max_pending:
+            logging.getLogger("HWR").warning(
+                "Image preview: %d frames pending, no preview of %s",
+                len(self._paths),
+                image_path,
+            )
+            if lims_image is not None:
+                self.lims_writer.submit("store_image", lims_image)
+            return False
+
+        self._paths.add(image_path)
+        self._queue.append(Frame(image_path, jpeg_path, thumbnail_path, lims_image))
+        self._idle.clear()
+        self._submitted.set()
+        self._start()
+        return True
+
+    def flush(self, timeout=None):
+        """Wait until all the queued frames are converted.
+
+        The images stored in the LIMS are waited for with lims_writer.flush.
+
+        Args:
+            timeout (float): Timeout [s]. Wait forever if None.
+        Returns:
+            (bool): True if all the frames were converted.
+        """
+        return self._idle.wait(timeout)
+
+    def stop(self):
+        """Stop the conversions. The queued frames are dropped."""
+        gevent.killall(self._workers)
+        self._workers = []
+        self._queue.clear()
+        self._paths.clear()
+        self._idle.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _start(self):
+        self._workers = [worker for worker in self._workers if not worker.dead]
+        while len(self._workers) < max(self.processes or self.workers, 1):
+            self._workers.append(gevent.spawn(self._run))
+
+    def _run(self):
+        while True:
+            if not self._queue:
+                self._submitted.clear()
+                self._submitted.wait()
+                continue
+
+            frame = self._queue.popleft()
+            start_time = time.monotonic()
+            try:
+                self._convert(frame)
+            except Exception:
+                logging.getLogger("HWR").exception(
+                    "Image preview: could not convert %s", frame.image_path
+                )
+            else:
+                self.conversion_times.append(time.monotonic() - start_time)
+            finally:
+                if frame.lims_image is not None:
+                    self.lims_writer.submit("store_image", frame.lims_image)
+                self._paths.discard(frame.image_path)
+                if not self._paths:
+                    self._idle.set()
+
+    def _convert(self, frame):
+        args = (frame.image_path, frame.jpeg_path, frame.thumbnail_path)
+        if not self.processes:
+            return self.convert(*args)
+
+        if self._executor is None:
+            # Not forked, as the parent process runs the gevent hub
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                self.processes, mp_context=multiprocessing.get_context("spawn")
+            )
+        future = self._executor.submit(self.convert, *args)
+        # Wait in a thread, so that the other greenlets keep running
+        return gevent.get_hub().threadpool.apply(future.result)
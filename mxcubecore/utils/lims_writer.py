@@ -0,0 +1,304 @@
+#! /usr/bin/env python
+# encoding: utf-8
+#
+# License:
+#
+# This file is part of MXCuBE.
+#
+# MXCuBE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MXCuBE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with MXCuBE. If not, see <https://www.gnu.org/licenses/>.
+
+"""Write-behind queue of LIMS records
+
+The records (a LIMS method name and its arguments) are sent one by one by a
+background greenlet, in the order they were submitted, so that the updates
+and the images of a data collection reach the LIMS in order. A record which
+fails with a connection error is retried, with an increasing delay, before
+the next ones, as long as the LIMS is down. A record which fails with another
+error is logged and moved to the dead letter file.
+
+With a spool file, the records are also appended to it, one JSON line per
+record, and synced to disk. The offset of the records already sent is kept in
+a second file (the spool file with an .offset suffix), and the records left
+from a previous run are sent at start. The spool file is emptied when all its
+records are sent. After a crash the last record may be sent twice.
+
+Example:
+    writer = LimsWriteQueue(spool_file="/var/spool/mxcube/lims.jsonl")
+    writer.submit("update_data_collection", collection_parameters)
+    writer.submit("store_image", image_parameters)
+    writer.flush(timeout=30)
+"""
+
+import collections
+import json
+import logging
+import os
+import time
+
+import gevent
+import gevent.event
+
+from mxcubecore import HardwareRepository as HWR
+
+try:
+    from suds.transport import TransportError
+except ImportError:
+    TransportError = None
+
+__credits__ = ["MXCuBE collaboration"]
+
+# Errors after which a record is sent again, the LIMS being unreachable
+if TransportError is None:
+    RETRY_ERRORS = (OSError,)
+else:
+    RETRY_ERRORS = (OSError, TransportError)
+
+
+class LimsWriteQueue:
+    """LIMS records sent in order by a background greenlet"""
+
+    def __init__(
+        self,
+        spool_file=None,
+        lims=None,
+        retry_delay=1.0,
+        max_retry_delay=60.0,
+        dead_letter_file=None,
+    ):
+        """
+        Args:
+            spool_file (str): File keeping the pending records. No spool if None.
+            lims (AbstractLims): LIMS receiving the records.
+                The default is HWR.beamline.lims, when each record is sent.
+            retry_delay (float): Delay [s] before the first retry of a record.
+            max_retry_delay (float): Maximum delay [s] between the retries.
+            dead_letter_file (str): File receiving the records which could not
+                be sent. The default is the spool file with a .failed suffix,
+                the records are only logged if there is no spool file.
+        """
+        self.spool_file = spool_file
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        if dead_letter_file is None and spool_file:
+            dead_letter_file = spool_file + ".failed"
+        self.dead_letter_file = dead_letter_file
+        self._lims = lims
+        # (record, offset of its end in the spool file)
+        self._records = collections.deque()
+        self._submitted = gevent.event.Event()
+        self._idle = gevent.event.Event()
+        self._idle.set()
+        self._worker = None
+
+        if self.spool_file:
+            self._records.extend(self._read_spool())
+            if self._records:
+                logging.getLogger("HWR").info(
+                    "LIMS writer: %d records left in %s",
+                    len(self._records),
+                    self.spool_file,
+                )
+                self._start()
+
+    @property
+    def lims(self):
+        """LIMS receiving the records"""
+        if self._lims is not None:
+            return self._lims
+        return HWR.beamline.lims
+
+    @property
+    def pending(self):
+        """Number of records not sent yet"""
+        return len(self._records)
+
+    def submit(self, method, *args):
+        """Queue a record, without waiting for it to be sent.
+
+        The arguments are copied as JSON, so later changes of them are not
+        sent. Dictionary keys which are not strings are left out.
+
+        Args:
+            method (str): Name of the LIMS method.
+            args: Arguments of the LIMS method.
+        """
+        record = json.loads(
+            json.dumps({"method": method, "args": args}, skipkeys=True, default=str)
+        )
+        end_offset = None
+        if self.spool_file:
+            end_offset = self._append(self.spool_file, record)
+        self._records.append((record, end_offset))
+        self._start()
+
+    def flush(self, timeout=None):
+        """Wait until all the records are sent.
+
+        Args:
+            timeout (float): Timeout [s]. Wait forever if None.
+        Returns:
+            (bool): True if all the records were sent.
+        """
+        return self._idle.wait(timeout)
+
+    def stop(self):
+        """Stop sending the records. Pending records stay in the spool file."""
+        if self._worker is not None:
+            self._worker.kill()
+            self._worker = None
+
+    def _start(self):
+        self._idle.clear()
+        self._submitted.set()
+        if self._worker is None or self._worker.dead:
+            self._worker = gevent.spawn(self._run)
+
+    def _run(self):
+        while True:
+            self._submitted.clear()
+            if not self._records:
+                self._idle.set()
+                self._submitted.wait()
+                continue
+
+            record, end_offset = self._records[0]
+            start_time = time.monotonic()
+            sent = self._send(record)
+            self._records.popleft()
+            if self.spool_file:
+                self._sent_to(end_offset)
+            if sent:
+                logging.getLogger("HWR").debug(
+                    "LIMS writer: %s record sent in %.3f s",
+                    record["method"],
+                    time.monotonic() - start_time,
+                )
+
+    def _send(self, record):
+        """Call the LIMS method of a record, retrying on connection errors
+        until it is sent or the writer is stopped.
+
+        Returns:
+            (bool): True if the record was sent, False if it was given up.
+        """
+        method = record["method"]
+        delay = self.retry_delay
+        while True:
+            try:
+                getattr(self.lims, method)(*record["args"])
+                return True
+            except RETRY_ERRORS as err:
+                logging.getLogger("HWR").warning(
+                    "LIMS writer: %s failed (%s), retrying in %.1f s",
+                    method,
+                    err,
+                    delay,
+                )
+            except Exception:
+                self._give_up(record, "with an error which is not retried")
+                return False
+
+            gevent.sleep(delay)
+            delay = min(2 * delay, self.max_retry_delay)
+
+    def _give_up(self, record, reason):
+        """Log a record which could not be sent, and move it to the dead
+        letter file. Called from the exception handler.
+        """
+        if not self.dead_letter_file:
+            logging.getLogger("HWR").exception(
+                "LIMS writer: %s failed %s, record dropped: %s",
+                record["method"],
+                reason,
+                json.dumps(record),
+            )
+            return
+        logging.getLogger("HWR").exception(
+            "LIMS writer: %s failed %s, record moved to %s",
+            record["method"],
+            reason,
+            self.dead_letter_file,
+        )
+        try:
+            self._append(self.dead_letter_file, record)
+        except OSError:
+            logging.getLogger("HWR").exception(
+                "LIMS writer: cannot write %s, record lost: %s",
+                self.dead_letter_file,
+                json.dumps(record),
+            )
+
+    @property
+    def _offset_file(self):
+        return self.spool_file + ".offset"
+
+    def _read_spool(self):
+        """Records of the spool file not sent yet, with their end offsets"""
+        records = []
+        try:
+            with open(self.spool_file, "rb") as fp0:
+                offset = self._read_offset()
+                if offset > os.fstat(fp0.fileno()).st_size:
+                    # the spool file was emptied, not the offset file
+                    offset = 0
+                fp0.seek(offset)
+                for line in fp0:
+                    offset += len(line)
+                    try:
+                        records.append((json.loads(line), offset))
+                    except ValueError:
+                        logging.getLogger("HWR").warning(
+                            "LIMS writer: ignoring invalid record in %s",
+                            self.spool_file,
+                        )
+        except FileNotFoundError:
+            pass
+        return records
+
+    def _read_offset(self):
+        try:
+            with open(self._offset_file, "r") as fp0:
+                return int(fp0.read())
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _sent_to(self, offset):
+        """Record that the spool file was sent up to offset. The spool file
+        is emptied when all its records are sent.
+        """
+        if not self._records:
+            with open(self.spool_file, "r+b") as fp0:
+                fp0.truncate()
+                os.fsync(fp0.fileno())
+            offset = 0
+        # fixed width, so that the offset file is overwritten in place
+        fd = os.open(self._offset_file, os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            os.pwrite(fd, b"%020d\n" % offset, 0)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _append(path, record):
+        """Append a record to a file, synced to disk.
+
+        Returns:
+            (int): Offset of the end of the record in the file.
+        """
+        with open(path, "ab") as fp0:
+            fp0.write(json.dumps(record).encode() + b"\n")
+            fp0.flush()
+            os.fsync(fp0.fileno())
+            return fp0.tell()
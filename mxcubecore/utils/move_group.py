@@ -0,0 +1,139 @@
+#! /usr/bin/env python
+# encoding: utf-8
+#
+# License:
+#
+# This file is part of MXCuBE.
+#
+# MXCuBE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MXCuBE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with MXCuBE. If not, see <https://www.gnu.org/licenses/>.
+
+"""Move several motors at once and wait for all of them
+
+All the moves are started before waiting, either with one set_value per motor
+or with a single command moving all the motors (e.g. the MD2/MD3
+startSimultaneousMoveMotors). The wait is on the ready event of each motor
+which went BUSY, so that the group is done as soon as the last moving motor is
+ready. When the controller reports the end of the moves with its own state
+(e.g. the diffractometer state), a single wait_ready function replaces the
+wait on each motor.
+
+Example:
+    group = MoveGroup({phiy: 0.12, phiz: -0.3, sampx: 0.05})
+    group.move(timeout=30)
+    logging.getLogger("HWR").debug("Move times: %s", group.move_times)
+"""
+
+import logging
+import time
+
+import gevent
+
+__credits__ = ["MXCuBE collaboration"]
+
+
+class MoveGroup:
+    """Motors moved together, with a single wait for the end of all moves"""
+
+    def __init__(self, motors_positions, start_move=None, wait_ready=None):
+        """
+        Args:
+            motors_positions (dict): Target position of each motor object.
+                Motors or positions which are None are skipped.
+            start_move (callable): Start the moves of all the motors with a
+                single command, called with the motors_positions dictionary.
+                The default is to call set_value on each motor.
+            wait_ready (callable): Wait for the end of all the moves, called
+                with the timeout. The default is to wait on each motor.
+        """
+        self.motors_positions = {
+            motor: position
+            for motor, position in motors_positions.items()
+            if motor is not None and position is not None
+        }
+        self.start_move = start_move
+        self.wait_ready = wait_ready
+        # Time [s] from the start of the moves to each motor being ready
+        self.move_times = {}
+        self._start_time = None
+
+    def start(self):
+        """Start the moves of all the motors, without waiting"""
+        self.move_times = {}
+        self._start_time = time.monotonic()
+        if not self.motors_positions:
+            return
+        if self.start_move is not None:
+            self.start_move(self.motors_positions)
+        else:
+            for motor, position in self.motors_positions.items():
+                motor.set_value(position)
+
+    def wait(self, timeout=None):
+        """Wait until all the motors are ready.
+
+        Only the motors which are BUSY are waited for, the others (e.g. the
+        motors without state) are done at once.
+
+        Args:
+            timeout (float): Timeout [s]. Wait forever if None.
+        Raises:
+            RuntimeError: Timeout waiting for the motors.
+        """
+        if self.wait_ready is not None:
+            self.wait_ready(timeout)
+            move_time = time.monotonic() - self._start_time
+            for motor in self.motors_positions:
+                self.move_times[motor.name()] = move_time
+        else:
+            self._wait_motors(timeout)
+
+        logging.getLogger("HWR").debug(
+            "Move group done, move times [s]: %s",
+            ", ".join(
+                "%s=%.3f" % (name, move_time)
+                for name, move_time in self.move_times.items()
+            ),
+        )
+
+    def move(self, timeout=None):
+        """Start the moves and wait until all the motors are ready.
+
+        Args:
+            timeout (float): Timeout [s]. Wait forever if None.
+        Returns:
+            (dict): Time [s] from the start of the moves to each motor ready,
+                    by motor name.
+        """
+        self.start()
+        self.wait(timeout)
+        return self.move_times
+
+    def _wait_motors(self, timeout):
+        waiters = []
+        for motor in self.motors_positions:
+            if motor.get_state() == motor.STATES.BUSY:
+                waiters.append(gevent.spawn(self._wait_motor, motor))
+            else:
+                self.move_times[motor.name()] = time.monotonic() - self._start_time
+        try:
+            with gevent.Timeout(
+                timeout, RuntimeError("Timeout waiting for the motors move")
+            ):
+                gevent.joinall(waiters, raise_error=True)
+        finally:
+            gevent.killall(waiters)
+
+    def _wait_motor(self, motor):
+        motor.wait_ready()
+        self.move_times[motor.name()] = time.monotonic() - self._start_time
@@ -0,0 +1,163 @@
+#! /usr/bin/env python
+# encoding: utf-8
+#
+# License:
+#
+# This file is part of MXCuBE.
+#
+# MXCuBE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MXCuBE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with MXCuBE. If not, see <https://www.gnu.org/licenses/>.
+
+"""Allocation of the next free file or directory name
+
+Finds the first free name of a numbered series (e.g. scan_1.raw, scan_2.raw,
+...) with a single os.scandir of the directory, instead of one stat per name
+already used. The names found in each directory are cached, and the cache is
+read again only when the modification time of the directory changed.
+
+The name found can also be created, with O_CREAT | O_EXCL for a file or
+os.mkdir for a directory, so that two writers (processes or hosts) never get
+the same name: if the name was taken in between, the next one is tried.
+
+Example:
+    index, name = next_free_name(
+        "/data/visitor/mx1234/id30a1/RAW_DATA",
+        "scan_%d.raw",
+        first="scan.raw",
+        create="file",
+    )
+"""
+
+import os
+
+__credits__ = ["MXCuBE collaboration"]
+
+_DEFAULT_ALLOCATOR = None
+
+
+def next_free_name(directory, pattern, start=1, first=None, create=None):
+    """Find the next free name, with the shared allocator.
+
+    See NameAllocator.next_free_name.
+    """
+    global _DEFAULT_ALLOCATOR
+    if _DEFAULT_ALLOCATOR is None:
+        _DEFAULT_ALLOCATOR = NameAllocator()
+    return _DEFAULT_ALLOCATOR.next_free_name(directory, pattern, start, first, create)
+
+
+class NameAllocator:
+    """Cached index of the names used in directories"""
+
+    def __init__(self):
+        # Modification time and set of names, by directory
+        self._names = {}
+
+    def clear(self):
+        """Forget the names of all the directories"""
+        self._names.clear()
+
+    def used_names(self, directory):
+        """Get the names used in a directory.
+
+        Args:
+            directory (str): Directory.
+        Returns:
+            (set): Names of the files and directories in it (not a copy).
+        """
+        directory = os.path.abspath(directory)
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+        except FileNotFoundError:
+            self._names.pop(directory, None)
+            return set()
+
+        cached = self._names.get(directory)
+        if cached is None or cached[0] != mtime:
+            with os.scandir(directory) as entries:
+                names = {entry.name for entry in entries}
+            cached = (mtime, names)
+            self._names[directory] = cached
+        return cached[1]
+
+    def next_free_name(self, directory, pattern, start=1, first=None, create=None):
+        """Find the next free name in a directory.
+
+        The name returned is marked as used, so that it is not returned again
+        while the directory is not modified, even if it is not created.
+
+        Args:
+            directory (str): Directory of the name.
+            pattern (str): Name, with a %-format for the index, e.g. "run_%d".
+            start (int): First index tried.
+            first (str): Name tried before the numbered ones, e.g. "run".
+            create (str): None to only find the name, "file" to create an
+                empty file or "directory" to create a directory. The
+                directory tree is created if needed.
+        Returns:
+            (tuple): Index (None for the first name) and name.
+        Raises:
+            ValueError: Invalid create value.
+        """
+        if create not in (None, "file", "directory"):
+            raise ValueError("Invalid create value %r" % create)
+        directory = os.path.abspath(directory)
+        if create is not None:
+            os.makedirs(directory, exist_ok=True)
+        names = self.used_names(directory)
+
+        candidates = []
+        if first is not None:
+            candidates.append((None, first))
+        index = start
+        while True:
+            if candidates:
+                index_name = candidates.pop()
+            else:
+                index_name = (index, pattern % index)
+                index += 1
+            name = index_name[1]
+            if name in names:
+                continue
+            if self._take(os.path.join(directory, name), create):
+                # Keep the cache valid for the next allocations
+                names.add(name)
+                self._update_mtime(directory)
+                return index_name
+            # Created by somebody else since the scan
+            names.add(name)
+
+    def _take(self, path, create):
+        """Check that a name is free, and create it if requested"""
+        if create is None:
+            # The cache may miss a name created within the timestamp
+            # resolution of the directory, hence a last check
+            return not os.path.lexists(path)
+        try:
+            if create == "file":
+                os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666))
+            else:
+                os.mkdir(path)
+        except FileExistsError:
+            return False
+        return True
+
+    def _update_mtime(self, directory):
+        cached = self._names.get(directory)
+        if cached is not None:
+            try:
+                mtime = os.stat(directory).st_mtime_ns
+            except FileNotFoundError:
+                self._names.pop(directory, None)
+            else:
+                self._names[directory] = (mtime, cached[1])
@@ -0,0 +1,288 @@
+#! /usr/bin/env python
+# encoding: utf-8
+#
+# License:
+#
+# This file is part of MXCuBE.
+#
+# MXCuBE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# MXCuBE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with MXCuBE. If not, see <https://www.gnu.org/licenses/>.
+
+"""Faster reading and writing of the XSData (EDNA) XML files
+
+The generated XSData classes parse with xml.dom.minidom. parse_file and
+parse_string build the same objects from an xml.etree.ElementTree tree (C
+parser), presented to the generated build methods with the minidom node
+attributes they use.
+
+The per-image Dozor results are also read and written directly as arrays,
+without an XSData object per image: iter_dozor_images streams the images
+with ElementTree.iterparse, read_dozor_result collects them as arrays and
+write_dozor_result writes the arrays. dozor_result_from_arrays builds the
+XSData objects in bulk, when they are needed.
+
+All the functions are blocking. Run them with run_in_thread so that the
+gevent loop keeps running meanwhile.
+
+Example:
+    result = run_in_thread(parse_file, XSDataResultMXCuBE, results_file)
+    run_in_thread(write_dozor_result, filename, number=numbers, score=scores)
+"""
+
+import io
+import xml.etree.ElementTree as ElementTree
+from xml.dom import Node
+
+import gevent
+import numpy as np
+
+__credits__ = ["MXCuBE collaboration"]
+
+# Per-image fields of the Dozor results, with their XSData type
+DOZOR_FIELDS = (
+    ("number", "integer"),
+    ("spots_num_of", "integer"),
+    ("spots_resolution", "double"),
+    ("score", "double"),
+)
+
+_VALUE_FORMATS = {"integer": "%d", "double": "%e"}
+
+
+def run_in_thread(function, *args, **kwargs):
+    """Call a function in the gevent thread pool and wait for its result,
+    letting the other greenlets run meanwhile.
+
+    Args:
+        function (callable): Function to call.
+        args: Arguments of the function.
+        kwargs: Keyword arguments of the function.
+    Returns:
+        The value returned by the function.
+    """
+    return gevent.get_hub().threadpool.apply(function, args, kwargs)
+
+
+class _TextNode:
+    """Text content, as a minidom Text node"""
+
+    __slots__ = ("nodeValue",)
+    nodeType = Node.TEXT_NODE
+    nodeName = "#text"
+    childNodes = ()
+    firstChild = None
+
+    def __init__(self, value):
+        self.nodeValue = value
+
+
+class _ElementNode:
+    """ElementTree element, with the minidom Element attributes used by the
+    generated build methods. The text between child elements (indentation)
+    is left out, as the build methods ignore it.
+    """
+
+    __slots__ = ("_element", "nodeName")
+    nodeType = Node.ELEMENT_NODE
+    nodeValue = None
+
+    def __init__(self, element):
+        self._element = element
+        self.nodeName = element.tag.rpartition("}")[2]
+
+    @property
+    def childNodes(self):
+        if len(self._element):
+            return [_ElementNode(child) for child in self._element]
+        if self._element.text:
+            return [_TextNode(self._element.text)]
+        return []
+
+    @property
+    def firstChild(self):
+        child_nodes = self.childNodes
+        return child_nodes[0] if child_nodes else None
+
+    def toxml(self):
+        # Only used in the error messages of the generated code
+        return ElementTree.tostring(self._element, encoding="unicode")
+
+
+def parse_file(xsdata_class, source):
+    """Parse an XSData file, as xsdata_class.parseFile does.
+
+    Args:
+        xsdata_class (class): Generated XSData class of the root element.
+        source (str or file): File name or binary file object.
+    Returns:
+        XSData object.
+    """
+    root = xsdata_class()
+    root.build(_ElementNode(ElementTree.parse(source).getroot()))
+    return root
+
+
+def parse_string(xsdata_class, string):
+    """Parse an XSData XML string, as xsdata_class.parseString does.
+
+    Args:
+        xsdata_class (class): Generated XSData class of the root element.
+        string (str or bytes): XML.
+    Returns:
+        XSData object.
+    """
+    if isinstance(string, str):
+        string = string.encode("utf-8")
+    return parse_file(xsdata_class, io.BytesIO(string))
+
+
+def iter_dozor_images(source):
+    """Read the images of a Dozor result one by one, in constant memory.
+
+    Args:
+        source (str or file): File name or binary file object.
+    Yields:
+        (dict): Value of each field present in the image, by field name.
+    """
+    types = dict(DOZOR_FIELDS)
+    root = None
+    image = {}
+    field = None
+    for event, element in ElementTree.iterparse(source, events=("start", "end")):
+        name = element.tag.rpartition("}")[2]
+        if event == "start":
+            if root is None:
+                root = element
+            elif name == "imageDozor":
+                image = {}
+            elif name in types and field is None:
+                field = name
+            continue
+
+        if name == "value" and field is not None:
+            text = (element.text or "").strip()
+            image[field] = int(text) if types[field] == "integer" else float(text)
+        elif name == field:
+            field = None
+        elif name == "imageDozor":
+            yield image
+            # Drop the images read
+            del root[:]
+
+
+def read_dozor_result(source):
+    """Read the per-image fields of a Dozor result as arrays.
+
+    Args:
+        source (str or file): File name or binary file object.
+    Returns:
+        (dict): Array of each field (number, spots_num_of, spots_resolution,
+                score), in the order of the images. Missing values are NaN.
+    """
+    columns = {name: [] for name, _ in DOZOR_FIELDS}
+    for image in iter_dozor_images(source):
+        for name, values in columns.items():
+            values.append(image.get(name, np.nan))
+    return {name: np.array(values, dtype=float) for name, values in columns.items()}
+
+
+def write_dozor_result(filename, **fields):
+    """Write per-image results as an XSDataResultControlDozor file.
+
+    The file is the same as exportToFile of the result built from the
+    arrays, without building the objects.
+
+    Args:
+        filename (str): File to write.
+        fields: Array of each per-image field (number, spots_num_of,
+            spots_resolution, score), all of the same length.
+    Raises:
+        ValueError: Unknown field or arrays of different lengths.
+    """
+    columns = _dozor_columns(fields)
+    indent = " " * 4
+    lines = ['<?xml version="1.0" ?>\n', "<XSDataResultControlDozor>\n"]
+    image_format = ""
+    for name, xsd_type in DOZOR_FIELDS:
+        if name in columns:
+            image_format += "%s<%s>\n%s<value>%s</value>\n%s</%s>\n" % (
+                indent * 2,
+                name,
+                indent * 3,
+                _VALUE_FORMATS[xsd_type],
+                indent * 2,
+                name,
+            )
+    image_format = "%s<imageDozor>\n%s%s</imageDozor>\n" % (
+        indent,
+        image_format,
+        indent,
+    )
+    rows = zip(*[columns[name] for name, _ in DOZOR_FIELDS if name in columns])
+    lines.extend(image_format % row for row in rows)
+    lines.append("</XSDataResultControlDozor>\n")
+    with open(filename, "w") as outfile:
+        outfile.writelines(lines)
+
+
+def dozor_result_from_arrays(**fields):
+    """Build an XSDataResultControlDozor from per-image arrays.
+
+    Args:
+        fields: Array of each per-image field (number, spots_num_of,
+            spots_resolution, score), all of the same length.
+    Returns:
+        (XSDataResultControlDozor): Result with one image per array element.
+    Raises:
+        ValueError: Unknown field or arrays of different lengths.
+    """
+    from mxcubecore.HardwareObjects.XSDataCommon import XSDataDouble, XSDataInteger
+    from mxcubecore.HardwareObjects.XSDataControlDozorv1_1 import (
+        XSDataControlImageDozor,
+        XSDataResultControlDozor,
+    )
+
+    columns = _dozor_columns(fields)
+    classes = {"integer": XSDataInteger, "double": XSDataDouble}
+    names = [name for name, _ in DOZOR_FIELDS if name in columns]
+    types = [classes[xsd_type] for name, xsd_type in DOZOR_FIELDS if name in columns]
+    images = [
+        XSDataControlImageDozor(
+            **{
+                name: xsd_class(value)
+                for name, xsd_class, value in zip(names, types, row)
+            }
+        )
+        for row in zip(*[columns[name] for name in names])
+    ]
+    return XSDataResultControlDozor(imageDozor=images)
+
+
+def _dozor_columns(fields):
+    """Check the per-image arrays and convert them to lists of numbers"""
+    types = dict(DOZOR_FIELDS)
+    unknown = set(fields) - set(types)
+    if unknown:
+        raise ValueError("Unknown Dozor fields: %s" % ", ".join(sorted(unknown)))
+    columns = {}
+    for name, values in fields.items():
+        values = np.asarray(values)
+        if types[name] == "integer":
+            values = values.astype(int)
+        else:
+            values = values.astype(float)
+        # Python numbers format faster than numpy scalars
+        columns[name] = values.tolist()
+    if len({len(values) for values in columns.values()}) > 1:
+        raise ValueError("Dozor fields of different lengths")
+    return columns
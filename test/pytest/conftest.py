@@ -45,6 +45,32 @@ print(sys.path)
 # hwr.connect()
 
 
+def pytest_addoption(parser):
+    parser.addoption(
+        "--benchmark",
+        action="store_true",
+        default=False,
+        help="Run also the tests marked as benchmark",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "benchmark: timing comparison, skipped unless --benchmark is given",
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip the benchmarks by default, they are slow and timing dependent"""
+    if config.getoption("--benchmark"):
+        return
+    skip_benchmark = pytest.mark.skip(reason="benchmark, run with --benchmark")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip_benchmark)
+
+
 # This coding gives a new beamline load for each function call
 # This can easily be changed by chaging the scope,
 # but we may need to provide cleanup / object reloading in order to do that.
@@ -0,0 +1,89 @@
+"""Tests of the data collection setup steps of AbstractCollect"""
+
+import time
+
+import gevent
+import pytest
+
+from mxcubecore.HardwareObjects.abstract.AbstractCollect import (
+    AbstractCollect,
+    SetupStep,
+)
+
+STEP_TIME = 0.2
+
+
+@pytest.fixture
+def collect():
+    collect = AbstractCollect("collect")
+    collect.current_dc_parameters = {}
+    return collect
+
+
+def make_steps(done, failing=None):
+    def step(name):
+        def run():
+            if name == failing:
+                gevent.sleep(STEP_TIME / 2)
+                raise RuntimeError("%s failed" % name)
+            gevent.sleep(STEP_TIME)
+            done.append(name)
+
+        return run
+
+    return [
+        SetupStep("open_safety_shutter", step("open_safety_shutter"), ()),
+        SetupStep("store_in_lims", step("store_in_lims"), ()),
+        SetupStep("set_energy", step("set_energy"), ()),
+        SetupStep("set_resolution", step("set_resolution"), ("set_energy",)),
+        SetupStep(
+            "open_fast_shutter",
+            step("open_fast_shutter"),
+            ("open_safety_shutter", "set_resolution"),
+        ),
+    ]
+
+
+def test_setup_steps_concurrent(collect):
+    done = []
+    collect.parallel_setup = True
+    start = time.monotonic()
+    collect.run_setup_steps(make_steps(done))
+    elapsed = time.monotonic() - start
+
+    # the three independent steps overlap, the chain of three does not
+    assert 3 * STEP_TIME <= elapsed < 4 * STEP_TIME
+    assert done.index("set_resolution") > done.index("set_energy")
+    assert done[-1] == "open_fast_shutter"
+
+    step_times = collect.current_dc_parameters["setup_step_times"]
+    assert sorted(step_times) == sorted(done)
+    assert all(STEP_TIME <= value < 2 * STEP_TIME for value in step_times.values())
+
+
+def test_setup_steps_sequential(collect):
+    done = []
+    # the default
+    assert not collect.parallel_setup
+    start = time.monotonic()
+    collect.run_setup_steps(make_steps(done))
+
+    assert time.monotonic() - start >= 5 * STEP_TIME
+    assert done == [step.name for step in make_steps([])]
+
+
+def test_setup_step_failure(collect):
+    done = []
+    collect.parallel_setup = True
+    with pytest.raises(RuntimeError, match="set_energy failed"):
+        collect.run_setup_steps(make_steps(done, failing="set_energy"))
+    gevent.sleep(3 * STEP_TIME)
+
+    # the other steps were stopped, the depending ones never started
+    assert done == []
+
+
+def test_setup_step_unknown_dependency(collect):
+    steps = [SetupStep("open_fast_shutter", lambda: None, ("open_safety_shutter",))]
+    with pytest.raises(ValueError):
+        collect.run_setup_steps(steps)
@@ -153,15 +153,15 @@ class TestCommandObject:
             signal_name (str): Signal name.
         """
 
-        # Patch dispatcher methods to test in isolation
-        disconnect_patch = mocker.patch("mxcubecore.dispatcher.dispatcher.disconnect")
-        connect_patch = mocker.patch("mxcubecore.dispatcher.dispatcher.connect")
+        # Patch signal bus methods to test in isolation
+        disconnect_patch = mocker.patch("mxcubecore.dispatcher.signal_bus.disconnect")
+        connect_patch = mocker.patch("mxcubecore.dispatcher.signal_bus.connect")
 
         # Call method
         _callable_func = MagicMock()
         cmd_object.connect(signal_name=signal_name, callable_func=_callable_func)
 
-        # Check that patched dispatcher methods were called with expected parameters
+        # Check that patched signal bus methods were called with expected parameters
         disconnect_patch.assert_called_once_with(
             *(_callable_func, signal_name, cmd_object),
         )
@@ -201,13 +201,13 @@ class TestCommandObject:
             out_args (tuple): Output arguments.
         """
 
-        # Patch "dispatcher.send" method to test in isolation
-        send_patch = mocker.patch("mxcubecore.dispatcher.dispatcher.send")
+        # Patch "signal_bus.send" method to test in isolation
+        send_patch = mocker.patch("mxcubecore.dispatcher.signal_bus.send")
 
         # Call method
         cmd_object.emit(signal_name, *in_args)
 
-        # Check expected args passed to patched "dispatcher.send" method
+        # Check expected args passed to patched "signal_bus.send" method
         send_patch.assert_called_once_with(signal_name, cmd_object, *out_args)
 
     @pytest.mark.parametrize(
@@ -463,9 +463,9 @@ class TestChannelObject:
             signal_name (str): Signal name.
         """
 
-        # Patch dispatcher methods to test in isolation
-        disconnect_patch = mocker.patch("mxcubecore.dispatcher.dispatcher.disconnect")
-        connect_patch = mocker.patch("mxcubecore.dispatcher.dispatcher.connect")
+        # Patch signal bus methods to test in isolation
+        disconnect_patch = mocker.patch("mxcubecore.dispatcher.signal_bus.disconnect")
+        connect_patch = mocker.patch("mxcubecore.dispatcher.signal_bus.connect")
 
         # Call method
         _callable_func = MagicMock()
@@ -474,7 +474,7 @@ class TestChannelObject:
             callableFunc=_callable_func,
         )
 
-        # Check that patched dispatcher methods were called with expected parameters
+        # Check that patched signal bus methods were called with expected parameters
         disconnect_patch.assert_called_once_with(
             *(_callable_func, signal_name, channel_object),
         )
@@ -500,8 +500,8 @@ class TestChannelObject:
             signal_name (str): Signal name.
         """
 
-        # Patch "dispatcher.disconnect" to test in isolation
-        disconnect_patch = mocker.patch("mxcubecore.dispatcher.dispatcher.disconnect")
+        # Patch "signal_bus.disconnect" to test in isolation
+        disconnect_patch = mocker.patch("mxcubecore.dispatcher.signal_bus.disconnect")
 
         # Call method
         _callable_func = MagicMock()
@@ -510,7 +510,7 @@ class TestChannelObject:
             callableFunc=_callable_func,
         )
 
-        # Check "dispatcher.disconnect" patch was called with expected parameters
+        # Check "signal_bus.disconnect" patch was called with expected parameters
         disconnect_patch.assert_called_once_with(
             *(_callable_func, signal_name, channel_object),
         )
@@ -589,13 +589,13 @@ class TestChannelObject:
             out_args (tuple): Output arguments.
         """
 
-        # Patch "dispatcher.send" method to test in isolation
-        send_patch = mocker.patch("mxcubecore.dispatcher.dispatcher.send")
+        # Patch "signal_bus.send" method to test in isolation
+        send_patch = mocker.patch("mxcubecore.dispatcher.signal_bus.send")
 
         # Call method
         channel_object.emit(signal_name, *in_args)
 
-        # Check expected args passed to patched "dispatcher.send" method
+        # Check expected args passed to patched "signal_bus.send" method
         send_patch.assert_called_once_with(signal_name, channel_object, *out_args)
 
     @pytest.mark.parametrize(
@@ -0,0 +1,146 @@
+"""Tests of the DataPublisher columnar mode, against fakeredis or a local Redis
+
+Set the REDIS_URL environment variable (e.g. redis://localhost:6379/15) to run
+the tests and the benchmark against a Redis server.
+"""
+
+import json
+import os
+import time
+
+import numpy
+import pytest
+
+redis = pytest.importorskip("redis")
+
+from mxcubecore.HardwareObjects.DataPublisher import (  # noqa: E402
+    DataPublisher,
+    PlotDim,
+    pack_chunk,
+    unpack_chunk,
+)
+
+
+@pytest.fixture
+def publisher():
+    redis_url = os.environ.get("REDIS_URL")
+    if redis_url:
+        text_client = redis.Redis.from_url(redis_url, decode_responses=True)
+        binary_client = redis.Redis.from_url(redis_url)
+    else:
+        fakeredis = pytest.importorskip("fakeredis")
+        server = fakeredis.FakeServer()
+        text_client = fakeredis.FakeRedis(server=server, decode_responses=True)
+        binary_client = fakeredis.FakeRedis(server=server)
+
+    publisher = DataPublisher("data_publisher")
+    publisher._r = text_client
+    publisher._rb = binary_client
+    publisher.chunk_size = 100
+    yield publisher
+    text_client.flushdb()
+
+
+def test_pack_chunk():
+    columns = [numpy.arange(5.0), numpy.arange(5.0) ** 2, numpy.ones(5)]
+    unpacked = unpack_chunk(pack_chunk(columns))
+
+    assert unpacked.shape == (3, 5)
+    assert numpy.array_equal(unpacked, numpy.array(columns))
+
+
+def test_columnar_data(publisher):
+    publisher.register("scan", "Scan", "diode", columnar=True)
+    pubsub = publisher._rb.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe("HWR_DP_NEW_DATA_CHUNK_scan")
+
+    publisher.start("scan")
+    for idx in range(150):
+        publisher.pub("scan", {"x": idx, "y": 2 * idx})
+    publisher.pub_columns("scan", numpy.arange(150, 200), 2 * numpy.arange(150, 200))
+    publisher.stop("scan")
+
+    data = publisher.get_data("scan")
+    assert isinstance(data["x"], numpy.ndarray)
+    assert numpy.array_equal(data["x"], numpy.arange(200))
+    assert numpy.array_equal(data["y"], 2 * numpy.arange(200))
+    assert publisher.get_description("scan")[0]["running"] is False
+
+    frames = []
+    for _ in range(10):
+        # None is returned for the ignored subscribe message
+        message = pubsub.get_message(timeout=0.1)
+        if message:
+            frames.append(message["data"])
+    # start, one full chunk, the rest at stop, stop
+    assert json.loads(frames[0])["type"] == "start"
+    assert [unpack_chunk(frame).shape for frame in frames[1:-1]] == [
+        (2, 100),
+        (2, 100),
+    ]
+    assert json.loads(frames[-1])["type"] == "stop"
+
+
+@pytest.mark.parametrize("npoints", [1, 123, 379])
+def test_chunk_frames(publisher, npoints):
+    """Chunks of 123 points start with the JSON "{" in the point count"""
+    publisher.register("scan", "Scan", "diode", columnar=True)
+    emitted = []
+
+    def receiver(value):
+        emitted.append(value)
+
+    publisher.connect("data", receiver)
+    publisher.connect("start", receiver)
+
+    frame = pack_chunk([numpy.arange(npoints), numpy.zeros(npoints)])
+    publisher._handle_chunk(b"HWR_DP_NEW_DATA_CHUNK_scan", frame)
+    assert emitted[0]["id"] == "scan"
+    assert numpy.array_equal(emitted[0]["data"]["x"], numpy.arange(npoints))
+
+    publisher._handle_chunk(
+        b"HWR_DP_NEW_DATA_CHUNK_scan",
+        json.dumps({"type": "start", "data": {}}).encode(),
+    )
+    assert emitted[1]["name"] == "Scan"
+    with pytest.raises(ValueError):
+        unpack_chunk(json.dumps({"type": "stop"}).encode().ljust(16))
+
+
+def test_columnar_restart(publisher):
+    publisher.register("mesh", "Mesh", "diode", data_dim=PlotDim.TWO_D, columnar=True)
+    for npoints in (30, 10):
+        publisher.start("mesh")
+        publisher.pub_columns(
+            "mesh", numpy.arange(npoints), numpy.zeros(npoints), numpy.ones(npoints)
+        )
+        publisher.stop("mesh")
+
+    # data of the previous run was cleared at start
+    data = publisher.get_data("mesh")
+    assert [len(data[axis]) for axis in "xyz"] == [10, 10, 10]
+
+
+@pytest.mark.benchmark
+def test_benchmark_columnar_throughput(publisher, record_property):
+    npoints = 2000
+    rates = {}
+    for columnar in (False, True):
+        _id = "bench%d" % columnar
+        publisher.register(_id, "Benchmark", "diode", columnar=columnar)
+        desc = publisher._get_description(_id)
+        start = time.perf_counter()
+        publisher.start(_id)
+        for idx in range(npoints):
+            data = {"x": float(idx), "y": float(idx)}
+            publisher.pub(_id, data)
+            if not columnar:
+                # stored by the subscriber, one rpush per axis
+                publisher._append_data(_id, data, desc)
+        publisher.stop(_id)
+        rates[columnar] = npoints / (time.perf_counter() - start)
+        assert len(publisher.get_data(_id)["x"]) == npoints
+
+    record_property("per_point_rate", rates[False])
+    record_property("columnar_rate", rates[True])
+    assert rates[True] > rates[False]
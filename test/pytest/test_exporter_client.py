@@ -0,0 +1,226 @@
+"""Tests of the Exporter client against a local stand-in exporter server"""
+
+import time
+
+import gevent
+import gevent.queue
+import gevent.server
+import pytest
+
+from mxcubecore.Command import Exporter
+from mxcubecore.Command.exporter.ExporterClient import ExporterClient
+from mxcubecore.Command.exporter.StandardClient import (
+    PROTOCOL,
+    StreamFrameParser,
+    SocketError,
+)
+
+
+class StandInExporter:
+    """Minimal exporter server, serving properties from a dictionary.
+
+    Replies are sent in order, each one a fixed latency after its request
+    arrived, to mimic the network round trip to a real MD2/MD3 server.
+    """
+
+    def __init__(self, properties, latency=0.002):
+        self.properties = properties
+        self.latency = latency
+        self.requests = 0
+        self.reply_queues = set()
+        self.server = gevent.server.StreamServer(("127.0.0.1", 0), self.handle)
+
+    @property
+    def port(self):
+        return self.server.server_port
+
+    def start(self):
+        self.server.start()
+
+    def stop(self):
+        self.server.stop()
+
+    def send_event(self, name, value):
+        """Change a property and push the event to the connected clients"""
+        self.properties[name] = value
+        event = "EVT:%s\t%s\t%d" % (name, value, time.time() * 1000)
+        for replies in self.reply_queues:
+            replies.put((time.monotonic(), event))
+
+    def reply(self, request):
+        command, _, argument = request.partition(" ")
+        if command == "READ":
+            if argument not in self.properties:
+                return "ERR:no property %s" % argument
+            return "RET:%s" % self.properties[argument]
+        if command == "WRTE":
+            name, _, value = argument.partition(" ")
+            self.properties[name] = value
+            return "NULL"
+        if command in ("EXEC", "ASNC"):
+            method, _, _ = argument.partition(" ")
+            return "RET:%s" % method
+        if command == "NAME":
+            return "RET:StandInExporter"
+        return "ERR:unknown command"
+
+    def handle(self, sock, _address):
+        replies = gevent.queue.Queue()
+
+        def send_replies():
+            while True:
+                due, reply = replies.get()
+                gevent.sleep(max(0, due - time.monotonic()))
+                sock.sendall(b"\x02" + reply.encode() + b"\x03")
+
+        sender = gevent.spawn(send_replies)
+        self.reply_queues.add(replies)
+        parser = StreamFrameParser()
+        try:
+            while True:
+                data = sock.recv(4096)
+                if not data:
+                    break
+                for request in parser.feed(data):
+                    self.requests += 1
+                    replies.put((time.monotonic() + self.latency, self.reply(request)))
+        finally:
+            self.reply_queues.discard(replies)
+            sender.kill()
+            sock.close()
+
+
+@pytest.fixture
+def exporter_server():
+    server = StandInExporter({"Prop%d" % idx: idx for idx in range(100)})
+    server.start()
+    yield server
+    server.stop()
+
+
+def make_client(server, pipelined):
+    return ExporterClient(
+        "127.0.0.1", server.port, PROTOCOL.STREAM, 3, 1, pipelined=pipelined
+    )
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_read_write_property(exporter_server, pipelined):
+    client = make_client(exporter_server, pipelined)
+    assert client.read_property("Prop3") == "3"
+    assert client.write_property("Prop3", 42) is None
+    assert client.read_property("Prop3") == "42"
+    assert client.execute("getState") == "getState"
+    client.disconnect()
+
+
+def test_pipelined_replies_in_order(exporter_server):
+    exporter_server.latency = 0.05
+    client = make_client(exporter_server, True)
+    start = time.monotonic()
+    jobs = [gevent.spawn(client.read_property, "Prop%d" % idx) for idx in range(100)]
+    gevent.joinall(jobs, raise_error=True)
+
+    assert [job.value for job in jobs] == [str(idx) for idx in range(100)]
+    # the requests were in flight together, not one round trip each
+    assert time.monotonic() - start < 10 * exporter_server.latency
+    client.disconnect()
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_read_properties(exporter_server, pipelined):
+    client = make_client(exporter_server, pipelined)
+    names = ["Prop%d" % idx for idx in range(50)] + ["Missing", "Prop7"]
+    values = client.read_properties(names)
+
+    assert values == [str(idx) for idx in range(50)] + [None, "7"]
+    # single reads still work after a burst
+    assert client.read_property("Prop8") == "8"
+    client.disconnect()
+
+
+def test_read_channels(exporter_server):
+    server2 = StandInExporter({"Other": 1.5})
+    server2.start()
+    channels = []
+    try:
+        for name, port in (
+            ("Prop1", exporter_server.port),
+            ("Other", server2.port),
+            ("Prop2", exporter_server.port),
+        ):
+            channels.append(
+                Exporter.ExporterChannel(
+                    name, name, address="127.0.0.1", port=port, pipelined=True
+                )
+            )
+        requests = exporter_server.requests
+        assert channels[0].get_exporter() is channels[2].get_exporter()
+        assert channels[0].get_exporter().pipelined
+
+        assert Exporter.read_channels(channels) == [1, 1.5, 2]
+        assert exporter_server.requests == requests + 2
+    finally:
+        for channel in channels:
+            channel.get_exporter().disconnect()
+        Exporter.EXPORTER_CLIENTS.clear()
+        server2.stop()
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_execute_async(exporter_server, pipelined):
+    client = make_client(exporter_server, pipelined)
+    client.execute_async("startScan")
+    gevent.sleep(0.01)
+    # the reply to the asynchronous call is not taken for the next reply
+    assert client.read_property("Prop4") == "4"
+    assert client.read_properties(["Prop5", "Prop6"]) == ["5", "6"]
+    client.disconnect()
+
+
+def test_pipelined_mode_fixed(exporter_server):
+    address = ("127.0.0.1", exporter_server.port)
+    try:
+        client = Exporter.start_exporter(*address, pipelined="True")
+        assert client.pipelined
+        # no mode given: the client already started
+        assert Exporter.start_exporter(*address) is client
+        assert Exporter.start_exporter(*address, pipelined=True) is client
+        with pytest.raises(ValueError):
+            Exporter.start_exporter(*address, pipelined="False")
+        with pytest.raises(AttributeError):
+            client.pipelined = False
+    finally:
+        Exporter.EXPORTER_CLIENTS.clear()
+
+
+def test_pipelined_disconnect_fails_pending(exporter_server):
+    exporter_server.latency = 1
+    client = make_client(exporter_server, True)
+    job = gevent.spawn(client.read_property, "Prop1")
+    gevent.sleep(0.1)
+    client.disconnect()
+    with pytest.raises(SocketError):
+        job.get(timeout=1)
+
+
+@pytest.mark.benchmark
+def test_benchmark_pipelined_throughput(exporter_server, record_property):
+    nreads = 200
+    elapsed = {}
+    for pipelined in (False, True):
+        client = make_client(exporter_server, pipelined)
+        client.connect()
+        start = time.perf_counter()
+        jobs = [
+            gevent.spawn(client.read_property, "Prop%d" % (idx % 100))
+            for idx in range(nreads)
+        ]
+        gevent.joinall(jobs, raise_error=True)
+        elapsed[pipelined] = time.perf_counter() - start
+        client.disconnect()
+        assert [job.value for job in jobs] == [str(idx % 100) for idx in range(nreads)]
+
+    record_property("locked_reads_per_s", nreads / elapsed[False])
+    record_property("pipelined_reads_per_s", nreads / elapsed[True])
+    assert elapsed[True] < elapsed[False]
@@ -0,0 +1,94 @@
+"""Tests of the ExporterMotor state waits against a local stand-in exporter"""
+
+import time
+
+import gevent
+import pytest
+
+from mxcubecore.Command import Exporter
+from mxcubecore.HardwareObjects.ExporterMotor import ExporterMotor
+
+from test.pytest.test_exporter_client import StandInExporter
+
+
+@pytest.fixture
+def exporter_server():
+    server = StandInExporter(
+        {
+            "State": "Ready",
+            "HardwareState": "Ready",
+            "AlignmentYState": "Ready",
+            "AlignmentYPosition": 1.0,
+        }
+    )
+    server.start()
+    yield server
+    for client in Exporter.EXPORTER_CLIENTS.values():
+        client.disconnect()
+    Exporter.EXPORTER_CLIENTS.clear()
+    server.stop()
+
+
+def make_motor(exporter_server, state_events):
+    motor = ExporterMotor("phiy")
+    motor.set_property("actuator_name", "AlignmentY")
+    motor.set_property("exporter_address", "127.0.0.1:%d" % exporter_server.port)
+    motor.set_property("state_events", state_events)
+    motor.init()
+    return motor
+
+
+@pytest.fixture
+def motor(exporter_server):
+    return make_motor(exporter_server, True)
+
+
+def test_wait_ready_on_event(exporter_server, motor):
+    exporter_server.send_event("AlignmentYState", "Moving")
+    exporter_server.send_event("State", "Running")
+    gevent.sleep(0.1)
+    assert motor.get_state() == motor.STATES.BUSY
+
+    gevent.spawn_later(0.1, exporter_server.send_event, "State", "Ready")
+    gevent.spawn_later(0.1, exporter_server.send_event, "AlignmentYState", "Ready")
+    requests = exporter_server.requests
+    start = time.monotonic()
+    motor.wait_move(timeout=2)
+
+    # woken up by the events, before the fallback poll
+    assert time.monotonic() - start < motor.STATE_POLL_PERIOD
+    # a single read of each state when starting to wait, no polling
+    assert exporter_server.requests - requests <= 3
+    assert motor.get_state() == motor.STATES.READY
+
+
+def test_wait_ready_missed_event(exporter_server, motor):
+    exporter_server.properties["State"] = "Running"
+    motor.STATE_POLL_PERIOD = 0.1
+
+    # no event sent, the change is seen by the fallback poll
+    gevent.spawn_later(0.2, exporter_server.properties.__setitem__, "State", "Ready")
+    motor.wait_move(timeout=2)
+
+    exporter_server.properties["State"] = "Running"
+    with pytest.raises(RuntimeError):
+        motor.wait_move(timeout=0.3)
+
+
+def test_wait_motor_move(exporter_server, motor):
+    exporter_server.send_event("AlignmentYState", "Moving")
+    gevent.spawn_later(0.1, exporter_server.send_event, "AlignmentYState", "Ready")
+    motor.wait_motor_move(timeout=2)
+    assert motor.get_state() == motor.STATES.READY
+
+
+def test_wait_ready_without_state_events(exporter_server):
+    motor = make_motor(exporter_server, False)
+    assert motor.get_channel_object("HardwareState", optional=True) is None
+
+    exporter_server.properties["State"] = "Running"
+    gevent.spawn_later(0.1, exporter_server.properties.__setitem__, "State", "Ready")
+    start = time.monotonic()
+    motor.wait_move(timeout=2)
+    # polled as often as before the state events
+    assert time.monotonic() - start < 0.1 + motor.STATE_POLL_PERIOD
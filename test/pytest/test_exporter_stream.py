@@ -0,0 +1,117 @@
+"""Tests and benchmark of the Exporter stream framing"""
+
+import time
+
+import pytest
+
+from mxcubecore.Command.exporter.StandardClient import (
+    StreamFrameParser,
+    ProtocolError,
+    RECV_BUFFER_SIZE,
+    STX,
+    ETX,
+)
+
+
+def frame(msg):
+    return b"\x02" + msg.encode() + b"\x03"
+
+
+def chunks(data, size=RECV_BUFFER_SIZE):
+    return [data[idx : idx + size] for idx in range(0, len(data), size)]
+
+
+def legacy_parse(data_chunks):
+    """The byte by byte parser previously used in StandardClient.recv_thread"""
+    messages = []
+    buffer = b""
+    received_stx = False
+    for ret in data_chunks:
+        for b in ret:
+            if b == STX:
+                buffer = b""
+                received_stx = True
+            elif b == ETX:
+                if received_stx:
+                    messages.append(buffer.decode())
+                    received_stx = False
+                    buffer = b""
+            elif received_stx:
+                buffer += bytes([b])
+    return messages
+
+
+def parse(data_chunks):
+    parser = StreamFrameParser()
+    messages = []
+    for data in data_chunks:
+        messages.extend(parser.feed(data))
+    return messages
+
+
+def test_several_frames_per_chunk():
+    data = frame("RET:1") + frame("EVT:State\tReady\t1") + frame("NULL")
+    assert parse([data]) == ["RET:1", "EVT:State\tReady\t1", "NULL"]
+
+
+def test_frame_split_over_chunks():
+    data = frame("RET:" + "x" * 10000) + frame("RET:2")
+    for size in (1, 7, 4096):
+        assert parse(chunks(data, size)) == ["RET:" + "x" * 10000, "RET:2"]
+
+
+def test_garbage_and_restarted_frames():
+    data = b"junk\x03" + frame("RET:1") + b"\x02partial" + frame("RET:2") + b"tail"
+    assert parse([data]) == legacy_parse([data]) == ["RET:1", "RET:2"]
+
+
+def test_reused_receive_buffer():
+    parser = StreamFrameParser()
+    recv_buffer = bytearray(16)
+    # the frame is split within the two bytes of the "é"
+    data = frame("RET:é") + b"garbage" + frame("NUL")
+    recv_buffer[:6] = data[:6]
+    assert parser.feed(recv_buffer, 6) == []
+    recv_buffer[: len(data) - 6] = data[6:]
+    assert parser.feed(recv_buffer, len(data) - 6) == ["RET:é", "NUL"]
+
+    parser.reset()
+    recv_buffer[:] = frame("RET:é") + b"\x02RET:1\x03" + b"\x00"
+    assert parser.feed(recv_buffer, 13) == ["RET:é"]
+    assert parser.feed(b"1\x03") == ["RET:1"]
+
+
+def test_oversized_frame_dropped():
+    parser = StreamFrameParser(max_size=10)
+    assert parser.feed(b"\x02" + b"x" * 20) == []
+    assert parser.feed(b"yyy\x03") == []
+    assert parser.feed(frame("RET:1")) == ["RET:1"]
+
+
+def test_invalid_utf8():
+    with pytest.raises(ProtocolError):
+        StreamFrameParser().feed(b"\x02\xff\xfe\x03")
+
+
+@pytest.mark.benchmark
+def test_benchmark_against_legacy_parser(record_property):
+    """Synthetic exporter traffic: an event burst and large array replies"""
+    events = b"".join(
+        frame("EVT:AlignmentX\t%f\t%d" % (0.001 * idx, idx)) for idx in range(2000)
+    )
+    array = "RET:" + "\x1f".join("%.4f" % (0.5 * idx) for idx in range(4000))
+    traffic = chunks(events + frame(array) * 2)
+
+    start = time.perf_counter()
+    expected = legacy_parse(traffic)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    messages = parse(traffic)
+    parse_time = time.perf_counter() - start
+
+    record_property("legacy_ms", 1000 * legacy_time)
+    record_property("parser_ms", 1000 * parse_time)
+    assert messages == expected
+    assert len(messages) == 2002
+    assert parse_time < legacy_time
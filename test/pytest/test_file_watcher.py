@@ -0,0 +1,137 @@
+"""Tests of the FileWatcher hardware object"""
+
+import time
+
+import gevent
+import pytest
+
+from mxcubecore.HardwareObjects import FileWatcher as file_watcher_module
+from mxcubecore.HardwareObjects.FileWatcher import FileWatcher
+
+
+@pytest.fixture(params=[True, False], ids=["inotify", "polling"])
+def watcher(request):
+    watcher = FileWatcher("file_watcher")
+    watcher.init()
+    if not request.param:
+        watcher._inotify = None
+    watcher.max_poll_interval = 0.2
+    return watcher
+
+
+def write_later(path, delay, data=b"data"):
+    def write():
+        with open(path, "wb") as fp0:
+            fp0.write(data)
+
+    return gevent.spawn_later(delay, write)
+
+
+def test_wait_for(watcher, tmp_path):
+    path = tmp_path / "image_0001.cbf"
+    write_later(path, 0.3)
+    start = time.monotonic()
+    assert watcher.wait_for(str(path), timeout=5)
+    assert time.monotonic() - start < 0.3 + watcher.max_poll_interval + 0.1
+
+    # already there
+    assert watcher.wait_for(str(path), timeout=0)
+
+
+def test_wait_for_timeout(watcher, tmp_path):
+    start = time.monotonic()
+    assert not watcher.wait_for(str(tmp_path / "missing.cbf"), timeout=0.3)
+    assert 0.3 <= time.monotonic() - start < 1
+    gevent.sleep(0.01)
+    assert not watcher._directories
+
+
+def test_wait_for_many(watcher, tmp_path, monkeypatch):
+    scans = []
+    scan = file_watcher_module._DirectoryWatch._scan
+
+    def counting_scan(self):
+        scans.append(self.directory)
+        return scan(self)
+
+    monkeypatch.setattr(file_watcher_module._DirectoryWatch, "_scan", counting_scan)
+    paths = [str(tmp_path / ("image_%04d.cbf" % idx)) for idx in range(100)]
+    for idx, path in enumerate(paths):
+        write_later(path, 0.002 * idx)
+
+    assert watcher.wait_for_many(paths, timeout=10)
+    # the directory was scanned for all the files at once, no stat per file
+    assert len(scans) < len(paths)
+
+
+def test_wait_for_missing_directory(watcher, tmp_path):
+    directory = tmp_path / "raw"
+    path = directory / "image_0001.cbf"
+    gevent.spawn_later(0.1, directory.mkdir)
+    write_later(path, 0.2)
+    assert watcher.wait_for(str(path), timeout=5)
+
+
+def test_wait_for_stable_size(watcher, tmp_path):
+    path = tmp_path / "master.h5"
+
+    def copy():
+        with open(path, "wb") as fp0:
+            for _ in range(5):
+                fp0.write(b"x" * 1000)
+                fp0.flush()
+                gevent.sleep(0.05)
+
+    copy_task = gevent.spawn(copy)
+    assert watcher.wait_for_stable_size(str(path), timeout=5, stable_time=0.2)
+    assert copy_task.dead
+    assert path.stat().st_size == 5000
+
+
+def test_inotify_wakeup(tmp_path):
+    watcher = FileWatcher("file_watcher")
+    watcher.init()
+    if watcher._inotify is None:
+        pytest.skip("inotify not available")
+    # slow polling, the file arrival is seen through inotify
+    watcher.poll_interval = watcher.max_poll_interval = 5
+
+    path = tmp_path / "result.xml"
+    write_later(path, 0.2)
+    start = time.monotonic()
+    assert watcher.wait_for(str(path), timeout=10)
+    assert time.monotonic() - start < 1
+
+
+def test_closed_watch_not_reused(watcher, tmp_path):
+    closed = file_watcher_module._DirectoryWatch(watcher, str(tmp_path))
+    closed.closed = True
+    watcher._directories[str(tmp_path)] = closed
+
+    path = tmp_path / "image_0001.cbf"
+    write_later(path, 0.1)
+    assert watcher.wait_for(str(path), timeout=5)
+    assert not closed.pending and closed.task is None
+
+
+def test_shared_inotify_watch(tmp_path):
+    watcher = FileWatcher("file_watcher")
+    watcher.init()
+    if watcher._inotify is None:
+        pytest.skip("inotify not available")
+    watcher.poll_interval = watcher.max_poll_interval = 5
+
+    # two watches of the same directory get the same watch descriptor
+    first = file_watcher_module._DirectoryWatch(watcher, str(tmp_path))
+    second = file_watcher_module._DirectoryWatch(watcher, str(tmp_path))
+    first.add("first.xml")
+    arrived = second.add("second.xml")
+    gevent.sleep(0.1)
+    assert first.wd == second.wd
+
+    # the end of the first watch keeps the inotify watch of the second one
+    first.remove("first.xml")
+    gevent.sleep(0.1)
+    assert first.closed
+    (tmp_path / "second.xml").write_bytes(b"data")
+    assert arrived.wait(1)
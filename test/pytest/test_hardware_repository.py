@@ -0,0 +1,155 @@
+"""Tests of the loading of the configured objects"""
+
+import datetime
+import marshal
+import os
+import stat
+
+import pytest
+
+from mxcubecore import HardwareRepository as HWR
+from mxcubecore import HardwareObjectFileParser
+from mxcubecore.utils.config_cache import ConfigCache
+
+MOCKUP_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "../../mxcubecore/configuration/mockup")
+)
+
+BEAMLINE_CONFIG = """
+_initialise_class:
+  class: mxcubecore.HardwareObjects.Beamline.Beamline
+_load_parallel: true
+_dependencies:
+  resolution: [detector]
+_objects:
+  !!omap
+  - session: session.xml
+  - energy: energy-mockup.xml
+  - transmission: transmission-mockup.xml
+  - detector: detector-mockup.xml
+  - resolution: resolution-mockup.xml
+"""
+
+
+@pytest.fixture
+def config_dir(tmp_path):
+    HWR._instance = HWR.beamline = None
+    yield tmp_path
+    HWR.uninit_hardware_repository()
+
+
+def test_load_dependencies(config_dir):
+    (config_dir / "a.xml").write_text('<object><object href="/b" role="b"/></object>')
+    (config_dir / "b.xml").write_text('<object><object href="c" role="c"/></object>')
+    (config_dir / "c.xml").write_text("<object/>")
+    (config_dir / "d.yml").write_text("_objects:\n  x: a.xml\n")
+    HWR._instance = HWR.__HardwareRepositoryClient([str(config_dir)])
+
+    objects = {"a": "a.xml", "c": "c.xml", "d": "d.yml", "e": "e.xml"}
+    assert HWR._get_load_dependencies(objects, {"e": ["a", "unknown"]}) == {
+        "a": {"c"},
+        "c": set(),
+        "d": {"a", "c"},
+        "e": {"a"},
+    }
+    assert HWR._get_load_dependencies(objects, {"c": ["d"]}) is None
+
+
+def test_load_parallel(config_dir):
+    (config_dir / "beamline_config.yml").write_text(BEAMLINE_CONFIG)
+    HWR.init_hardware_repository(os.path.pathsep.join((str(config_dir), MOCKUP_DIR)))
+
+    beamline = HWR.beamline
+    for role in ("session", "energy", "transmission", "detector", "resolution"):
+        assert getattr(beamline, role) is not None, role
+    assert beamline.resolution.get_value() > 0
+
+
+def test_config_cache(config_dir, tmp_path_factory):
+    cache_dir = str(tmp_path_factory.mktemp("cache"))
+    (config_dir / "beamline_config.yml").write_text(BEAMLINE_CONFIG)
+    config_path = os.path.pathsep.join((str(config_dir), MOCKUP_DIR))
+
+    HWR.init_hardware_repository(config_path, cache_directory=cache_dir)
+    cache = HWR.CONFIG_CACHE
+    assert cache.hits == 0
+    assert cache.misses > 5
+    energy = HWR.beamline.energy.get_value()
+    misses = cache.misses
+
+    HWR.uninit_hardware_repository()
+    HWR.init_hardware_repository(config_path, cache_directory=cache_dir)
+    assert HWR.CONFIG_CACHE.misses == 0
+    assert HWR.CONFIG_CACHE.hits == misses
+    assert HWR.beamline.energy.get_value() == energy
+    assert HWR.beamline.resolution is not None
+
+    # a modified file is parsed again
+    (config_dir / "beamline_config.yml").write_text(
+        BEAMLINE_CONFIG.replace("  - resolution: resolution-mockup.xml\n", "")
+    )
+    HWR.uninit_hardware_repository()
+    HWR.init_hardware_repository(config_path, cache_directory=cache_dir)
+    assert HWR.CONFIG_CACHE.misses == 1
+    assert HWR.beamline.resolution is None
+
+
+def test_recorded_xml_events():
+    for name in ("diffractometer-mockup", "energy-mockup", "queue-model"):
+        with open(os.path.join(MOCKUP_DIR, name + ".xml")) as fp0:
+            xml_string = fp0.read()
+        events = HardwareObjectFileParser.record_events(xml_string)
+        events = marshal.loads(marshal.dumps(events))
+        hwobj1 = HardwareObjectFileParser.parse_string(xml_string, name)
+        hwobj2 = HardwareObjectFileParser.parse_events(events, xml_string, name)
+
+        assert type(hwobj1) is type(hwobj2)
+        assert hwobj1.get_properties() == hwobj2.get_properties()
+        assert list(hwobj1._objects_by_role) == list(hwobj2._objects_by_role)
+
+
+def test_config_cache_entries(tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    config_file = tmp_path / "config.yml"
+    config_file.write_text("a: 1\n")
+    cache = ConfigCache(str(cache_dir))
+    assert stat.S_IMODE(os.stat(str(cache_dir)).st_mode) == 0o700
+
+    def parse(content):
+        return {"content": content}
+
+    assert cache.load(str(config_file), parse) == {"content": "a: 1\n"}
+    assert cache.load(str(config_file), parse) == {"content": "a: 1\n"}
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    entry_path = cache.entry_path(str(config_file))
+    # an entry writable by others is not trusted
+    os.chmod(entry_path, 0o666)
+    cache.load(str(config_file), parse)
+    assert cache.misses == 2
+
+    # nor a corrupted one
+    with open(entry_path, "r+b") as fp0:
+        fp0.seek(-1, os.SEEK_END)
+        fp0.write(b"\0")
+    cache.load(str(config_file), parse)
+    assert cache.misses == 3
+
+    # nor one owned by another user
+    monkeypatch.setattr(os, "getuid", lambda: os.stat(entry_path).st_uid + 1)
+    cache.load(str(config_file), parse)
+    assert cache.misses == 4
+    with pytest.raises(PermissionError):
+        ConfigCache(str(cache_dir))
+
+
+def test_config_cache_not_marshallable(tmp_path):
+    config_file = tmp_path / "config.yml"
+    config_file.write_text("date: 2024-01-01\n")
+    cache = ConfigCache(str(tmp_path / "cache"))
+
+    def parse(content):
+        return {"date": datetime.date(2024, 1, 1)}
+
+    assert cache.load(str(config_file), parse) == parse(None)
+    assert not os.path.exists(cache.entry_path(str(config_file)))
@@ -0,0 +1,206 @@
+"""Tests of the background JPEG preview service"""
+
+import os
+import time
+
+import gevent
+import numpy
+import pytest
+
+from mxcubecore.HardwareObjects.abstract.AbstractMultiCollect import (
+    AbstractMultiCollect,
+)
+from mxcubecore.utils.image_preview import ImagePreviewService, make_jpeg
+from mxcubecore.utils.lims_writer import LimsWriteQueue
+
+CONVERT_TIME = 0.05
+
+Image = pytest.importorskip("PIL.Image")
+
+
+class LimsStub:
+    def __init__(self):
+        self.images = []
+
+    def store_image(self, image):
+        self.images.append(image["imageNumber"])
+
+
+class SlowConvert:
+    """Conversion by a remote service, recording the frames converted"""
+
+    def __init__(self, fail=()):
+        self.converted = []
+        self.fail = fail
+
+    def __call__(self, image_path, jpeg_path, thumbnail_path):
+        gevent.sleep(CONVERT_TIME)
+        if image_path in self.fail:
+            raise RuntimeError("conversion failed")
+        self.converted.append(image_path)
+
+
+def make_service(convert, **kwargs):
+    lims = LimsStub()
+    service = ImagePreviewService(
+        convert, processes=0, lims_writer=LimsWriteQueue(lims=lims), **kwargs
+    )
+    return service, lims
+
+
+def write_image(path, shape=(512, 512)):
+    data = numpy.random.RandomState(0).poisson(10, shape).astype(numpy.int32)
+    data[200:210, 300:310] = 5000
+    Image.fromarray(data).save(path)
+
+
+def tick(ticks):
+    while True:
+        gevent.sleep(0.01)
+        ticks.append(time.monotonic())
+
+
+def test_frames_in_background():
+    convert = SlowConvert()
+    service, lims = make_service(convert)
+    start = time.monotonic()
+    for frame in range(1, 4):
+        assert service.frame_ready(
+            "img_%d.cbf" % frame, "j", "t", {"imageNumber": frame}
+        )
+    # queueing does not wait for the conversions
+    assert time.monotonic() - start < CONVERT_TIME
+    assert service.pending == 3
+
+    assert service.flush(timeout=5)
+    assert service.lims_writer.flush(timeout=5)
+    assert sorted(convert.converted) == ["img_1.cbf", "img_2.cbf", "img_3.cbf"]
+    assert sorted(lims.images) == [1, 2, 3]
+    assert len(service.conversion_times) == 3
+
+
+def test_concurrent_conversions():
+    convert = SlowConvert()
+    service, lims = make_service(convert, workers=4)
+    start = time.monotonic()
+    for frame in range(1, 9):
+        service.frame_ready("img_%d.cbf" % frame, "j", "t", {"imageNumber": frame})
+    assert service.flush(timeout=5)
+
+    # 4 conversions at a time
+    assert time.monotonic() - start < 4 * CONVERT_TIME
+    assert len(convert.converted) == 8
+
+
+def test_dedup_and_bounded_queue():
+    convert = SlowConvert()
+    service, lims = make_service(convert, max_pending=2)
+    assert service.frame_ready("img_1.cbf", "j", "t", {"imageNumber": 1})
+    assert not service.frame_ready("img_1.cbf", "j", "t", {"imageNumber": 1})
+    assert service.frame_ready("img_2.cbf", "j", "t", {"imageNumber": 2})
+    # the queue is full: no preview, but the image is still stored
+    assert not service.frame_ready("img_3.cbf", "j", "t", {"imageNumber": 3})
+
+    assert service.flush(timeout=5)
+    assert service.lims_writer.flush(timeout=5)
+    assert sorted(convert.converted) == ["img_1.cbf", "img_2.cbf"]
+    assert sorted(lims.images) == [1, 2, 3]
+    # a frame done can be queued again
+    assert service.frame_ready("img_1.cbf", "j", "t")
+    service.stop()
+
+
+def test_failed_conversion_still_stored():
+    convert = SlowConvert(fail=("img_1.cbf",))
+    service, lims = make_service(convert)
+    service.frame_ready("img_1.cbf", "j", "t", {"imageNumber": 1})
+    service.frame_ready("img_2.cbf", "j", "t", {"imageNumber": 2})
+
+    assert service.flush(timeout=5)
+    assert service.lims_writer.flush(timeout=5)
+    assert convert.converted == ["img_2.cbf"]
+    assert sorted(lims.images) == [1, 2]
+
+
+def test_make_jpeg(tmp_path):
+    image_path = str(tmp_path / "img_0001.tif")
+    write_image(image_path)
+    make_jpeg(image_path, str(tmp_path / "img.jpeg"), str(tmp_path / "img.thumb.jpeg"))
+
+    with Image.open(str(tmp_path / "img.jpeg")) as jpeg:
+        assert jpeg.size == (512, 512)
+    with Image.open(str(tmp_path / "img.thumb.jpeg")) as thumbnail:
+        assert thumbnail.size == (256, 256)
+
+
+def test_process_pool(tmp_path, record_property):
+    nframes = 8
+    service, lims = make_service(make_jpeg)
+    service.processes = 2
+    paths = []
+    for frame in range(1, nframes + 1):
+        image_path = str(tmp_path / ("img_%04d.tif" % frame))
+        write_image(image_path, (1024, 1024))
+        paths.append(os.path.splitext(image_path)[0])
+
+    try:
+        start = time.monotonic()
+        ticks = []
+        ticker = gevent.spawn(tick, ticks)
+        for frame, path in enumerate(paths, 1):
+            service.frame_ready(
+                path + ".tif",
+                path + ".jpeg",
+                path + ".thumb.jpeg",
+                {"imageNumber": frame},
+            )
+        queued = time.monotonic() - start
+        assert service.flush(timeout=60)
+        elapsed = time.monotonic() - start
+        ticker.kill()
+    finally:
+        service.stop()
+
+    assert service.lims_writer.flush(timeout=5)
+    assert sorted(lims.images) == list(range(1, nframes + 1))
+    for path in paths:
+        assert os.path.getsize(path + ".jpeg") > 0
+        assert os.path.getsize(path + ".thumb.jpeg") > 0
+    # the event loop kept running during the conversions
+    assert len(ticks) > 0.5 * elapsed / 0.01
+    record_property("queued_ms", 1000 * queued)
+    record_property("converted_s", elapsed)
+
+
+class MultiCollect(AbstractMultiCollect):
+    """Collect making the previews with a remote service"""
+
+    def __init__(self, properties):
+        super().__init__()
+        self.properties = properties
+        self.convert = SlowConvert()
+
+    def get_property(self, name, default_value=None):
+        return self.properties.get(name, default_value)
+
+    def generate_image_jpeg(self, filename, jpeg_path, jpeg_thumbnail_path, wait):
+        self.convert(filename, jpeg_path, jpeg_thumbnail_path)
+
+
+def test_collect_previews():
+    collect = MultiCollect({"jpeg_workers": 2})
+    lims = LimsStub()
+    collect.lims_writer = LimsWriteQueue(lims=lims)
+    service = collect.get_image_preview()
+    # the previews store the images through the LIMS writer of the collect
+    assert service.lims_writer is collect.get_lims_writer()
+
+    for frame in range(1, 5):
+        service.frame_ready("img_%d.cbf" % frame, "j", "t", {"imageNumber": frame})
+    collect.lims_writer.submit("store_image", {"imageNumber": 5})
+    start = time.monotonic()
+    collect.flush_background_writes()
+    # the end of the collection waits for the previews and the LIMS
+    assert 2 * CONVERT_TIME <= time.monotonic() - start < 3 * CONVERT_TIME
+    assert len(collect.convert.converted) == 4
+    assert sorted(lims.images) == [1, 2, 3, 4, 5]
@@ -0,0 +1,149 @@
+"""Tests of the ISPyBDataAdapter web service clients, against a local server"""
+
+import re
+import stat
+
+import gevent.pywsgi
+import pytest
+
+from mxcubecore.HardwareObjects.abstract.ISPyBDataAdapter import ISPyBDataAdapter
+
+WSDL = """<?xml version="1.0" encoding="UTF-8"?>
+<definitions xmlns="http://schemas.xmlsoap.org/wsdl/"
+  xmlns:soap="http://schemas.xmlsoap.org/wsdl/soap/"
+  xmlns:xs="http://www.w3.org/2001/XMLSchema"
+  xmlns:tns="http://test/" targetNamespace="http://test/">
+  <types>
+    <xs:schema targetNamespace="http://test/" elementFormDefault="qualified">
+      <xs:element name="echo"><xs:complexType><xs:sequence>
+        <xs:element name="text" type="xs:string"/>
+      </xs:sequence></xs:complexType></xs:element>
+      <xs:element name="echoResponse"><xs:complexType><xs:sequence>
+        <xs:element name="return" type="xs:string"/>
+      </xs:sequence></xs:complexType></xs:element>
+    </xs:schema>
+  </types>
+  <message name="echo"><part name="parameters" element="tns:echo"/></message>
+  <message name="echoResponse">
+    <part name="parameters" element="tns:echoResponse"/>
+  </message>
+  <portType name="Echo"><operation name="echo">
+    <input message="tns:echo"/><output message="tns:echoResponse"/>
+  </operation></portType>
+  <binding name="EchoBinding" type="tns:Echo">
+    <soap:binding style="document" transport="http://schemas.xmlsoap.org/soap/http"/>
+    <operation name="echo"><soap:operation soapAction=""/>
+      <input><soap:body use="literal"/></input>
+      <output><soap:body use="literal"/></output>
+    </operation>
+  </binding>
+  <service name="EchoService"><port name="EchoPort" binding="tns:EchoBinding">
+    <soap:address location="http://127.0.0.1/"/>
+  </port></service>
+</definitions>
+"""
+
+REPLY = (
+    '<?xml version="1.0"?>'
+    '<S:Envelope xmlns:S="http://schemas.xmlsoap.org/soap/envelope/"><S:Body>'
+    '<ns:echoResponse xmlns:ns="http://test/"><ns:return>%s</ns:return>'
+    "</ns:echoResponse></S:Body></S:Envelope>"
+)
+
+
+class StandInISPyB:
+    """Web services answering echo, counting the WSDL downloads and connections"""
+
+    def __init__(self):
+        self.wsdl_downloads = 0
+        self.connections = set()
+        self.status = "200 OK"
+        self.server = gevent.pywsgi.WSGIServer(("127.0.0.1", 0), self.app, log=None)
+
+    @property
+    def ws_root(self):
+        return "http://127.0.0.1:%d/" % self.server.server_port
+
+    def app(self, environ, start_response):
+        self.connections.add(environ["REMOTE_PORT"])
+        if environ["REQUEST_METHOD"] == "GET":
+            start_response("200 OK", [("Content-Type", "text/xml")])
+            self.wsdl_downloads += 1
+            return [WSDL.encode()]
+        body = environ["wsgi.input"].read().decode()
+        start_response(self.status, [("Content-Type", "text/xml")])
+        if self.status != "200 OK":
+            return [b""]
+        text = re.search(r"text>(.*?)<", body).group(1)
+        return [(REPLY % text).encode()]
+
+
+@pytest.fixture
+def ispyb_server():
+    server = StandInISPyB()
+    server.server.start()
+    yield server
+    server.server.stop()
+
+
+def make_adapter(server, cache_dir):
+    if cache_dir is not None:
+        cache_dir = str(cache_dir)
+    return ISPyBDataAdapter(
+        server.ws_root, {}, "user", "password", "bl", wsdl_cache_dir=cache_dir
+    )
+
+
+def test_clients_share_connection(ispyb_server, tmp_path):
+    adapter = make_adapter(ispyb_server, tmp_path)
+    assert ispyb_server.wsdl_downloads == 3
+
+    assert adapter._shipping.service.echo("one") == "one"
+    assert adapter._collection.service.echo("two") == "two"
+    assert adapter._tools_ws.service.echo("three") == "three"
+    # the WSDL downloads and the calls all used the same connection
+    assert len(ispyb_server.connections) == 1
+
+    call_times = adapter.get_call_times()
+    assert list(call_times) == ["echo"]
+    assert call_times["echo"]["count"] == 3
+    assert 0 < call_times["echo"]["mean"] <= call_times["echo"]["max"]
+
+
+def test_wsdl_cache(ispyb_server, tmp_path):
+    make_adapter(ispyb_server, tmp_path)
+    assert ispyb_server.wsdl_downloads == 3
+
+    # the parsed WSDL of the services is taken from the cache
+    adapter = make_adapter(ispyb_server, tmp_path)
+    assert ispyb_server.wsdl_downloads == 3
+    assert adapter._shipping.service.echo("cached") == "cached"
+
+
+def test_wsdl_cache_default(ispyb_server, tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    make_adapter(ispyb_server, None)
+    make_adapter(ispyb_server, None)
+    # kept between starts, in a directory private to the user
+    assert ispyb_server.wsdl_downloads == 3
+    cache_dir = tmp_path / ".cache" / "mxcube" / "wsdl"
+    assert stat.S_IMODE(cache_dir.stat().st_mode) == 0o700
+    assert len(list(cache_dir.glob("*.px"))) == 3
+
+
+def test_wsdl_cache_not_private(ispyb_server, tmp_path):
+    make_adapter(ispyb_server, tmp_path)
+    for path in tmp_path.iterdir():
+        path.chmod(0o666)
+
+    # the entries writable by others are not loaded
+    adapter = make_adapter(ispyb_server, tmp_path)
+    assert ispyb_server.wsdl_downloads == 6
+    assert adapter._shipping.service.echo("one") == "one"
+
+
+@pytest.mark.parametrize("status", ["202 Accepted", "204 No Content"])
+def test_no_reply(ispyb_server, tmp_path, status):
+    adapter = make_adapter(ispyb_server, tmp_path)
+    ispyb_server.status = status
+    assert adapter._collection.service.echo("one") is None
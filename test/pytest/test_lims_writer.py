@@ -0,0 +1,193 @@
+"""Tests of the LIMS write-behind queue"""
+
+import time
+
+import gevent
+import pytest
+
+from mxcubecore.HardwareObjects.abstract.AbstractCollect import AbstractCollect
+from mxcubecore.utils.lims_writer import LimsWriteQueue
+
+LIMS_LATENCY = 0.02
+
+
+class LimsStub:
+    """LIMS recording the calls, failing the first calls if asked"""
+
+    def __init__(self, failures=0, error=ConnectionError):
+        self.calls = []
+        self.failures = failures
+        self.error = error
+        self.attempts = 0
+
+    def _call(self, method, argument):
+        gevent.sleep(LIMS_LATENCY)
+        self.attempts += 1
+        if self.failures:
+            self.failures -= 1
+            raise self.error("LIMS not available")
+        self.calls.append((method, argument))
+
+    def update_data_collection(self, params):
+        self._call("update_data_collection", params)
+
+    def store_image(self, image):
+        self._call("store_image", image)
+
+
+def submit_collection(writer, collection_id, nimages):
+    params = {"collection_id": collection_id, "status": "Running"}
+    writer.submit("update_data_collection", params)
+    for frame in range(1, nimages + 1):
+        writer.submit("store_image", {"dataCollectionId": collection_id, "n": frame})
+    params["status"] = "Done"
+    writer.submit("update_data_collection", params)
+
+
+def test_records_in_order():
+    lims = LimsStub()
+    writer = LimsWriteQueue(lims=lims)
+    start = time.monotonic()
+    submit_collection(writer, 1, 3)
+    submit_collection(writer, 2, 2)
+
+    # submitting does not wait for the LIMS
+    assert time.monotonic() - start < LIMS_LATENCY
+    assert writer.flush(timeout=5)
+    assert [
+        (method, arg.get("collection_id", arg.get("n"))) for method, arg in lims.calls
+    ] == [
+        ("update_data_collection", 1),
+        ("store_image", 1),
+        ("store_image", 2),
+        ("store_image", 3),
+        ("update_data_collection", 1),
+        ("update_data_collection", 2),
+        ("store_image", 1),
+        ("store_image", 2),
+        ("update_data_collection", 2),
+    ]
+    # the parameters were copied when submitted
+    assert lims.calls[0][1]["status"] == "Running"
+    assert lims.calls[4][1]["status"] == "Done"
+
+
+def test_retry():
+    lims = LimsStub(failures=3)
+    writer = LimsWriteQueue(lims=lims, retry_delay=0.01)
+    submit_collection(writer, 1, 2)
+    assert writer.flush(timeout=5)
+
+    assert len(lims.calls) == 4
+    assert lims.failures == 0
+
+
+def test_long_outage(tmp_path):
+    spool_file = str(tmp_path / "lims_spool.jsonl")
+    lims = LimsStub(failures=30)
+    writer = LimsWriteQueue(
+        spool_file, lims=lims, retry_delay=0.001, max_retry_delay=0.001
+    )
+    submit_collection(writer, 1, 2)
+    assert writer.flush(timeout=5)
+
+    # the connection errors are retried until the LIMS is back
+    assert lims.attempts == 34
+    assert len(lims.calls) == 4
+    assert lims.calls[0][1]["status"] == "Running"
+    assert not (tmp_path / "lims_spool.jsonl.failed").exists()
+
+
+def test_error_not_retried(tmp_path):
+    dead_letter_file = str(tmp_path / "lims_failed.jsonl")
+    lims = LimsStub(failures=1, error=ValueError)
+    writer = LimsWriteQueue(
+        lims=lims, retry_delay=0.01, dead_letter_file=dead_letter_file
+    )
+    submit_collection(writer, 1, 2)
+    assert writer.flush(timeout=5)
+
+    assert lims.attempts == 4
+    assert len(lims.calls) == 3
+    with open(dead_letter_file) as fp0:
+        assert len(fp0.readlines()) == 1
+
+
+def test_spool_file(tmp_path):
+    spool_file = str(tmp_path / "lims_spool.jsonl")
+    lims = LimsStub(failures=1000)
+    writer = LimsWriteQueue(spool_file, lims=lims, retry_delay=0.01)
+    submit_collection(writer, 7, 3)
+    assert not writer.flush(timeout=0.2)
+    writer.stop()
+
+    # a new writer sends the records left by the previous one
+    lims = LimsStub()
+    writer = LimsWriteQueue(spool_file, lims=lims)
+    assert writer.pending == 5
+    assert writer.flush(timeout=5)
+    assert len(lims.calls) == 5
+    assert LimsWriteQueue(spool_file, lims=lims).pending == 0
+    # emptied once all the records are sent
+    assert (tmp_path / "lims_spool.jsonl").read_text() == ""
+
+
+def test_spool_offset(tmp_path):
+    spool_file = str(tmp_path / "lims_spool.jsonl")
+    lims = LimsStub()
+    writer = LimsWriteQueue(spool_file, lims=lims)
+    submit_collection(writer, 7, 3)
+    # stopped after the first two records
+    gevent.sleep(2.5 * LIMS_LATENCY)
+    writer.stop()
+    assert len(lims.calls) == 2
+
+    # the spool file is only appended to, the offset file skips the sent records
+    with open(spool_file) as fp0:
+        assert len(fp0.readlines()) == 5
+    writer = LimsWriteQueue(spool_file, lims=lims)
+    assert writer.pending == 3
+    assert writer.flush(timeout=5)
+    assert [arg.get("n") for _, arg in lims.calls] == [None, 1, 2, 3, None]
+    assert lims.calls[-1][1]["status"] == "Done"
+
+
+def test_collect_flush(monkeypatch):
+    collect = AbstractCollect("collect")
+    lims = LimsStub()
+    collect.lims_writer = LimsWriteQueue(lims=lims)
+    submit_collection(collect.lims_writer, 1, 3)
+    collect.flush_background_writes()
+    assert len(lims.calls) == 5
+
+    # the wait is bounded
+    lims.failures = 1000
+    submit_collection(collect.lims_writer, 2, 3)
+    monkeypatch.setattr(collect, "get_property", lambda name, default=None: 0.1)
+    start = time.monotonic()
+    collect.flush_background_writes()
+    assert time.monotonic() - start < 0.5
+    assert collect.lims_writer.pending == 5
+    collect.lims_writer.stop()
+
+
+@pytest.mark.benchmark
+def test_benchmark_acquisition_time(record_property):
+    nimages = 50
+    elapsed = {}
+    for write_behind in (False, True):
+        lims = LimsStub()
+        writer = LimsWriteQueue(lims=lims)
+        start = time.monotonic()
+        for frame in range(nimages):
+            if write_behind:
+                writer.submit("store_image", {"n": frame})
+            else:
+                lims.store_image({"n": frame})
+        elapsed[write_behind] = time.monotonic() - start
+        assert writer.flush(timeout=5)
+
+    record_property("images", nimages)
+    record_property("synchronous_s", elapsed[False])
+    record_property("write_behind_s", elapsed[True])
+    assert elapsed[True] < nimages * LIMS_LATENCY / 10
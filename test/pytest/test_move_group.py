@@ -0,0 +1,96 @@
+"""Tests of the concurrent moves of motor groups"""
+
+import time
+
+import pytest
+
+from mxcubecore.HardwareObjects.mockup.MotorMockup import MotorMockup
+from mxcubecore.utils.move_group import MoveGroup
+
+
+@pytest.fixture
+def motors():
+    motors = []
+    for name in ("phiy", "phiz", "sampx"):
+        motor = MotorMockup(name)
+        motor.set_property("default_value", 0)
+        motor.init()
+        motor.set_velocity(10)
+        motors.append(motor)
+    return motors
+
+
+def test_move_group(motors):
+    positions = {motor: idx + 1 for idx, motor in enumerate(motors)}
+    start = time.monotonic()
+    move_times = MoveGroup(positions).move(timeout=5)
+    elapsed = time.monotonic() - start
+
+    assert [motor.get_value() for motor in motors] == [1, 2, 3]
+    assert all(motor.is_ready() for motor in motors)
+    assert list(move_times) == ["phiy", "phiz", "sampx"]
+    assert move_times["phiy"] < move_times["phiz"] < move_times["sampx"]
+    # the moves overlap, the group takes as long as the longest move
+    assert elapsed < sum(move_times.values())
+    assert elapsed == pytest.approx(move_times["sampx"], abs=0.05)
+
+
+def test_move_group_single_command(motors):
+    started = []
+
+    def start_move(motors_positions):
+        started.append(dict(motors_positions))
+        for motor, position in motors_positions.items():
+            motor.set_value(position)
+
+    positions = {motors[0]: 0.5, motors[1]: None, None: 2}
+    group = MoveGroup(positions, start_move)
+    group.move(timeout=5)
+
+    assert started == [{motors[0]: 0.5}]
+    assert list(group.move_times) == ["phiy"]
+
+
+def test_move_group_timeout(motors):
+    group = MoveGroup({motors[0]: 10, motors[1]: 0.1})
+    group.start()
+    with pytest.raises(RuntimeError):
+        group.wait(timeout=0.3)
+    assert "phiz" in group.move_times
+    assert "phiy" not in group.move_times
+    motors[0].abort()
+
+
+def test_move_group_not_busy(motors):
+    # motors without state, or moved by a command which does not update it
+    motors[0].update_state(motors[0].STATES.UNKNOWN)
+    group = MoveGroup({motors[0]: 1, motors[1]: 2}, lambda positions: None)
+    start = time.monotonic()
+    group.move(timeout=1)
+    assert time.monotonic() - start < 0.1
+    assert list(group.move_times) == ["phiy", "phiz"]
+
+
+def test_move_group_wait_ready(motors):
+    timeouts = []
+
+    def wait_ready(timeout):
+        timeouts.append(timeout)
+
+    group = MoveGroup({motors[0]: 10, motors[1]: 0.1}, wait_ready=wait_ready)
+    group.move(timeout=5)
+    # the end of the moves is the controller state, not the motors one
+    assert timeouts == [5]
+    assert not motors[0].is_ready()
+    assert list(group.move_times) == ["phiy", "phiz"]
+    motors[0].abort()
+
+
+def test_diffractometer_move_motors(beamline):
+    diffractometer = beamline.diffractometer
+    phi = diffractometer.motor_hwobj_dict["phi"]
+    start = time.monotonic()
+    diffractometer.move_motors({"phi": phi.get_value() + 100})
+    # the diffractometer ready state ends the moves by default
+    assert time.monotonic() - start < 0.5
+    phi.abort()
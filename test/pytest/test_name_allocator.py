@@ -0,0 +1,154 @@
+"""Tests of the next free name allocator"""
+
+import os
+import time
+
+import pytest
+
+from mxcubecore.model.queue_model_objects import PathTemplate
+from mxcubecore.utils import name_allocator
+from mxcubecore.utils.name_allocator import NameAllocator
+
+
+def touch(directory, *names):
+    for name in names:
+        open(os.path.join(directory, name), "w").close()
+
+
+@pytest.fixture
+def allocator():
+    return NameAllocator()
+
+
+def test_first_free_name(tmp_path, allocator):
+    directory = str(tmp_path)
+    assert allocator.next_free_name(directory, "run_%d", first="run") == (
+        None,
+        "run",
+    )
+    touch(directory, "run", "run_1", "run_3")
+    assert allocator.next_free_name(directory, "run_%d", first="run") == (2, "run_2")
+    assert allocator.next_free_name(directory, "scan_%02d.dat") == (1, "scan_01.dat")
+
+
+def test_missing_directory(tmp_path, allocator):
+    directory = str(tmp_path / "a" / "b")
+    assert allocator.next_free_name(directory, "run_%d") == (1, "run_1")
+    assert not os.path.exists(directory)
+
+    assert allocator.next_free_name(directory, "run_%d", create="directory") == (
+        1,
+        "run_1",
+    )
+    assert os.path.isdir(os.path.join(directory, "run_1"))
+
+
+def test_allocation_updates_index(tmp_path, allocator):
+    directory = str(tmp_path)
+    names = [
+        allocator.next_free_name(directory, "scan_%d.raw", create="file")[1]
+        for _ in range(3)
+    ]
+    assert names == ["scan_1.raw", "scan_2.raw", "scan_3.raw"]
+    assert sorted(os.listdir(directory)) == names
+
+    # names found without create are not returned twice either
+    assert allocator.next_free_name(directory, "scan_%d.raw")[0] == 4
+    assert allocator.next_free_name(directory, "scan_%d.raw")[0] == 5
+
+
+def test_single_scan(tmp_path, allocator, monkeypatch):
+    directory = str(tmp_path)
+    touch(directory, *["scan_%d.raw" % idx for idx in range(1, 201)])
+
+    scans = []
+    scandir = os.scandir
+
+    def counting_scandir(path):
+        scans.append(path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", counting_scandir)
+    assert allocator.next_free_name(directory, "scan_%d.raw", create="file") == (
+        201,
+        "scan_201.raw",
+    )
+    assert allocator.next_free_name(directory, "scan_%d.raw", create="file") == (
+        202,
+        "scan_202.raw",
+    )
+    assert scans == [directory]
+
+
+def test_concurrent_writer(tmp_path, allocator):
+    directory = str(tmp_path)
+    touch(directory, "scan_1.raw")
+    assert allocator.next_free_name(directory, "scan_%d.raw")[0] == 2
+
+    # Another writer takes the next names, without changing the directory
+    # modification time: the allocator has a stale index
+    mtime = os.stat(directory).st_mtime_ns
+    touch(directory, "scan_3.raw", "scan_4.raw")
+    os.utime(directory, ns=(mtime, mtime))
+
+    assert allocator.next_free_name(directory, "scan_%d.raw", create="file") == (
+        5,
+        "scan_5.raw",
+    )
+    assert allocator.next_free_name(directory, "scan_%d.raw") == (6, "scan_6.raw")
+
+
+def test_cache_invalidation(tmp_path, allocator):
+    directory = str(tmp_path)
+    assert allocator.next_free_name(directory, "run_%d", create="directory")[0] == 1
+    # a later change of the directory is seen
+    time.sleep(0.01)
+    os.mkdir(os.path.join(directory, "run_2"))
+    assert "run_2" in allocator.used_names(directory)
+    assert allocator.next_free_name(directory, "run_%d")[0] == 3
+
+
+def test_path_template(tmp_path):
+    directory = str(tmp_path)
+    touch(directory, "mx1_Se_K.raw")
+    assert PathTemplate.get_next_free_name(
+        directory, "mx1_Se_K_%d.raw", first="mx1_Se_K.raw", create="file"
+    ) == (1, "mx1_Se_K_1.raw")
+    assert isinstance(name_allocator._DEFAULT_ALLOCATOR, NameAllocator)
+
+
+def test_session(tmp_path, beamline):
+    directory = str(tmp_path)
+    assert beamline.session.get_next_free_name(
+        directory, "spectrum_%02d.dat", create="file"
+    ) == (1, "spectrum_01.dat")
+
+
+def test_invalid_create(tmp_path, allocator):
+    with pytest.raises(ValueError):
+        allocator.next_free_name(str(tmp_path), "run_%d", create="link")
+
+
+@pytest.mark.benchmark
+def test_benchmark_free_name(tmp_path, allocator, record_property):
+    directory = str(tmp_path)
+    nruns = 500
+    touch(directory, *["run_%d" % idx for idx in range(1, nruns + 1)])
+
+    start = time.perf_counter()
+    idx = 1
+    while os.path.exists(os.path.join(directory, "run_%d" % idx)):
+        idx += 1
+    probing = time.perf_counter() - start
+
+    start = time.perf_counter()
+    assert allocator.next_free_name(directory, "run_%d")[0] == idx
+    cold = time.perf_counter() - start
+    start = time.perf_counter()
+    assert allocator.next_free_name(directory, "run_%d")[0] == idx + 1
+    warm = time.perf_counter() - start
+
+    record_property("runs", nruns)
+    record_property("probing_ms", 1000 * probing)
+    record_property("scandir_ms", 1000 * cold)
+    record_property("cached_ms", 1000 * warm)
@@ -0,0 +1,169 @@
+"""Tests of the vectorized alignment of the online processing results"""
+
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip("scipy")
+pytest.importorskip("matplotlib")
+
+from mxcubecore.HardwareObjects.EMBL.EMBLOnlineProcessing import (  # noqa: E402
+    EMBLOnlineProcessing,
+)
+
+RESULT_KEYS = ("spots_resolution", "score", "spots_num", "is")
+
+
+class GridStub:
+    """Grid scanned line by line along the columns, in both directions"""
+
+    def __init__(self, num_cols, num_rows, first_image_num=1):
+        self.num_cols = num_cols
+        self.num_rows = num_rows
+        self.first_image_num = first_image_num
+
+    def get_col_row_from_image_serial(self, image_serial):
+        line, image = divmod(image_serial - self.first_image_num, self.num_rows)
+        if line % 2:
+            image = self.num_rows - 1 - image
+        return line, image
+
+    def get_col_row_from_image(self, image_num):
+        return self.get_col_row_from_image_serial(image_num + self.first_image_num)
+
+    def set_score(self, score):
+        pass
+
+
+class VectorGridStub(GridStub):
+    def get_col_row_index(self):
+        index = np.arange(self.num_cols * self.num_rows)
+        cols, rows = np.divmod(index, self.num_rows)
+        rows = np.where(cols % 2, self.num_rows - 1 - rows, rows)
+        return cols, rows
+
+
+def make_processing(grid):
+    processing = EMBLOnlineProcessing("online_processing")
+    processing.grid = grid
+    processing.started = True
+    images_num = grid.num_cols * grid.num_rows
+    processing.params_dict = {
+        "images_num": images_num,
+        "first_image_num": grid.first_image_num,
+        "lines_num": grid.num_cols,
+    }
+    processing.results_raw = {key: np.zeros(images_num) for key in RESULT_KEYS}
+    processing.results_aligned = {
+        key: np.zeros((grid.num_cols, grid.num_rows)) for key in RESULT_KEYS
+    }
+    return processing
+
+
+def make_batch(images_num, first=0, count=None):
+    rng = np.random.RandomState(1)
+    count = images_num - first if count is None else count
+    return [
+        [frame, int(rng.randint(100)), float(rng.rand() * 10), [0, 2.5][frame % 2]]
+        for frame in range(first, first + count)
+    ]
+
+
+def reference_aligned(processing, batch):
+    """Results aligned one frame at a time"""
+    aligned = {
+        key: np.zeros_like(processing.results_aligned[key]) for key in RESULT_KEYS
+    }
+    for frame, spots_num, score, resolution in batch:
+        col, row = processing.grid.get_col_row_from_image(frame)
+        aligned["spots_num"][col, row] = spots_num
+        aligned["score"][col, row] = score
+        if resolution:
+            aligned["spots_resolution"][col, row] = 1 / resolution
+    return aligned
+
+
+@pytest.mark.parametrize("grid_class", [GridStub, VectorGridStub])
+def test_batch_processed(grid_class):
+    processing = make_processing(grid_class(7, 5))
+    batch = make_batch(35, first=3, count=20)
+    processing.batch_processed(batch)
+
+    expected = reference_aligned(processing, batch)
+    for key in RESULT_KEYS:
+        assert np.array_equal(processing.results_aligned[key], expected[key]), key
+    assert processing.results_raw["score"][3] == batch[0][2]
+
+
+def test_dozor_is_changed():
+    processing = make_processing(VectorGridStub(4, 3))
+    processing.dozor_is_changed([(0, 1.5), (4, 2.5)])
+    processing.dozor_is_changed((11, 7.0))
+
+    aligned = processing.results_aligned["is"]
+    assert aligned[0, 0] == 1.5
+    # second line is scanned backwards
+    assert aligned[1, 1] == 2.5
+    assert aligned[3, 0] == 7.0
+    assert aligned.sum() == 11
+
+
+def test_align_processing_results_outside_grid():
+    processing = make_processing(VectorGridStub(3, 3))
+    # aligned results smaller than the grid: cells outside are skipped
+    processing.results_aligned["score"] = np.zeros((2, 3))
+    processing.results_raw["score"][:] = np.arange(1, 10)
+    processing.align_results("score", np.arange(-1, 12))
+
+    assert processing.results_aligned["score"].tolist() == [[1, 2, 3], [6, 5, 4]]
+
+
+def test_smooth():
+    processing = make_processing(GridStub(10, 20))
+    values = np.random.RandomState(2).rand(200)
+    processing.results_raw["score"][:] = values
+    processing.smooth()
+
+    expected = [
+        np.mean(values[max(index - 30, 0) : index + 30]) for index in range(200)
+    ]
+    assert np.allclose(processing.results_raw["score"], expected)
+
+
+@pytest.mark.benchmark
+def test_benchmark_large_mesh(record_property):
+    num_cols, num_rows = 250, 400
+    loop_processing = make_processing(GridStub(num_cols, num_rows))
+    processing = make_processing(VectorGridStub(num_cols, num_rows))
+    batch = make_batch(num_cols * num_rows)
+
+    start = time.perf_counter()
+    for frame, spots_num, score, resolution in batch:
+        col, row = loop_processing.grid.get_col_row_from_image(frame)
+        for key in RESULT_KEYS:
+            loop_processing.results_aligned[key][col][row] = (
+                loop_processing.results_raw[key][frame]
+            )
+    per_frame = time.perf_counter() - start
+
+    start = time.perf_counter()
+    processing.batch_processed(batch)
+    vectorized = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for key in RESULT_KEYS:
+        processing.align_result(key, np.arange(num_cols * num_rows))
+    align = time.perf_counter() - start
+
+    start = time.perf_counter()
+    processing.smooth()
+    smooth = time.perf_counter() - start
+
+    record_property("cells", num_cols * num_rows)
+    record_property("per_frame_ms", 1000 * per_frame)
+    record_property("batch_ms", 1000 * vectorized)
+    record_property("align_ms", 1000 * align)
+    record_property("smooth_ms", 1000 * smooth)
+    assert vectorized < per_frame
+    assert align < 0.1 * per_frame
@@ -0,0 +1,180 @@
+"""Tests for the Poller module, in thread-per-poller and shared scheduler mode"""
+
+import itertools
+
+import gevent
+import pytest
+
+from mxcubecore import Poller
+
+
+class Counter:
+    """Polled object returning an increasing value"""
+
+    def __init__(self):
+        self.count = itertools.count()
+        self.values = []
+        self.errors = []
+
+    def read(self):
+        return next(self.count)
+
+    def value_changed(self, value):
+        self.values.append(value)
+
+    def error(self, exception, poller_id):
+        self.errors.append((exception, poller_id))
+
+
+@pytest.fixture(params=[False, True], ids=["threads", "scheduler"])
+def scheduler(request):
+    """Run the test without, then with, a shared scheduler"""
+    if request.param:
+        Poller.use_scheduler(max_workers=2)
+    yield Poller.SCHEDULER
+    for poller in list(Poller.POLLERS.values()):
+        poller.stop()
+    Poller.stop_scheduler()
+
+
+def test_poll_value_changed(scheduler):
+    counters = [Counter() for _ in range(10)]
+    pollers = [
+        Poller.poll(
+            counter.read,
+            polling_period=10,
+            value_changed_callback=counter.value_changed,
+            error_callback=counter.error,
+        )
+        for counter in counters
+    ]
+
+    gevent.sleep(0.3)
+
+    for poller in pollers:
+        assert poller.scheduler is scheduler
+    for counter in counters:
+        assert len(counter.values) > 5
+        assert counter.values == sorted(counter.values)
+
+
+def test_poll_identical_calls_merged(scheduler):
+    counter = Counter()
+    poller1 = Poller.poll(
+        counter.read,
+        polling_period=100,
+        value_changed_callback=counter.value_changed,
+        error_callback=counter.error,
+    )
+    poller2 = Poller.poll(
+        counter.read,
+        polling_period=20,
+        value_changed_callback=counter.value_changed,
+        error_callback=counter.error,
+    )
+    assert poller1 is poller2
+    assert poller1.get_polling_period() == 20
+
+
+def test_poll_error_callback(scheduler):
+    counter = Counter()
+
+    def failing_call():
+        raise RuntimeError("poll failed")
+
+    poller = Poller.poll(
+        failing_call,
+        polling_period=10,
+        value_changed_callback=counter.value_changed,
+        error_callback=counter.error,
+    )
+    gevent.sleep(0.1)
+    errors = counter.errors
+
+    assert len(errors) == 1
+    assert isinstance(errors[0][0], RuntimeError)
+    assert errors[0][1] == poller.get_id()
+    assert poller.statistics.errors == 1
+    if scheduler is not None:
+        # failed pollers are not rescheduled
+        assert scheduler.get_pending() == 0
+
+
+def test_poll_statistics(scheduler):
+    counter = Counter()
+
+    def slow_read():
+        gevent.monkey.get_original("time", "sleep")(0.02)
+        return counter.read()
+
+    poller = Poller.poll(
+        slow_read,
+        polling_period=10,
+        value_changed_callback=counter.value_changed,
+        error_callback=counter.error,
+    )
+    gevent.sleep(0.2)
+
+    stats = Poller.get_statistics()[poller.get_id()]
+    assert stats["calls"] > 0
+    assert stats["mean_latency"] >= 15
+    assert stats["max_latency"] >= stats["mean_latency"]
+    assert stats["errors"] == 0
+    # a call lasting longer than the polling period always overruns
+    assert stats["overruns"] == stats["calls"]
+
+
+def test_poll_stop(scheduler):
+    counter = Counter()
+    poller = Poller.poll(
+        counter.read,
+        polling_period=10,
+        value_changed_callback=counter.value_changed,
+        error_callback=counter.error,
+    )
+    gevent.sleep(0.1)
+    poller.stop()
+    gevent.sleep(0.05)
+    nvalues = len(counter.values)
+    gevent.sleep(0.1)
+
+    assert poller.is_stopped()
+    assert len(counter.values) == nvalues
+
+
+def test_stop_scheduler():
+    counter = Counter()
+    scheduler = Poller.use_scheduler(max_workers=3)
+    assert scheduler.running_workers == 3
+    poller = Poller.poll(
+        counter.read,
+        polling_period=10,
+        value_changed_callback=counter.value_changed,
+        error_callback=counter.error,
+    )
+    gevent.sleep(0.05)
+    Poller.stop_scheduler()
+    assert Poller.SCHEDULER is None
+    assert scheduler.is_stopped()
+
+    with gevent.Timeout(1):
+        while scheduler.running_workers:
+            gevent.sleep(0.01)
+    nvalues = len(counter.values)
+    gevent.sleep(0.05)
+    assert len(counter.values) == nvalues
+    assert poller.is_stopped()
+    assert poller.get_id() not in Poller.POLLERS
+
+    # the same call is polled again, by a thread
+    new_poller = Poller.poll(
+        counter.read,
+        polling_period=10,
+        value_changed_callback=counter.value_changed,
+        error_callback=counter.error,
+    )
+    assert new_poller is not poller
+    assert new_poller.scheduler is None
+    gevent.sleep(0.1)
+    new_poller.stop()
+    assert len(counter.values) > nvalues
@@ -0,0 +1,127 @@
+"""Tests of the QueueManager lookahead mode, with the mock-up sample changer"""
+
+import time
+
+import gevent
+import pytest
+
+from mxcubecore.HardwareObjects.QueueManager import QueueManager
+from mxcubecore.model import queue_model_objects
+from mxcubecore.queue_entry import base_queue_entry
+
+# Simulated sample changer load time and data collection time [s]
+LOAD_TIME = 0.4
+COLLECT_TIME = 0.3
+
+
+class ViewStub:
+    """Minimal view of a queue entry"""
+
+    def set_queue_entry(self, entry):
+        self.entry = entry
+
+    def setText(self, column, text):
+        pass
+
+    def set_background_color(self, color):
+        pass
+
+
+@pytest.fixture
+def queue_manager(beamline, monkeypatch):
+    queue_manager = QueueManager("queue")
+    queue_manager.init()
+    beamline._objects["queue_manager"] = queue_manager
+    # the lims mock-up has no ISPyB adapter in the test configuration
+    monkeypatch.setattr(beamline.lims, "store_robot_action", lambda action: None)
+    beamline.sample_changer.load_time = LOAD_TIME
+    yield queue_manager
+    del beamline._objects["queue_manager"]
+
+
+def enqueue_samples(queue_manager, locations, post_processing=None):
+    for location in locations:
+        sample = queue_model_objects.Sample()
+        sample.location = location
+        sample.loc_str = "%d:%d" % location
+        sample_entry = base_queue_entry.SampleQueueEntry(ViewStub(), sample)
+        sample_entry.set_enabled(True)
+        if post_processing is not None:
+            sample_entry._start_autoprocessing = post_processing
+
+        delay = queue_model_objects.DelayTask(COLLECT_TIME)
+        sample._children.append(delay)
+        delay_entry = base_queue_entry.DelayQueueEntry(ViewStub(), delay)
+        delay_entry.set_enabled(True)
+
+        queue_manager.enqueue(sample_entry)
+        sample_entry.enqueue(delay_entry)
+
+
+def run_queue(queue_manager):
+    start = time.monotonic()
+    queue_manager.execute()
+    queue_manager._root_task.get(timeout=30)
+    return time.monotonic() - start
+
+
+def test_get_next_sample_entry(queue_manager):
+    enqueue_samples(queue_manager, [(1, 1), (1, 2), (1, 3)])
+    entries = queue_manager.get_queue_entry_list()
+    entries[1].set_enabled(False)
+
+    assert queue_manager.get_next_sample_entry(entries[0]) is entries[2]
+    assert queue_manager.get_next_sample_entry(entries[2]) is None
+
+
+def test_lookahead_prepares_next_sample(queue_manager, beamline):
+    prepared = []
+    prepare_load = beamline.sample_changer.prepare_load
+    beamline.sample_changer.prepare_load = lambda sample: prepared.append(
+        sample
+    ) or prepare_load(sample)
+
+    try:
+        queue_manager.lookahead = True
+        enqueue_samples(queue_manager, [(2, 1), (2, 2), (2, 3)])
+        run_queue(queue_manager)
+    finally:
+        del beamline.sample_changer.prepare_load
+
+    assert prepared == ["2:2", "2:3"]
+    assert beamline.sample_changer.is_mounted_sample((2, 3))
+
+
+def test_post_processing_off_critical_path(queue_manager):
+    launches = []
+
+    def slow_launch(params):
+        gevent.sleep(COLLECT_TIME)
+        launches.append(time.monotonic())
+
+    queue_manager.lookahead = True
+    enqueue_samples(queue_manager, [(3, 1), (3, 2)], slow_launch)
+    run_queue(queue_manager)
+    end = time.monotonic()
+    gevent.sleep(2 * COLLECT_TIME)
+
+    # the queue did not wait for the launch after the last sample
+    assert len(launches) == 2
+    assert launches[-1] > end
+
+
+@pytest.mark.benchmark
+def test_benchmark_samples_per_hour(queue_manager, record_property):
+    nsamples = 4
+    elapsed = {}
+    for basket, lookahead in ((4, False), (5, True)):
+        queue_manager.lookahead = lookahead
+        queue_manager.clear()
+        enqueue_samples(queue_manager, [(basket, idx + 1) for idx in range(nsamples)])
+        elapsed[lookahead] = run_queue(queue_manager)
+
+    record_property("sequential_samples_per_hour", 3600 * nsamples / elapsed[False])
+    record_property("lookahead_samples_per_hour", 3600 * nsamples / elapsed[True])
+    # the pick of each next sample overlaps with the collection
+    saved = (nsamples - 1) * min(LOAD_TIME / 2, COLLECT_TIME)
+    assert elapsed[True] < elapsed[False] - 0.5 * saved
@@ -0,0 +1,255 @@
+"""Tests of the QueueModel node indexes"""
+
+import time
+
+import pytest
+
+from mxcubecore.HardwareObjects.QueueModel import QueueModel
+from mxcubecore.model import queue_model_objects as qmo
+
+
+def make_sample(basket, position):
+    sample = qmo.Sample()
+    sample.location = (basket, position)
+    sample._name = "sample-%d:%d" % (basket, position)
+    return sample
+
+
+def fill_queue(queue_model, nbaskets, nsamples, ngroups, ntasks):
+    """Build a queue of baskets, samples, task groups and tasks"""
+    root = queue_model.get_model_root()
+    for basket_idx in range(1, nbaskets + 1):
+        basket = qmo.Basket()
+        queue_model.add_child(root, basket)
+        for sample_idx in range(1, nsamples + 1):
+            sample = make_sample(basket_idx, sample_idx)
+            queue_model.add_child(basket, sample)
+            for _ in range(ngroups):
+                group = qmo.TaskGroup()
+                queue_model.add_child(sample, group)
+                for _ in range(ntasks):
+                    queue_model.add_child(group, qmo.DelayTask())
+
+
+def search_node(queue_model, _id):
+    """Depth-first search, as done by get_node before the node index"""
+    return queue_model.get_node(_id, queue_model.get_model_root())
+
+
+@pytest.fixture
+def queue_model():
+    return QueueModel("queue-model")
+
+
+def test_get_node(queue_model):
+    fill_queue(queue_model, 2, 3, 2, 2)
+    # get_nodes leaves out the baskets
+    nodes = queue_model.get_nodes() + queue_model.get_model_root().get_children()
+    assert len(nodes) == 2 + 2 * 3 * (1 + 2 * (1 + 2))
+
+    for node in nodes:
+        assert queue_model.get_node(node._node_id) is node
+        assert search_node(queue_model, node._node_id) is node
+    assert queue_model.get_node(len(nodes) + 1) is None
+    assert queue_model.get_sample((2, 3)).get_name() == "sample-2:3"
+
+
+def test_add_child_at_id(queue_model):
+    fill_queue(queue_model, 1, 2, 1, 1)
+    group = queue_model.get_sample((1, 2)).get_children()[0]
+    task_id = queue_model.add_child_at_id(group._node_id, qmo.DelayTask())
+
+    assert queue_model.get_node(task_id) in group.get_children()
+
+
+def test_del_child(queue_model):
+    fill_queue(queue_model, 1, 2, 1, 1)
+    sample = queue_model.get_sample((1, 1))
+    removed = queue_model.get_nodes()[0:3]
+    assert removed[0] is sample
+    assert removed[2].get_parent() is removed[1]
+
+    queue_model.del_child(sample.get_parent(), sample)
+
+    for node in removed:
+        assert queue_model.get_node(node._node_id) is None
+    assert queue_model.get_sample((1, 1)) is None
+    assert queue_model.get_sample((1, 2)) is not None
+
+
+def test_set_parent(queue_model):
+    fill_queue(queue_model, 1, 2, 1, 1)
+    group = queue_model.get_sample((1, 1)).get_children()[0]
+
+    queue_model.set_parent(queue_model.get_sample((1, 2)), group)
+    assert group not in queue_model.get_sample((1, 1)).get_children()
+    assert queue_model.get_node(group._node_id) is None
+
+
+@pytest.mark.benchmark
+def test_benchmark_get_node(queue_model, record_property):
+    # 10 pucks of 16 samples, with 4 groups of 16 tasks: 10+ k nodes
+    fill_queue(queue_model, 10, 16, 4, 16)
+    nodes = queue_model.get_nodes()
+    assert len(nodes) > 10000
+    ids = [node._node_id for node in nodes[::100]]
+
+    start = time.perf_counter()
+    found = [search_node(queue_model, _id) for _id in ids]
+    search_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    indexed = [queue_model.get_node(_id) for _id in ids]
+    index_time = time.perf_counter() - start
+
+    record_property("search_ms", 1000 * search_time)
+    record_property("index_ms", 1000 * index_time)
+    assert indexed == found
+    assert index_time < search_time
+
+
+def make_collection(directory, prefix, run_number, start_num=1, num_files=100):
+    collection = qmo.DataCollection()
+    path_template = collection.get_path_template()
+    path_template.directory = directory
+    path_template.base_prefix = prefix
+    path_template.run_number = run_number
+    path_template.start_num = start_num
+    path_template.num_files = num_files
+    return collection
+
+
+def add_collections(queue_model, collections):
+    root = queue_model.get_model_root()
+    sample = make_sample(1, 1)
+    queue_model.add_child(root, sample)
+    group = qmo.TaskGroup()
+    queue_model.add_child(sample, group)
+    for collection in collections:
+        queue_model.add_child(group, collection)
+    return group
+
+
+def test_next_run_number(queue_model):
+    collections = [make_collection("/data/test", "p1", run) for run in (1, 2, 4)]
+    collections.append(make_collection("/data/test/", "p2", 7))
+    add_collections(queue_model, collections)
+
+    new_path_template = make_collection("/data//test", "p1", 1).get_path_template()
+    assert queue_model.get_next_run_number(new_path_template) == 5
+    assert queue_model.get_next_run_number(collections[3].get_path_template()) == 1
+    assert (
+        queue_model.get_next_run_number(
+            collections[3].get_path_template(), exclude_current=False
+        )
+        == 8
+    )
+
+    # the registry follows changes of the queued path templates
+    collections[2].get_path_template().base_prefix = "p2"
+    assert queue_model.get_next_run_number(new_path_template) == 3
+    assert queue_model.get_next_run_number(collections[3].get_path_template()) == 5
+
+
+def test_path_collisions(queue_model):
+    collections = [
+        make_collection("/data/test", "p1", 1, start_num=1, num_files=100),
+        make_collection("/data/test", "p1", 2, start_num=1, num_files=100),
+    ]
+    group = add_collections(queue_model, collections)
+
+    path_template = make_collection("/data/test", "p1", 1, 50, 10).get_path_template()
+    assert queue_model.check_for_path_collisions(path_template)
+    path_template.start_num = 101
+    assert not queue_model.check_for_path_collisions(path_template)
+    assert not queue_model.check_for_path_collisions(collections[0].get_path_template())
+
+    collections[1].get_path_template().run_number = 1
+    assert queue_model.check_for_path_collisions(collections[0].get_path_template())
+    queue_model.del_child(group, collections[1])
+    assert not queue_model.check_for_path_collisions(collections[0].get_path_template())
+    # copies are not registered
+    copied = queue_model.copy_node(collections[0])
+    assert copied.get_path_template().run_number == 2
+    assert not queue_model.check_for_path_collisions(collections[0].get_path_template())
+
+
+def test_replaced_path_template(queue_model):
+    collections = [make_collection("/data/test", "p1", run) for run in (1, 2)]
+    add_collections(queue_model, collections)
+    path_template = make_collection("/data/test", "p1", 5).get_path_template()
+
+    old_path_template = collections[1].get_path_template()
+    collections[1].acquisitions[0].path_template = path_template
+    assert queue_model.get_next_run_number(old_path_template) == 6
+    old_path_template.run_number = 8
+    assert queue_model.get_next_run_number(path_template) == 2
+    assert queue_model.check_for_path_collisions(
+        make_collection("/data/test", "p1", 5).get_path_template()
+    )
+
+
+def test_shared_path_template(queue_model):
+    collections = [make_collection("/data/test", "p1", 3) for _ in range(2)]
+    path_template = collections[0].get_path_template()
+    collections[1].acquisitions[0].path_template = path_template
+    group = add_collections(queue_model, collections)
+    new_path_template = make_collection("/data/test", "p1", 1).get_path_template()
+
+    queue_model.del_child(group, collections[0])
+    assert queue_model.get_next_run_number(new_path_template) == 4
+    queue_model.del_child(group, collections[1])
+    assert queue_model.get_next_run_number(new_path_template) == 1
+
+
+@pytest.mark.benchmark
+def test_benchmark_run_numbers(queue_model, record_property):
+    """Bulk queue building: a run number and a collision check per task"""
+    root = queue_model.get_model_root()
+    nsamples, ntasks = 50, 20
+
+    def build(next_run_number, check_for_path_collisions):
+        for sample_idx in range(nsamples):
+            sample = make_sample(1, sample_idx + 1)
+            queue_model.add_child(root, sample)
+            group = qmo.TaskGroup()
+            queue_model.add_child(sample, group)
+            for _ in range(ntasks):
+                collection = make_collection("/data/test", "s%d" % sample_idx, 0)
+                path_template = collection.get_path_template()
+                path_template.run_number = next_run_number(path_template)
+                assert not check_for_path_collisions(path_template)
+                queue_model.add_child(group, collection)
+
+    def scan_run_number(new_path_template):
+        run_numbers = [0]
+        for _, path_template in queue_model.get_path_templates():
+            if path_template is not new_path_template:
+                if path_template == new_path_template:
+                    run_numbers.append(path_template.run_number)
+        return max(run_numbers) + 1
+
+    def scan_collisions(new_path_template):
+        return any(
+            path_template is not new_path_template
+            and new_path_template.intersection(path_template)
+            for _, path_template in queue_model.get_path_templates()
+        )
+
+    start = time.perf_counter()
+    build(scan_run_number, scan_collisions)
+    scan_time = time.perf_counter() - start
+    expected = [pt.run_number for _, pt in queue_model.get_path_templates()]
+
+    queue_model._selected_model = qmo.RootNode()
+    root = queue_model.get_model_root()
+    start = time.perf_counter()
+    build(queue_model.get_next_run_number, queue_model.check_for_path_collisions)
+    registry_time = time.perf_counter() - start
+
+    record_property("tasks", nsamples * ntasks)
+    record_property("scan_ms", 1000 * scan_time)
+    record_property("registry_ms", 1000 * registry_time)
+    assert [pt.run_number for _, pt in queue_model.get_path_templates()] == expected
+    assert expected[:ntasks] == list(range(1, ntasks + 1))
+    assert registry_time < scan_time
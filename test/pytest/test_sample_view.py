@@ -21,8 +21,15 @@
 from __future__ import division, absolute_import
 from __future__ import print_function, unicode_literals
 
+import math
+
+import numpy
 import pytest
 
+from mxcubecore.Command.Exporter import ExporterChannel
+from mxcubecore.HardwareObjects import GenericDiffractometer as generic_diffractometer
+from mxcubecore.HardwareObjects.GenericDiffractometer import GenericDiffractometer
+
 __copyright__ = """ Copyright © 2010 - 2020 by MXCuBE Collaboration """
 __license__ = "LGPLv3+"
 
@@ -133,3 +140,183 @@ def test_sample_view_select_shape(sample_view):
 
     sample_view.de_select_all()
     assert len(sample_view.get_selected_shapes()) == 0
+
+
+def test_sample_view_update_shape_positions(sample_view, beamline):
+    diffractometer = beamline.diffractometer
+    sample_view._update_shape_positions()
+
+    x, y = diffractometer.motor_positions_to_screen({})
+    assert sample_view.get_points()[0].screen_coord == (x, y)
+    assert sample_view.get_lines()[0].screen_coord == (x, y, x, y)
+
+
+def test_sample_view_update_shape_positions_no_batch(
+    sample_view, beamline, monkeypatch
+):
+    """Diffractometers without motor_positions_to_screen_batch"""
+    diffractometer = beamline.diffractometer
+    monkeypatch.delattr(GenericDiffractometer, "motor_positions_to_screen_batch")
+    monkeypatch.setattr(
+        diffractometer, "motor_positions_to_screen", lambda pos: (12, 34)
+    )
+    assert not hasattr(diffractometer, "motor_positions_to_screen_batch")
+
+    sample_view._update_shape_positions()
+
+    assert sample_view.get_points()[0].screen_coord == (12, 34)
+    assert sample_view.get_lines()[0].screen_coord == (12, 34, 12, 34)
+
+
+class CentringMotorStub:
+    def __init__(self, value, direction=1):
+        self.value = value
+        self.direction = direction
+        self.reads = 0
+
+    def get_value(self):
+        self.reads += 1
+        return self.value
+
+
+def legacy_motor_positions_to_screen(diffractometer, pos):
+    """The per position projection previously used by GenericDiffractometer"""
+    phi_angle = math.radians(
+        diffractometer.centring_phi.direction * diffractometer.centring_phi.get_value()
+    )
+    sampx = diffractometer.centring_sampx.direction * (
+        pos["sampx"] - diffractometer.centring_sampx.get_value()
+    )
+    sampy = diffractometer.centring_sampy.direction * (
+        pos["sampy"] - diffractometer.centring_sampy.get_value()
+    )
+    phiy = diffractometer.centring_phiy.direction * (
+        pos["phiy"] - diffractometer.centring_phiy.get_value()
+    )
+    phiz = diffractometer.centring_phiz.direction * (
+        pos["phiz"] - diffractometer.centring_phiz.get_value()
+    )
+    rot_matrix = numpy.matrix(
+        [
+            math.cos(phi_angle),
+            -math.sin(phi_angle),
+            math.sin(phi_angle),
+            math.cos(phi_angle),
+        ]
+    )
+    rot_matrix.shape = (2, 2)
+    inv_rot_matrix = numpy.array(rot_matrix.I)
+    dx, dy = (
+        numpy.dot(numpy.array([sampx, sampy]), inv_rot_matrix)
+        * diffractometer.pixels_per_mm_x
+    )
+    x = (phiy * diffractometer.pixels_per_mm_x) + diffractometer.beam_position[0]
+    y = dy + (phiz * diffractometer.pixels_per_mm_y) + diffractometer.beam_position[1]
+    return x, y
+
+
+@pytest.mark.filterwarnings("ignore::PendingDeprecationWarning")
+def test_motor_positions_to_screen_batch():
+    diffractometer = GenericDiffractometer("diffractometer")
+    diffractometer.use_sample_centring = True
+    diffractometer.update_zoom_calibration = lambda: None
+    diffractometer.pixels_per_mm_x = 512.0
+    diffractometer.pixels_per_mm_y = 498.0
+    diffractometer.beam_position = (320, 256)
+    diffractometer.centring_phi = CentringMotorStub(37.5, -1)
+    diffractometer.centring_sampx = CentringMotorStub(0.12)
+    diffractometer.centring_sampy = CentringMotorStub(-0.31, -1)
+    diffractometer.centring_phiy = CentringMotorStub(0.05)
+    diffractometer.centring_phiz = CentringMotorStub(0.4)
+
+    rng = numpy.random.default_rng(0)
+    positions = [
+        dict(zip(("sampx", "sampy", "phiy", "phiz"), row))
+        for row in rng.uniform(-1, 1, (500, 4))
+    ]
+    expected = [
+        legacy_motor_positions_to_screen(diffractometer, pos) for pos in positions
+    ]
+
+    reads = diffractometer.centring_phi.reads
+    screen_positions = diffractometer.motor_positions_to_screen_batch(positions)
+
+    assert numpy.allclose(screen_positions, expected)
+    assert diffractometer.centring_phi.reads == reads + 1
+    assert diffractometer.motor_positions_to_screen(positions[3]) == pytest.approx(
+        expected[3]
+    )
+    assert diffractometer.motor_positions_to_screen_batch([]) == []
+
+
+class ExporterMotorStub(CentringMotorStub):
+    """Motor with an exporter position channel"""
+
+    def __init__(self, value, direction=1):
+        super().__init__(value, direction)
+        self.motor_position_chan = ExporterChannel.__new__(ExporterChannel)
+        self.motor_position_chan.value = value
+        self.updates = []
+
+    def update_value(self, value):
+        self.updates.append(value)
+
+
+def test_read_motor_values(monkeypatch):
+    bursts = []
+
+    def read_channels(channels):
+        bursts.append(len(channels))
+        return [channel.value for channel in channels]
+
+    monkeypatch.setattr(generic_diffractometer, "read_channels", read_channels)
+    diffractometer = GenericDiffractometer("diffractometer")
+    diffractometer.motor_hwobj_dict = {
+        "phi": ExporterMotorStub(10.0),
+        "sampx": ExporterMotorStub(0.1),
+        "zoom": CentringMotorStub(3),
+        "phiy": ExporterMotorStub(float("nan")),
+    }
+    diffractometer.beam_position = (320, 256)
+    diffractometer.zoom_centre = {"x": 320, "y": 256}
+    diffractometer.pixels_per_mm_x = diffractometer.pixels_per_mm_y = 500.0
+
+    positions = diffractometer.get_positions()
+    # one burst for the exporter motors, the others read one by one
+    assert bursts == [3]
+    assert positions["phi"] == 10.0
+    assert positions["zoom"] == 3
+    assert positions["beam_x"] == positions["beam_y"] == 0
+    assert diffractometer.motor_hwobj_dict["sampx"].updates == [0.1]
+    # invalid position: read by the motor itself
+    assert math.isnan(positions["phiy"])
+    assert diffractometer.motor_hwobj_dict["phiy"].reads == 1
+    assert diffractometer.motor_hwobj_dict["phiy"].updates == []
+
+
+def test_motor_positions_to_screen_exporter_burst(monkeypatch):
+    bursts = []
+
+    def read_channels(channels):
+        bursts.append(len(channels))
+        return [channel.value for channel in channels]
+
+    monkeypatch.setattr(generic_diffractometer, "read_channels", read_channels)
+    diffractometer = GenericDiffractometer("diffractometer")
+    diffractometer.use_sample_centring = True
+    diffractometer.update_zoom_calibration = lambda: None
+    diffractometer.pixels_per_mm_x = 512.0
+    diffractometer.pixels_per_mm_y = 498.0
+    diffractometer.beam_position = (320, 256)
+    diffractometer.centring_phi = ExporterMotorStub(37.5, -1)
+    diffractometer.centring_sampx = ExporterMotorStub(0.12)
+    diffractometer.centring_sampy = ExporterMotorStub(-0.31, -1)
+    diffractometer.centring_phiy = ExporterMotorStub(0.05)
+    diffractometer.centring_phiz = CentringMotorStub(0.4)
+    pos = {"sampx": 0.2, "sampy": -0.1, "phiy": 0.3, "phiz": 0.1}
+
+    screen_position = diffractometer.motor_positions_to_screen(pos)
+    assert bursts == [4]
+    assert screen_position == pytest.approx(
+        legacy_motor_positions_to_screen(diffractometer, pos)
+    )
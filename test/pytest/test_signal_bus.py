@@ -0,0 +1,302 @@
+"""Tests and benchmark of the signal bus and signal rate limiting"""
+
+import gc
+import time
+
+import gevent
+import pytest
+
+from mxcubecore.BaseHardwareObjects import HardwareObject
+from mxcubecore.dispatcher import SignalBus, SignalCoalescer, dispatcher
+
+
+class Sender:
+    """Weakly referenceable signal sender"""
+
+
+class Receiver:
+    def __init__(self):
+        self.calls = []
+
+    def value_changed(self, value):
+        self.calls.append(value)
+
+    def with_sender(self, value, sender=None):
+        self.calls.append((value, sender))
+
+    def with_kwargs(self, *args, **kwargs):
+        self.calls.append((args, kwargs))
+
+    def failing(self, value):
+        raise RuntimeError("receiver error")
+
+
+@pytest.fixture
+def bus():
+    return SignalBus()
+
+
+def test_send(bus):
+    sender, receiver = Sender(), Receiver()
+    bus.connect(receiver.value_changed, "valueChanged", sender)
+    bus.connect(receiver.with_sender, "valueChanged", sender)
+    bus.connect(receiver.with_kwargs, "valueChanged", sender)
+
+    responses = bus.send("valueChanged", sender, 1.5)
+    bus.send("stateChanged", sender, 2)
+    bus.send("valueChanged", Sender(), 3)
+
+    assert len(responses) == 3
+    assert receiver.calls == [
+        1.5,
+        (1.5, sender),
+        ((1.5,), {"signal": "valueChanged", "sender": sender}),
+    ]
+
+
+def test_connect_twice_and_disconnect(bus):
+    sender, receiver = Sender(), Receiver()
+    bus.connect(receiver.value_changed, "valueChanged", sender)
+    bus.connect(receiver.value_changed, "valueChanged", sender)
+    bus.send("valueChanged", sender, 1)
+    bus.disconnect(receiver.value_changed, "valueChanged", sender)
+    bus.send("valueChanged", sender, 2)
+
+    assert receiver.calls == [1]
+    with pytest.raises(Exception):
+        bus.disconnect(receiver.value_changed, "valueChanged", sender)
+
+
+def test_weak_references(bus):
+    sender, receiver = Sender(), Receiver()
+    bus.connect(receiver.value_changed, "valueChanged", sender)
+    del receiver
+    gc.collect()
+    assert bus.send("valueChanged", sender, 1) == []
+    assert bus.get_receivers("valueChanged", sender) == []
+
+    receiver = Receiver()
+    bus.connect(receiver.value_changed, "valueChanged", sender)
+    del sender
+    gc.collect()
+    assert not bus._connections
+
+
+def test_receiver_exception(bus, capsys):
+    sender, receiver = Sender(), Receiver()
+    bus.connect(receiver.failing, "valueChanged", sender)
+    bus.connect(receiver.value_changed, "valueChanged", sender)
+
+    bus.send("valueChanged", sender, 1)
+    assert receiver.calls == [1]
+    assert "receiver error" in capsys.readouterr().err
+
+
+def test_dispatcher_receivers(bus):
+    sender, receiver = Sender(), Receiver()
+    dispatcher.connect(receiver.value_changed, "valueChanged", sender)
+    dispatcher.connect(receiver.with_sender, "valueChanged", dispatcher.Any)
+    try:
+        bus.send("valueChanged", sender, 1)
+    finally:
+        dispatcher.disconnect(receiver.value_changed, "valueChanged", sender)
+        dispatcher.disconnect(receiver.with_sender, "valueChanged", dispatcher.Any)
+
+    assert sorted(receiver.calls, key=str) == [(1, sender), 1]
+
+
+def test_delivery_order(bus):
+    sender, receiver = Sender(), Receiver()
+    bus.connect(receiver.value_changed, "valueChanged", sender)
+    dispatcher.connect(receiver.with_sender, "valueChanged", sender)
+    try:
+        bus.send("valueChanged", sender, 1)
+        # signals sent on behalf of the sender reach the bus receivers too
+        dispatcher.send("valueChanged", sender, 2)
+        dispatcher.send("stateChanged", sender, 3)
+    finally:
+        dispatcher.disconnect(receiver.with_sender, "valueChanged", sender)
+
+    # dispatcher receivers first
+    assert receiver.calls == [(1, sender), 1, (2, sender), 2]
+
+
+def test_dispatcher_send_to_hardware_object():
+    hwobj, receiver = HardwareObject("test"), Receiver()
+    hwobj.connect("valueChanged", receiver.value_changed)
+    dispatcher.send("valueChanged", hwobj, 1.5)
+    assert receiver.calls == [1.5]
+
+
+@pytest.mark.benchmark
+def test_benchmark_against_dispatcher(bus, record_property):
+    """valueChanged traffic from many motors, each with a few receivers"""
+    nsenders, nreceivers, nsends = 50, 4, 200
+    senders = [Sender() for _ in range(nsenders)]
+    receivers = [Receiver() for _ in range(nreceivers)]
+
+    for sender in senders:
+        for receiver in receivers:
+            dispatcher.connect(receiver.value_changed, "valueChanged", sender)
+    try:
+        start = time.perf_counter()
+        for idx in range(nsends):
+            for sender in senders:
+                dispatcher.send("valueChanged", sender, idx)
+        dispatcher_time = time.perf_counter() - start
+    finally:
+        for sender in senders:
+            for receiver in receivers:
+                dispatcher.disconnect(receiver.value_changed, "valueChanged", sender)
+
+    for sender in senders:
+        for receiver in receivers:
+            bus.connect(receiver.value_changed, "valueChanged", sender)
+    start = time.perf_counter()
+    for idx in range(nsends):
+        for sender in senders:
+            bus.send("valueChanged", sender, idx)
+    bus_time = time.perf_counter() - start
+
+    record_property("signals", nsenders * nsends)
+    record_property("dispatcher_ms", 1000 * dispatcher_time)
+    record_property("bus_ms", 1000 * bus_time)
+    for receiver in receivers:
+        assert receiver.calls == 2 * [idx for idx in range(nsends) for _ in senders]
+    assert bus_time < dispatcher_time
+
+
+@pytest.fixture
+def hwobj():
+    return HardwareObject("test")
+
+
+class FakeTimer:
+    """Rate limit interval, ended by the test"""
+
+    def __init__(self, timers, coalescer, signal):
+        self.timers = timers
+        self.coalescer = coalescer
+        self.signal = signal
+
+    def kill(self, block=True):
+        self.timers.remove(self)
+
+
+@pytest.fixture
+def timers(monkeypatch):
+    """The running rate limit intervals, instead of gevent timers"""
+    running = []
+
+    def start_interval(coalescer, signal, interval):
+        timer = FakeTimer(running, coalescer, signal)
+        running.append(timer)
+        coalescer._timers[signal] = timer
+
+    monkeypatch.setattr(SignalCoalescer, "_start_interval", start_interval)
+    return running
+
+
+def end_intervals(timers):
+    for timer in list(timers):
+        timers.remove(timer)
+        timer.coalescer._end_interval(timer.signal)
+
+
+def test_rate_limited_signal(hwobj, timers):
+    receiver = Receiver()
+    hwobj.connect("valueChanged", receiver.value_changed)
+    hwobj.set_signal_rate_limits({"valueChanged": 300})
+
+    for value in range(10):
+        hwobj.emit("valueChanged", value)
+    # leading edge
+    assert receiver.calls == [0]
+    end_intervals(timers)
+    # trailing edge, latest value wins
+    assert receiver.calls == [0, 9]
+
+    # the trailing edge started a new interval
+    hwobj.emit("valueChanged", 10)
+    assert receiver.calls == [0, 9]
+    end_intervals(timers)
+    assert receiver.calls == [0, 9, 10]
+    end_intervals(timers)
+    assert not timers
+
+
+def test_rate_limited_signal_timer(hwobj):
+    receiver = Receiver()
+    hwobj.connect("valueChanged", receiver.value_changed)
+    hwobj.set_signal_rate_limits({"valueChanged": 10})
+
+    hwobj.emit("valueChanged", 0)
+    hwobj.emit("valueChanged", 1)
+    with gevent.Timeout(5):
+        while len(receiver.calls) < 2:
+            gevent.sleep(0.005)
+    assert receiver.calls == [0, 1]
+
+
+def test_leading_and_trailing_options(hwobj, timers):
+    receiver = Receiver()
+    hwobj.connect("valueChanged", receiver.value_changed)
+    hwobj.connect("specificStateChanged", receiver.with_sender)
+
+    hwobj.set_signal_rate_limits(
+        {
+            "valueChanged": {"interval": 30, "leading": False},
+            "specificStateChanged": {"interval": 30, "trailing": False},
+        }
+    )
+    for value in range(3):
+        hwobj.emit("valueChanged", value)
+        hwobj.emit("specificStateChanged", value)
+    assert receiver.calls == [(0, hwobj)]
+    end_intervals(timers)
+    assert receiver.calls == [(0, hwobj), 2]
+
+    with pytest.raises(ValueError):
+        SignalCoalescer(
+            None,
+            {"valueChanged": {"interval": 10, "leading": False, "trailing": False}},
+        )
+
+
+def test_interleaved_signals(hwobj, timers):
+    motor_view, status_bar = Receiver(), Receiver()
+    hwobj.connect("valueChanged", motor_view.value_changed)
+    hwobj.connect("statusChanged", status_bar.value_changed)
+    hwobj.set_signal_rate_limits({"valueChanged": 100})
+
+    for value in range(5):
+        hwobj.emit("valueChanged", value)
+        hwobj.emit("statusChanged", "moving %d" % value)
+    # signals to other receivers do not end the interval
+    assert motor_view.calls == [0]
+    assert len(status_bar.calls) == 5
+    end_intervals(timers)
+    assert motor_view.calls == [0, 4]
+
+
+def test_unlimited_signal_flushes_pending(hwobj):
+    receiver = Receiver()
+    hwobj.connect("valueChanged", receiver.value_changed)
+    hwobj.connect("stateChanged", receiver.value_changed)
+    hwobj.set_signal_rate_limits({"valueChanged": 1000})
+
+    for value in range(5):
+        hwobj.emit("valueChanged", value)
+    hwobj.emit("stateChanged", "READY")
+    # the last position is delivered before the state change
+    assert receiver.calls == [0, 4, "READY"]
+
+
+def test_xml_configuration(hwobj):
+    receiver = Receiver()
+    hwobj.set_property("signal_rate_limits", "{'valueChanged': 1000}")
+    hwobj.connect("valueChanged", receiver.value_changed)
+
+    hwobj.emit("valueChanged", 1)
+    hwobj.emit("valueChanged", 2)
+    assert receiver.calls == [1]
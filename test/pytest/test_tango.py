@@ -0,0 +1,229 @@
+"""Tests of the Tango channels and commands, with a fake DeviceProxy"""
+
+from collections import Counter
+
+import gevent
+import pytest
+
+pytest.importorskip("tango")
+
+from mxcubecore import Poller
+from mxcubecore.Command import Tango
+
+
+class FakeAttribute:
+    def __init__(self, name, value=None):
+        self.name = name
+        self.value = value
+        self.has_failed = False
+
+    def get_err_stack(self):
+        return ()
+
+
+class FakeDeviceProxy:
+    """DeviceProxy stand-in, counting the calls made to the device"""
+
+    calls = Counter()
+    values = {}
+    failing = set()
+    # error raised by the calls to the device, if any
+    error = None
+
+    def __init__(self, device_name):
+        self.device_name = device_name
+        self.timeout = None
+        FakeDeviceProxy.calls["create"] += 1
+
+    def ping(self):
+        FakeDeviceProxy.calls["ping"] += 1
+
+    def set_timeout_millis(self, timeout):
+        self.timeout = timeout
+
+    def attribute_list_query(self):
+        FakeDeviceProxy.calls["attribute_list_query"] += 1
+        return [FakeAttribute("Position"), FakeAttribute("State")]
+
+    def read_attribute(self, name):
+        FakeDeviceProxy.calls["read_attribute"] += 1
+        if FakeDeviceProxy.error is not None:
+            raise FakeDeviceProxy.error
+        return FakeAttribute(name, FakeDeviceProxy.values.get(name))
+
+    def read_attributes(self, names):
+        FakeDeviceProxy.calls["read_attributes"] += 1
+        attributes = []
+        for name in names:
+            attribute = FakeAttribute(name, FakeDeviceProxy.values.get(name))
+            attribute.has_failed = name in FakeDeviceProxy.failing
+            attributes.append(attribute)
+        return attributes
+
+    def Stop(self):
+        return "stopped"
+
+
+@pytest.fixture
+def fake_proxy(mocker):
+    mocker.patch.object(Tango, "DeviceProxy", FakeDeviceProxy)
+    FakeDeviceProxy.calls.clear()
+    FakeDeviceProxy.values = {"Position": 1.5, "State": "ON"}
+    FakeDeviceProxy.failing = set()
+    FakeDeviceProxy.error = None
+    yield FakeDeviceProxy
+    for device_name, _ in list(Tango.DEVICE_PROXIES):
+        Tango.invalidate_device(device_name)
+    for poller in list(Poller.POLLERS.values()):
+        poller.stop()
+    Tango.POLL_GROUPS.clear()
+
+
+def test_channels_share_proxy(fake_proxy):
+    channels = [
+        Tango.TangoChannel(
+            "chan%d" % idx, attr, tangoname="test/motor/1", timeout=timeout
+        )
+        for idx, (attr, timeout) in enumerate(
+            (("Position", 3000), ("State", 10000), ("position", 5000))
+        )
+    ]
+    channels.append(
+        Tango.TangoChannel("chan3", "State", tangoname="test/motor/1", timeout=3000)
+    )
+    command = Tango.TangoCommand("stop", "Stop", tangoname="test/motor/1")
+
+    assert command() == "stopped"
+    # each client timeout has its own proxy, shared by the users of the timeout
+    assert channels[3].device is channels[0].device
+    assert len(set(id(channel.device) for channel in channels)) == 3
+    assert [channel.device.timeout for channel in channels] == [
+        3000,
+        10000,
+        5000,
+        3000,
+    ]
+    assert command.device.timeout is None
+    assert fake_proxy.calls == {"create": 4, "ping": 4, "attribute_list_query": 1}
+
+    # a command timeout does not change the timeout of the channels
+    command.set_device_timeout(500)
+    assert command() == "stopped"
+    assert command.device.timeout == 500
+    assert channels[1].device.timeout == 10000
+
+
+def test_missing_attribute(fake_proxy):
+    channel = Tango.TangoChannel("chan", "Velocity", tangoname="test/motor/1")
+    assert channel.device is None
+    assert not channel.is_connected()
+
+
+def test_invalidate_device(fake_proxy):
+    channel1 = Tango.TangoChannel("chan1", "Position", tangoname="test/motor/1")
+    Tango.invalidate_device("test/motor/1")
+    channel2 = Tango.TangoChannel("chan2", "Position", tangoname="test/motor/1")
+
+    assert channel1.device is not channel2.device
+    assert fake_proxy.calls["create"] == 2
+    assert fake_proxy.calls["attribute_list_query"] == 2
+
+
+def test_channel_reconnect(fake_proxy):
+    channel = Tango.TangoChannel("chan", "Position", tangoname="test/motor/1")
+    assert channel.get_value() == 1.5
+    old_device = channel.device
+
+    # e.g. the device server restarted
+    fake_proxy.error = Tango.PyTango.CommunicationFailed()
+    with pytest.raises(Tango.PyTango.DevFailed):
+        channel.get_value()
+    assert not channel.is_connected()
+    assert not Tango.DEVICE_PROXIES
+
+    fake_proxy.error = None
+    assert channel.get_value() == 1.5
+    assert channel.device is not old_device
+
+
+class UpdateRecorder:
+    """Receiver of the channel update signals"""
+
+    def __init__(self, name, updates):
+        self.name = name
+        self.updates = updates
+
+    def update(self, value):
+        self.updates.append((self.name, value))
+
+
+def polled_channel(name, attribute_name, updates, recorders, polling=20):
+    channel = Tango.TangoChannel(
+        name,
+        attribute_name,
+        tangoname="test/motor/1",
+        polling=polling,
+        group_polling="True",
+    )
+    recorders.append(UpdateRecorder(name, updates))
+    channel.connect_signal("update", recorders[-1].update)
+    return channel
+
+
+def test_grouped_polling(fake_proxy):
+    updates = []
+    recorders = []
+
+    channels = [
+        polled_channel("position", "Position", updates, recorders),
+        polled_channel("state", "State", updates, recorders),
+        polled_channel("position_slow", "Position", updates, recorders, 1000),
+    ]
+    gevent.sleep(0.2)
+
+    assert len(Tango.POLL_GROUPS) == 2
+    assert fake_proxy.calls["read_attribute"] == 0
+    assert channels[0].value == 1.5
+    assert channels[1].value == "ON"
+    assert channels[2].value == 1.5
+
+    del updates[:]
+    fake_proxy.values["State"] = "MOVING"
+    gevent.sleep(0.1)
+    # only the changed attribute is updated
+    assert updates == [("state", "MOVING")]
+
+
+def test_grouped_polling_read_failed(fake_proxy):
+    updates = []
+    recorders = []
+    channels = [
+        polled_channel("position", "Position", updates, recorders),
+        polled_channel("state", "State", updates, recorders),
+    ]
+    gevent.sleep(0.1)
+
+    del updates[:]
+    fake_proxy.failing.add("State")
+    gevent.sleep(0.1)
+    # the failed read is passed once, as by a channel polled alone
+    assert updates == [("state", None)]
+
+    fake_proxy.failing.clear()
+    gevent.sleep(0.1)
+    assert updates == [("state", None), ("state", "ON")]
+    assert channels[1].value == "ON"
+
+
+@pytest.mark.parametrize("group_polling", [None, False, "False"])
+def test_polling_not_grouped(fake_proxy, group_polling):
+    kwargs = {} if group_polling is None else {"group_polling": group_polling}
+    channel = Tango.TangoChannel(
+        "position", "Position", tangoname="test/motor/1", polling=20, **kwargs
+    )
+    gevent.sleep(0.1)
+
+    assert not Tango.POLL_GROUPS
+    assert fake_proxy.calls["read_attributes"] == 0
+    assert fake_proxy.calls["read_attribute"] > 0
+    assert channel.value == 1.5
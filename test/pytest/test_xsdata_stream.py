@@ -0,0 +1,153 @@
+"""Tests of the ElementTree XSData parsing and the Dozor result arrays"""
+
+import time
+
+import gevent
+import numpy as np
+import pytest
+
+from mxcubecore.HardwareObjects.edna_test_data import EDNA_RESULT_DATA
+from mxcubecore.HardwareObjects.XSDataControlDozorv1_1 import (
+    XSDataResultControlDozor,
+)
+from mxcubecore.HardwareObjects.XSDataMXCuBEv1_4 import XSDataResultMXCuBE
+from mxcubecore.utils import xsdata_stream
+
+
+def make_fields(images_num, seed=0):
+    rng = np.random.RandomState(seed)
+    return {
+        "number": np.arange(images_num),
+        "spots_num_of": rng.randint(0, 500, images_num),
+        "spots_resolution": rng.rand(images_num) * 5,
+        "score": rng.rand(images_num) * 100,
+    }
+
+
+def exported(xsdata_object, path):
+    """XML of an XSData object, as written by exportToFile"""
+    xsdata_object.exportToFile(str(path))
+    return path.read_text()
+
+
+def test_parse_string():
+    result = xsdata_stream.parse_string(XSDataResultMXCuBE, EDNA_RESULT_DATA)
+    expected = XSDataResultMXCuBE.parseString(EDNA_RESULT_DATA)
+    assert result.marshal() == expected.marshal()
+    assert (
+        result.marshal()
+        == xsdata_stream.parse_string(
+            XSDataResultMXCuBE, EDNA_RESULT_DATA.encode()
+        ).marshal()
+    )
+
+
+def test_write_dozor_result(tmp_path):
+    fields = make_fields(50)
+    result = xsdata_stream.dozor_result_from_arrays(**fields)
+    assert len(result.imageDozor) == 50
+    assert result.imageDozor[3].spots_num_of.value == fields["spots_num_of"][3]
+
+    xsdata_stream.write_dozor_result(str(tmp_path / "arrays.xml"), **fields)
+    assert (tmp_path / "arrays.xml").read_text() == exported(
+        result, tmp_path / "objects.xml"
+    )
+
+    # some fields only
+    xsdata_stream.write_dozor_result(
+        str(tmp_path / "score.xml"), number=fields["number"], score=fields["score"]
+    )
+    result = xsdata_stream.dozor_result_from_arrays(
+        number=fields["number"], score=fields["score"]
+    )
+    assert (tmp_path / "score.xml").read_text() == exported(
+        result, tmp_path / "score_objects.xml"
+    )
+
+
+def test_parse_file(tmp_path):
+    filename = str(tmp_path / "dozor.xml")
+    xsdata_stream.write_dozor_result(filename, **make_fields(20))
+    result = xsdata_stream.parse_file(XSDataResultControlDozor, filename)
+    expected = XSDataResultControlDozor.parseFile(filename)
+    assert exported(result, tmp_path / "result.xml") == exported(
+        expected, tmp_path / "expected.xml"
+    )
+
+
+def test_read_dozor_result(tmp_path):
+    fields = make_fields(30)
+    filename = str(tmp_path / "dozor.xml")
+    xsdata_stream.write_dozor_result(filename, **fields)
+
+    arrays = xsdata_stream.read_dozor_result(filename)
+    assert np.array_equal(arrays["number"], fields["number"])
+    assert np.array_equal(arrays["spots_num_of"], fields["spots_num_of"])
+    # written with 7 significant digits
+    assert np.allclose(arrays["score"], fields["score"], rtol=1e-6)
+
+    xsdata_stream.write_dozor_result(filename, number=[1, 2], score=[0.5, 1.5])
+    with open(filename, "rb") as source:
+        images = list(xsdata_stream.iter_dozor_images(source))
+    assert images == [{"number": 1, "score": 0.5}, {"number": 2, "score": 1.5}]
+    assert np.isnan(xsdata_stream.read_dozor_result(filename)["spots_num_of"]).all()
+
+
+def test_invalid_fields(tmp_path):
+    with pytest.raises(ValueError):
+        xsdata_stream.write_dozor_result(str(tmp_path / "dozor.xml"), spots=[1])
+    with pytest.raises(ValueError):
+        xsdata_stream.dozor_result_from_arrays(number=[1, 2], score=[1.0])
+
+
+def test_run_in_thread():
+    ticks = []
+
+    def tick():
+        while True:
+            gevent.sleep(0.01)
+            ticks.append(time.monotonic())
+
+    ticker = gevent.spawn(tick)
+    try:
+        assert xsdata_stream.run_in_thread(time.sleep, 0.2) is None
+    finally:
+        ticker.kill()
+    # the event loop kept running during the call
+    assert len(ticks) > 5
+
+
+@pytest.mark.benchmark
+def test_benchmark_dozor_result(tmp_path, record_property):
+    images_num = 10000
+    fields = make_fields(images_num)
+    objects_file = str(tmp_path / "objects.xml")
+    arrays_file = str(tmp_path / "arrays.xml")
+
+    start = time.perf_counter()
+    xsdata_stream.dozor_result_from_arrays(**fields).exportToFile(objects_file)
+    write_objects = time.perf_counter() - start
+
+    start = time.perf_counter()
+    xsdata_stream.write_dozor_result(arrays_file, **fields)
+    write_arrays = time.perf_counter() - start
+
+    start = time.perf_counter()
+    XSDataResultControlDozor.parseFile(arrays_file)
+    parse_minidom = time.perf_counter() - start
+
+    start = time.perf_counter()
+    xsdata_stream.parse_file(XSDataResultControlDozor, arrays_file)
+    parse_etree = time.perf_counter() - start
+
+    start = time.perf_counter()
+    xsdata_stream.read_dozor_result(arrays_file)
+    read_arrays = time.perf_counter() - start
+
+    record_property("images", images_num)
+    record_property("write_objects_ms", 1000 * write_objects)
+    record_property("write_arrays_ms", 1000 * write_arrays)
+    record_property("parse_minidom_ms", 1000 * parse_minidom)
+    record_property("parse_etree_ms", 1000 * parse_etree)
+    record_property("read_arrays_ms", 1000 * read_arrays)
+    assert write_arrays < write_objects